@@ -2,10 +2,130 @@ MONGO_CONFIG = {
     'DATABASE': 'DW-MarcosJunior',
     'COLLECTIONS': {
         'PREDOMINANT_PROFILE': 'ETL-predominant_profile',
-        'FREQUENT_ITEMSETS': 'ETL-most_frequent_itemsets'
+        'FREQUENT_ITEMSETS': 'ETL-most_frequent_itemsets',
+        'ETL_STATE': 'ETL-state'
     }
 }
 
+EXTRACT_CONFIG = {
+    'STREAMING': False,
+    'ITERSIZE': 5000,
+    'ORDERS_CHUNK_SIZE': 1000,
+    # Let Postgres count (product, gender, age range) combinations for the profile flow
+    'PROFILE_PUSHDOWN': False
+}
+
+LOAD_CONFIG = {
+    'BULK': False,
+    'BATCH_SIZE': 1000,
+    # How Decimal values are written to MongoDB: 'float' (BSON double) or
+    # 'decimal128' (exact)
+    'DECIMAL_ENCODING': 'float'
+}
+
+TRANSFORM_CONFIG = {
+    # 'python' or 'numpy'; may also be set per flow with a {flow_name: engine} dict
+    'ENGINE': 'python',
+    # Memory budget of the in-process grouping of the profile (by product) and
+    # of unordered sales lines (by order); past it, groups are spilled to
+    # hash-partitioned files under SPILL_DIR. None keeps everything in memory.
+    'MEMORY_BUDGET_MB': None,
+    'SPILL_PARTITIONS': 16,
+    'SPILL_DIR': '.spill'
+}
+
+ITEMSET_CONFIG = {
+    # 'sql' (product pairs counted by Postgres) or 'fpgrowth' (in-process, any size)
+    'ENGINE': 'sql',
+    # Absolute number of orders, or a fraction of all orders if below 1
+    'MIN_SUPPORT': 4,
+    'MAX_SIZE': 3
+}
+
+PIPELINE_CONFIG = {
+    'INCREMENTAL': False,
+    # Flows allowed to run at the same time (1 runs them one after another)
+    'MAX_WORKERS': 1,
+    # {flow_name: [flow names it must wait for]}
+    'FLOW_DEPENDENCIES': {},
+    # Run extract, transform and load of a flow as concurrent stages
+    'PIPELINED': False,
+    # Batches buffered between two stages before the producer blocks
+    'QUEUE_SIZE': 4,
+    # Feed every flow from a single pass over the joined sales lines
+    'SHARED_SCAN': False,
+    # Id range partitions of each flow, processed by separate worker processes
+    'PARTITIONS': 1,
+    # Worker processes in partitioned mode (None: one per partition, up to the CPU count)
+    'PARTITION_WORKERS': None,
+    # Process the monthly partitions of the sales tables (app/db/models.py
+    # --partitioned) one by one, skipping those not written to since the last run
+    'DATE_PARTITIONS': False,
+    # Per-partition keys and partial results of the date partitioned mode
+    'PARTITION_STATE_DIR': '.partitions'
+}
+
+ASYNC_CONFIG = {
+    # Run the flows as tasks on one event loop, with asyncpg (optional
+    # dependency) for the extracts and pymongo's AsyncMongoClient for the loads
+    'ENABLED': False,
+    'POOL_MIN_SIZE': 1,
+    'POOL_MAX_SIZE': 10,
+    # Flows running at the same time
+    'MAX_CONCURRENT_FLOWS': 3,
+    # Batches of a streamed flow being transformed and loaded at the same time
+    'MAX_CONCURRENT_BATCHES': 4,
+    # insert_many calls in flight per bulk load
+    'MAX_CONCURRENT_WRITES': 4
+}
+
+CACHE_CONFIG = {
+    # Skip flows whose sources did not change since their last successful run
+    'ENABLED': False,
+    'DIR': '.cache/etl',
+    # Cached outputs are evicted past this total size or age
+    'MAX_SIZE_MB': 512,
+    'MAX_AGE_DAYS': 7,
+    'COMPRESSION_LEVEL': 3
+}
+
+STAGING_CONFIG = {
+    # Spill extracted rows and transformed batches to compressed files between stages
+    'ENABLED': False,
+    'DIR': '.staging',
+    # 'ndjson' or 'msgpack' (requires msgpack)
+    'FORMAT': 'ndjson',
+    # Threads compressing and writing staged files
+    'WRITERS': 2,
+    'COMPRESSION_LEVEL': 3,
+    # Keep the staged files of successful flows (those of failed flows are always kept)
+    'KEEP': False,
+    # Staged runs older than this are removed when a staged run starts
+    'MAX_AGE_DAYS': 7
+}
+
+QUERY_PLAN_CONFIG = {
+    # Tables with at least this many (estimated) rows must not be read with a
+    # sequential scan by the extract queries
+    'BIG_TABLE_ROWS': 100_000,
+    # Plans are checked for an incremental window of the latest sales of this size
+    'WINDOW_SALES': 10_000,
+    # A plan whose total cost exceeds its baseline cost by this factor is a regression
+    'COST_TOLERANCE': 1.5,
+    'BASELINE_PATH': 'reports/query_plan_baseline.json'
+}
+
+METRICS_CONFIG = {
+    # Record peak Python memory per stage with tracemalloc (slows allocations down)
+    'TRACE_MEMORY': False,
+    # Names of the flows to run under cProfile
+    'PROFILE_FLOWS': [],
+    # Functions listed in the profile of a flow
+    'PROFILE_TOP': 20,
+    # Also write the run's metrics in OpenMetrics text format next to the JSON report
+    'OPENMETRICS': True
+}
+
 LOGGING_CONFIG = {
     'level': 'INFO',
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
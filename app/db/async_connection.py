@@ -0,0 +1,58 @@
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient
+from pymongo.server_api import ServerApi
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from .postgree_connection import _connection_kwargs
+
+logger = logging.getLogger(__name__)
+
+async def create_async_postgres_pool(min_size: int = 1, max_size: int = 10):
+    """
+    Create an asyncpg connection pool for the PostgreSQL configured in .env.
+
+    The pool belongs to the running event loop: create it inside the loop
+    that uses it and close it before the loop ends.
+    """
+    if asyncpg is None:
+        raise ImportError("asyncpg is required for the async pipeline mode (pip install asyncpg)")
+    kwargs = _connection_kwargs()
+    try:
+        pool = await asyncpg.create_pool(
+            database=kwargs['dbname'],
+            user=kwargs['user'],
+            password=kwargs['password'],
+            host=kwargs['host'],
+            port=kwargs['port'],
+            min_size=min_size,
+            max_size=max_size
+        )
+        logger.info(f"Async PostgreSQL connection pool created (min={min_size}, max={max_size}).")
+        return pool
+    except Exception as e:
+        logger.error(f"Error creating async PostgreSQL pool: {e}")
+        raise
+
+async def create_async_mongo_client() -> AsyncMongoClient:
+    """Create an AsyncMongoClient for MONGODB_URI and check the connection."""
+    load_dotenv()
+    uri = os.getenv('MONGODB_URI')
+
+    if not uri:
+        logger.error("MONGODB_URI not found in environment variables")
+        raise ValueError("MONGODB_URI not found in environment variables")
+
+    try:
+        client = AsyncMongoClient(uri, server_api=ServerApi('1'))
+        await client.admin.command('ping')
+        logger.info("Async connection to MongoDB established successfully.")
+        return client
+    except Exception as e:
+        logger.error(f"Error connecting to MongoDB: {e}")
+        raise
@@ -0,0 +1,238 @@
+import argparse
+import io
+import random
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from faker import Faker
+from psycopg2.extras import execute_values
+
+from postgree_connection import get_new_postgres_connection
+from populate import PRODUTOS_POR_CATEGORIA, populate_categorias
+from models import sales_tables_partitioned
+
+# Sales generated and copied per round trip
+COPY_CHUNK_SIZE = 50_000
+# Distinct first and last names of the generated clients
+NAME_POOL_SIZE = 500
+EMAIL_DOMAINS = ['example.com', 'example.org', 'mail.test', 'shop.test']
+
+def _ascii_slug(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ''.join(char for char in text.lower() if char.isalnum())
+
+def name_pools(seed: int, size: int = NAME_POOL_SIZE):
+    """Male first names, female first names and last names, drawn once with Faker."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return (
+        [fake.first_name_male() for _ in range(size)],
+        [fake.first_name_female() for _ in range(size)],
+        [fake.last_name() for _ in range(size)]
+    )
+
+def _copy(cur, table: str, columns: str, rows) -> None:
+    """COPY tab-separated `rows` (already formatted lines) into `table`."""
+    buffer = io.StringIO()
+    buffer.writelines(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+
+def _max_id(cur, table: str) -> int:
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cur.fetchone()[0]
+
+def _sync_sequence(cur, table: str) -> None:
+    """Move the SERIAL sequence of `table` past the explicitly inserted ids."""
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+    )
+
+def generate_clients(cur, num_clients: int, seed: int) -> None:
+    """COPY `num_clients` clients, half men and half women, built from the name pools."""
+    rng = random.Random(seed)
+    men, women, last_names = name_pools(seed)
+    today = date.today()
+    first_id = _max_id(cur, 'clientes') + 1
+
+    for chunk_start in range(0, num_clients, COPY_CHUNK_SIZE):
+        rows = []
+        for client_id in range(first_id + chunk_start, first_id + min(chunk_start + COPY_CHUNK_SIZE, num_clients)):
+            gender = 'M' if client_id % 2 else 'F'
+            first_name = rng.choice(men if gender == 'M' else women)
+            last_name = rng.choice(last_names)
+            age = rng.randint(18, 80)
+            birthdate = today - timedelta(days=age * 365 + rng.randrange(365))
+            email = f"{_ascii_slug(first_name)}.{_ascii_slug(last_name)}{client_id}@{rng.choice(EMAIL_DOMAINS)}"
+            rows.append(
+                f"{client_id}\t{first_name} {last_name}\t{email}\t{gender}\t{age}\t"
+                f"{birthdate}\t{today - timedelta(days=rng.randrange(730))}\n"
+            )
+        _copy(cur, 'clientes', 'id, nome, email, gender, age, data_nascimento, data_cadastro', rows)
+
+    _sync_sequence(cur, 'clientes')
+    print(f"{num_clients} clients generated")
+
+def generate_products(cur, num_products: int, seed: int) -> None:
+    """
+    Insert `num_products` products cycling through the catalog of
+    `populate.py`; names repeat with a numeric suffix past its size.
+    """
+    rng = random.Random(seed)
+    cur.execute("SELECT id, nome FROM categorias")
+    categorias = {nome: id_categoria for id_categoria, nome in cur.fetchall()}
+    if not categorias:
+        populate_categorias(cur)
+        cur.execute("SELECT id, nome FROM categorias")
+        categorias = {nome: id_categoria for id_categoria, nome in cur.fetchall()}
+
+    catalog = [
+        (nome_produto, categorias[categoria])
+        for categoria, produtos in PRODUTOS_POR_CATEGORIA.items()
+        for nome_produto in produtos
+    ]
+    rows = []
+    for n in range(num_products):
+        nome_produto, id_categoria = catalog[n % len(catalog)]
+        if n >= len(catalog):
+            nome_produto = f"{nome_produto} {n // len(catalog) + 1}"
+        rows.append((nome_produto, rng.randint(1000, 200000) / 100, id_categoria))
+
+    execute_values(cur, "INSERT INTO produtos (nome, preco, id_categoria) VALUES %s", rows)
+    print(f"{num_products} products generated")
+
+def generate_sales_partition(
+        partition: int,
+        first_sale_id: int,
+        num_sales: int,
+        seed: int,
+        basket_weights: list,
+        days: int = 365
+        ) -> int:
+    """
+    Generate and COPY `num_sales` sales with ids starting at `first_sale_id`,
+    with their items. Each partition has its own connection and random
+    generator (seeded from `seed` and the partition number), so the data does
+    not depend on how many partitions run at the same time.
+
+    `basket_weights[n]` is the relative frequency of sales with n + 1 items.
+
+    Returns:
+        int: number of items generated
+    """
+    rng = random.Random(seed * 1_000_003 + partition)
+    conn = get_new_postgres_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM clientes ORDER BY id")
+        clientes_ids = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT id, preco FROM produtos ORDER BY id")
+        # Prices in cents, so totals are exact without Decimal arithmetic
+        produtos = [(id_produto, int(round(preco * 100))) for id_produto, preco in cur.fetchall()]
+
+        sizes = range(1, min(len(basket_weights), len(produtos)) + 1)
+        cum_weights = []
+        total = 0
+        for weight in basket_weights[:len(sizes)]:
+            total += weight
+            cum_weights.append(total)
+        today = date.today()
+        # Partitioned items carry the date of their sale
+        partitioned = sales_tables_partitioned(cur)
+        itens_columns = 'id_venda, id_produto, quantidade, preco_unitario'
+        if partitioned:
+            itens_columns += ', data_venda'
+
+        num_items = 0
+        for chunk_start in range(0, num_sales, COPY_CHUNK_SIZE):
+            vendas_rows = []
+            itens_rows = []
+            chunk_end = min(chunk_start + COPY_CHUNK_SIZE, num_sales)
+            for id_venda in range(first_sale_id + chunk_start, first_sale_id + chunk_end):
+                itens = rng.sample(produtos, k=rng.choices(sizes, cum_weights=cum_weights)[0])
+                valor_total = 0
+                itens_venda = []
+                for id_produto, preco in itens:
+                    quantidade = rng.randint(1, 3)
+                    valor_total += preco * quantidade
+                    itens_venda.append(f"{id_venda}\t{id_produto}\t{quantidade}\t{preco // 100}.{preco % 100:02d}")
+                id_cliente = rng.choice(clientes_ids)
+                data_venda = today - timedelta(days=rng.randrange(days))
+                vendas_rows.append(
+                    f"{id_venda}\t{id_cliente}\t{data_venda}\t{valor_total // 100}.{valor_total % 100:02d}\n"
+                )
+                suffix = f"\t{data_venda}\n" if partitioned else "\n"
+                itens_rows.extend(item + suffix for item in itens_venda)
+            _copy(cur, 'vendas', 'id, id_cliente, data_venda, valor_total', vendas_rows)
+            _copy(cur, 'itens_venda', itens_columns, itens_rows)
+            conn.commit()
+            num_items += len(itens_rows)
+        cur.close()
+        return num_items
+    finally:
+        conn.close()
+
+def generate_sales(num_sales: int, seed: int, basket_weights: list, partitions: int = 1, workers: int = 1) -> None:
+    """Generate `num_sales` sales split into `partitions` id ranges, `workers` of them at a time."""
+    conn = get_new_postgres_connection()
+    try:
+        cur = conn.cursor()
+        first_sale_id = _max_id(cur, 'vendas') + 1
+        cur.close()
+    finally:
+        conn.close()
+
+    size, remainder = divmod(num_sales, partitions)
+    bounds = []
+    start = first_sale_id
+    for partition in range(partitions):
+        count = size + (1 if partition < remainder else 0)
+        bounds.append((partition, start, count))
+        start += count
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_sales_partition, partition, start, count, seed, basket_weights)
+            for partition, start, count in bounds if count
+        ]
+        num_items = sum(future.result() for future in futures)
+
+    conn = get_new_postgres_connection()
+    try:
+        cur = conn.cursor()
+        _sync_sequence(cur, 'vendas')
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    print(f"{num_sales} sales and {num_items} sales items generated")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk synthetic data generator for benchmark-scale datasets")
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--sales", type=int, default=100_000)
+    parser.add_argument("--basket-weights", default="1,1,1,1,1,1,1,1",
+                        help="Comma separated relative frequency of sales with 1, 2, 3... items")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--partitions", type=int, default=4, help="Id ranges the sales are split into")
+    parser.add_argument("--workers", type=int, default=4, help="Partitions generated at the same time")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    basket_weights = [float(weight) for weight in args.basket_weights.split(",")]
+    start = time.perf_counter()
+
+    conn = get_new_postgres_connection()
+    cur = conn.cursor()
+    generate_clients(cur, args.clients, args.seed)
+    generate_products(cur, args.products, args.seed)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    generate_sales(args.sales, args.seed, basket_weights, args.partitions, args.workers)
+    print(f"Successfully generated the dataset in {time.perf_counter() - start:.1f}s!")
@@ -0,0 +1,108 @@
+import argparse
+import logging
+
+from postgree_connection import get_new_postgres_connection
+from models import create_tables
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+def create_extract_indexes(cur):
+    """
+    Indexes on the join and filter columns of the extract queries.
+
+    `itens_venda (id_venda)` carries the other columns read through it, so
+    the items of a range of orders come from an index-only scan; the
+    `(id_produto, id_venda)` index serves joins that start from products.
+    """
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS itens_venda_id_venda_idx
+            ON itens_venda (id_venda) INCLUDE (id_produto, quantidade, preco_unitario);
+        CREATE INDEX IF NOT EXISTS itens_venda_id_produto_idx ON itens_venda (id_produto, id_venda);
+        CREATE INDEX IF NOT EXISTS vendas_id_cliente_idx ON vendas (id_cliente);
+        CREATE INDEX IF NOT EXISTS vendas_data_venda_idx ON vendas (data_venda);
+        ANALYZE vendas;
+        ANALYZE itens_venda;
+    """)
+
+# (version, description, migration applied with a cursor), in version order.
+# Applied migrations are recorded in MIGRATIONS_TABLE; never edit one that
+# was released, add a new version instead.
+MIGRATIONS = [
+    (1, 'base schema', create_tables),
+    (2, 'indexes for the extract joins and filters', create_extract_indexes),
+]
+
+def _ensure_migrations_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(200),
+            applied_at TIMESTAMP DEFAULT now()
+        );
+    """)
+
+def applied_versions(cur) -> set:
+    """Versions already recorded in the migrations table."""
+    _ensure_migrations_table(cur)
+    cur.execute(f"SELECT version FROM {MIGRATIONS_TABLE}")
+    return {row[0] for row in cur.fetchall()}
+
+def apply_migrations(conn, target: int = None) -> list:
+    """
+    Apply the pending migrations up to `target` (all of them by default),
+    each in its own transaction, and return the applied versions.
+    """
+    cur = conn.cursor()
+    try:
+        applied = applied_versions(cur)
+        conn.commit()
+        done = []
+        for version, description, migrate in MIGRATIONS:
+            if version in applied or (target is not None and version > target):
+                continue
+            try:
+                # Serializes concurrent runs; released at the end of the transaction
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (MIGRATIONS_TABLE,))
+                if version in applied_versions(cur):
+                    conn.rollback()
+                    continue
+                migrate(cur)
+                cur.execute(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error applying migration {version} ({description}): {e}")
+                raise
+            logger.info(f"Applied migration {version}: {description}")
+            done.append(version)
+        return done
+    finally:
+        cur.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply the versioned schema and index migrations")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations only")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    conn = get_new_postgres_connection()
+    try:
+        if args.status:
+            cur = conn.cursor()
+            applied = applied_versions(cur)
+            conn.commit()
+            cur.close()
+            for version, description, _ in MIGRATIONS:
+                print(f"{version:>4}  {'applied' if version in applied else 'pending':<8} {description}")
+        else:
+            done = apply_migrations(conn, args.target)
+            print(f"Applied migrations: {done}" if done else "Schema is up to date")
+    finally:
+        conn.close()
@@ -1,6 +1,19 @@
+import argparse
+from datetime import date
+
 from postgree_connection import get_new_postgres_connection
 
-def create_tables(cur):
+# Months of partitions created before and after the current one
+PARTITION_MONTHS_BACK = 24
+PARTITION_MONTHS_AHEAD = 3
+
+def create_tables(cur, partitioned: bool = False):
+    """
+    Create the tables. With `partitioned`, `vendas` and `itens_venda` are
+    range-partitioned by `data_venda` month (see `create_month_partitions`);
+    `itens_venda` then carries the `data_venda` of its sale, so the items
+    of a sale live in the same month as the sale.
+    """
     cur.execute("""
         CREATE TABLE IF NOT EXISTS clientes (
             id SERIAL PRIMARY KEY,
@@ -21,26 +34,96 @@ def create_tables(cur):
             preco NUMERIC(10,2),
             id_categoria INTEGER REFERENCES categorias(id)
         );
-        CREATE TABLE IF NOT EXISTS vendas (
-            id SERIAL PRIMARY KEY,
-            id_cliente INTEGER REFERENCES clientes(id),
-            data_venda DATE,
-            valor_total NUMERIC(10,2)
-        );
-        CREATE TABLE IF NOT EXISTS itens_venda (
-            id SERIAL PRIMARY KEY,
-            id_venda INTEGER REFERENCES vendas(id),
-            id_produto INTEGER REFERENCES produtos(id),
-            quantidade INTEGER,
-            preco_unitario NUMERIC(10,2)
-        );
     """)
+    if partitioned:
+        # Unique constraints of a partitioned table must include its partition key
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS vendas (
+                id SERIAL,
+                id_cliente INTEGER REFERENCES clientes(id),
+                data_venda DATE NOT NULL,
+                valor_total NUMERIC(10,2),
+                PRIMARY KEY (id, data_venda)
+            ) PARTITION BY RANGE (data_venda);
+            CREATE TABLE IF NOT EXISTS itens_venda (
+                id SERIAL,
+                id_venda INTEGER NOT NULL,
+                data_venda DATE NOT NULL,
+                id_produto INTEGER REFERENCES produtos(id),
+                quantidade INTEGER,
+                preco_unitario NUMERIC(10,2),
+                PRIMARY KEY (id, data_venda),
+                FOREIGN KEY (id_venda, data_venda) REFERENCES vendas (id, data_venda)
+            ) PARTITION BY RANGE (data_venda);
+        """)
+    else:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS vendas (
+                id SERIAL PRIMARY KEY,
+                id_cliente INTEGER REFERENCES clientes(id),
+                data_venda DATE,
+                valor_total NUMERIC(10,2)
+            );
+            CREATE TABLE IF NOT EXISTS itens_venda (
+                id SERIAL PRIMARY KEY,
+                id_venda INTEGER REFERENCES vendas(id),
+                id_produto INTEGER REFERENCES produtos(id),
+                quantidade INTEGER,
+                preco_unitario NUMERIC(10,2)
+            );
+        """)
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    """Suffix of the partitions holding the sales of `month`: p<YYYYMM>."""
+    return f"p{month.year:04d}{month.month:02d}"
+
+def create_month_partitions(cur, first_month: date, last_month: date):
+    """
+    Create the `vendas_p<YYYYMM>` and `itens_venda_p<YYYYMM>` partitions of
+    every month from `first_month` to `last_month` that does not exist yet.
+    """
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        for table in ('vendas', 'itens_venda'):
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_{partition_name(month)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+        month = next_month
+
+def sales_tables_partitioned(cur) -> bool:
+    """Whether `itens_venda` was created partitioned (and so has a `data_venda` column)."""
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('itens_venda'))"
+    )
+    return cur.fetchone()[0]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create the tables")
+    parser.add_argument(
+        "--partitioned", action="store_true",
+        help="Create vendas and itens_venda partitioned by data_venda month; rerun to add upcoming months"
+    )
+    parser.add_argument("--months-back", type=int, default=PARTITION_MONTHS_BACK)
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     conn = get_new_postgres_connection()
     cur = conn.cursor()
-    create_tables(cur)
+    create_tables(cur, args.partitioned)
+    if args.partitioned:
+        this_month = date.today().replace(day=1)
+        create_month_partitions(
+            cur, _add_months(this_month, -args.months_back), _add_months(this_month, args.months_ahead)
+        )
     conn.commit()
     cur.close()
     conn.close()
-    print("Successfully created tables!")
\ No newline at end of file
+    print("Successfully created tables!")
@@ -4,25 +4,32 @@ from pymongo.server_api import ServerApi
 from dotenv import load_dotenv
 from contextlib import contextmanager
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
 class MongoDBConnection:
     _instance = None
     _client = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_client(cls):
+        # MongoClient is thread-safe; only its creation needs a lock
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._lock:
+                if cls._instance is None:
+                    cls()
         return cls._client
 
     def __init__(self):
         if MongoDBConnection._instance is not None:
             raise Exception("This class is a singleton!")
         else:
-            MongoDBConnection._instance = self
             self._connect()
+            # Published only once connected, so other threads never see a
+            # half-initialized singleton
+            MongoDBConnection._instance = self
 
     def _connect(self):
         load_dotenv()
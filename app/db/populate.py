@@ -2,6 +2,7 @@ from postgree_connection import get_new_postgres_connection
 from faker import Faker
 import random
 from datetime import date
+from models import sales_tables_partitioned
 
 fake = Faker()
 
@@ -55,29 +56,29 @@ def populate_categorias(cur):
             (categoria,)
         )
 
-def populate_produtos(cur):
-    produtos_por_categoria = {
-        'Eletrônicos': ['Notebook', 'Smart TV', 'Fone de Ouvido', 'Tablet'],
-        'Livros': ['Romance', 'Biografia', 'HQ', 'Didático'],
-        'Roupas': ['Camiseta', 'Calça', 'Vestido', 'Jaqueta'],
-        'Alimentos': ['Arroz', 'Feijão', 'Chocolate', 'Café'],
-        'Móveis': ['Sofá', 'Mesa', 'Cadeira', 'Estante'],
-        'Brinquedos': ['Quebra-cabeça', 'Boneca', 'Carrinho', 'Jogo de Tabuleiro'],
-        'Esportes': ['Bola', 'Tênis', 'Bicicleta', 'Raquete'],
-        'Beleza': ['Perfume', 'Batom', 'Shampoo', 'Creme'],
-        'Saúde': ['Vitamínico', 'Termômetro', 'Máscara', 'Curativo'],
-        'Automotivo': ['Pneu', 'Óleo', 'Lâmpada', 'Bateria'],
-        'Jardinagem': ['Vaso', 'Pá', 'Semente', 'Adubo'],
-        'Ferramentas': ['Martelo', 'Chave de Fenda', 'Alicate', 'Serrote'],
-        'Pet Shop': ['Ração', 'Coleira', 'Brinquedo Pet', 'Caminha'],
-        'Informática': ['Mouse', 'Teclado', 'Monitor', 'HD Externo'],
-        'Celulares': ['Smartphone', 'Carregador', 'Capa', 'Fone Bluetooth']
-    }
+PRODUTOS_POR_CATEGORIA = {
+    'Eletrônicos': ['Notebook', 'Smart TV', 'Fone de Ouvido', 'Tablet'],
+    'Livros': ['Romance', 'Biografia', 'HQ', 'Didático'],
+    'Roupas': ['Camiseta', 'Calça', 'Vestido', 'Jaqueta'],
+    'Alimentos': ['Arroz', 'Feijão', 'Chocolate', 'Café'],
+    'Móveis': ['Sofá', 'Mesa', 'Cadeira', 'Estante'],
+    'Brinquedos': ['Quebra-cabeça', 'Boneca', 'Carrinho', 'Jogo de Tabuleiro'],
+    'Esportes': ['Bola', 'Tênis', 'Bicicleta', 'Raquete'],
+    'Beleza': ['Perfume', 'Batom', 'Shampoo', 'Creme'],
+    'Saúde': ['Vitamínico', 'Termômetro', 'Máscara', 'Curativo'],
+    'Automotivo': ['Pneu', 'Óleo', 'Lâmpada', 'Bateria'],
+    'Jardinagem': ['Vaso', 'Pá', 'Semente', 'Adubo'],
+    'Ferramentas': ['Martelo', 'Chave de Fenda', 'Alicate', 'Serrote'],
+    'Pet Shop': ['Ração', 'Coleira', 'Brinquedo Pet', 'Caminha'],
+    'Informática': ['Mouse', 'Teclado', 'Monitor', 'HD Externo'],
+    'Celulares': ['Smartphone', 'Carregador', 'Capa', 'Fone Bluetooth']
+}
 
+def populate_produtos(cur):
     cur.execute("SELECT id, nome FROM categorias")
     categorias = {nome: id_categoria for id_categoria, nome in cur.fetchall()}
 
-    for categoria, produtos in produtos_por_categoria.items():
+    for categoria, produtos in PRODUTOS_POR_CATEGORIA.items():
         id_categoria = categorias[categoria]
         for nome_produto in produtos:
             preco = round(random.uniform(10, 2000), 2)
@@ -92,6 +93,8 @@ def populate_vendas_e_itens(cur, num_vendas=200, max_itens=8):
 
     cur.execute("SELECT id, preco FROM produtos")
     produtos = cur.fetchall()
+    # Partitioned items carry the date of their sale
+    partitioned = sales_tables_partitioned(cur)
 
     for _ in range(num_vendas):
         id_cliente = random.choice(clientes_ids)
@@ -110,15 +113,23 @@ def populate_vendas_e_itens(cur, num_vendas=200, max_itens=8):
             quantidade = random.randint(1, 3)
             preco_unitario = preco
             valor_total += preco_unitario * quantidade
-            cur.execute(
-                "INSERT INTO itens_venda (id_venda, id_produto, quantidade, preco_unitario) " \
-                "VALUES (%s, %s, %s, %s)",
-                (id_venda, id_produto, quantidade, preco_unitario)
-            )
+            if partitioned:
+                cur.execute(
+                    "INSERT INTO itens_venda (id_venda, id_produto, quantidade, preco_unitario, data_venda) " \
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    (id_venda, id_produto, quantidade, preco_unitario, data_venda)
+                )
+            else:
+                cur.execute(
+                    "INSERT INTO itens_venda (id_venda, id_produto, quantidade, preco_unitario) " \
+                    "VALUES (%s, %s, %s, %s)",
+                    (id_venda, id_produto, quantidade, preco_unitario)
+                )
 
+        # The date lets a partitioned vendas prune to the sale's month
         cur.execute(
-            "UPDATE vendas SET valor_total = %s WHERE id = %s",
-            (valor_total, id_venda)
+            "UPDATE vendas SET valor_total = %s WHERE id = %s AND data_venda = %s",
+            (valor_total, id_venda, data_venda)
         )
 
     print("Sales and sales_items populated successfully!")
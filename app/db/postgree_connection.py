@@ -1,71 +1,206 @@
 import logging
+import time
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 from contextlib import contextmanager
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
-class PostgresConnection:   
+def _connection_kwargs():
+    load_dotenv()
+    return dict(
+        dbname=os.getenv('POSTGRES_DB'),
+        user=os.getenv('POSTGRES_USER'),
+        password=os.getenv('POSTGRES_PASSWORD'),
+        host=os.getenv('POSTGRES_HOST'),
+        port=os.getenv('POSTGRES_PORT')
+    )
+
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections built on ThreadedConnectionPool.
+
+    Unlike the bare ThreadedConnectionPool, `getconn` waits (up to `timeout`
+    seconds) for a connection to be returned when all `max_size` are in use.
+    Connections idle for longer than `health_check_interval` are pinged
+    before being handed out, and broken connections are discarded and
+    replaced. Wait times and utilization are tracked in `stats()`.
+    """
     _instance = None
-    _connection = None
+    _lock = threading.Lock()
+
+    def __init__(self, min_size=1, max_size=10, timeout=30.0, health_check_interval=30.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._pool = ThreadedConnectionPool(min_size, max_size, **_connection_kwargs())
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats_lock = threading.Lock()
+        self._last_used = {}
+        self._pid = os.getpid()
+        self._created_at = time.perf_counter()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._busy_seconds = 0.0
+        self._last_change = self._created_at
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+        logger.info(f"PostgreSQL connection pool created (min={min_size}, max={max_size}).")
 
     @classmethod
-    def get_connection(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._connection
-    
-    def __init__(self):
-        if PostgresConnection._instance is not None:
-            raise Exception("This class is a singleton!")
-        else:
-            PostgresConnection._instance = self
-            self._connect()
-    
-    def _connect(self):
-        load_dotenv()
+    def get_pool(cls):
+        # A pool inherited through fork() shares sockets with the parent; each
+        # process builds its own.
+        if cls._instance is None or cls._instance._pid != os.getpid():
+            with cls._lock:
+                if cls._instance is None or cls._instance._pid != os.getpid():
+                    cls._instance = cls(
+                        min_size=int(os.getenv('POSTGRES_POOL_MIN_SIZE', 1)),
+                        max_size=int(os.getenv('POSTGRES_POOL_MAX_SIZE', 10)),
+                        timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', 30)),
+                        health_check_interval=float(os.getenv('POSTGRES_POOL_HEALTH_CHECK_INTERVAL', 30))
+                    )
+        return cls._instance
+
+    def _track_in_use(self, delta):
+        now = time.perf_counter()
+        self._busy_seconds += self._in_use * (now - self._last_change)
+        self._last_change = now
+        self._in_use += delta
+        self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        # Fresh or recently used connections are trusted without a round trip
+        if last_used is None or time.perf_counter() - last_used < self.health_check_interval:
+            return True
         try:
-            PostgresConnection._connection = psycopg2.connect(
-                dbname=os.getenv('POSTGRES_DB'),
-                user=os.getenv('POSTGRES_USER'),
-                password=os.getenv('POSTGRES_PASSWORD'),
-                host=os.getenv('POSTGRES_HOST'),
-                port=os.getenv('POSTGRES_PORT')
-            )
-            logger.info("Connection to PostgreSQL established.")
-        except Exception as e:
-            logger.error(f"Error connecting to PostgreSQL: {e}")
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check a healthy connection out of the pool, waiting if none is free."""
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self._timeouts += 1
+            raise TimeoutError(f"No PostgreSQL connection available after {self.timeout}s")
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                logger.warning("Discarding broken PostgreSQL connection and reconnecting.")
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                with self._stats_lock:
+                    self._reconnects += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
             raise
 
+        waited = time.perf_counter() - wait_start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._track_in_use(1)
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection; broken ones are closed instead of reused."""
+        broken = conn.closed or conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN
+        self._last_used[id(conn)] = time.perf_counter()
+        try:
+            self._pool.putconn(conn, close=broken)
+        finally:
+            # Closed when broken or, past `min_size` idle connections, by the
+            # pool itself; its id may then be reused by a new connection
+            if conn.closed:
+                self._last_used.pop(id(conn), None)
+            with self._stats_lock:
+                self._track_in_use(-1)
+            self._slots.release()
+
+    def stats(self):
+        """Checkout wait times and utilization since the pool was created."""
+        with self._stats_lock:
+            self._track_in_use(0)
+            elapsed = self._last_change - self._created_at
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'wait_avg_ms': self._wait_total / self._checkouts * 1000 if self._checkouts else 0.0,
+                'wait_max_ms': self._wait_max * 1000,
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects,
+                # Average share of the pool checked out over its lifetime
+                'utilization': self._busy_seconds / (elapsed * self.max_size) if elapsed > 0 else 0.0
+            }
+
+    def closeall(self):
+        self._pool.closeall()
+        self._last_used.clear()
+        logger.info("Connection to PostgreSQL closed.")
+
     @classmethod
     def close_connection(cls):
-        if cls._connection:
-            cls._connection.close()
-            cls._connection = None
-            cls._instance = None
-            logger.info("Connection to PostgreSQL closed.")
+        """Close every connection of the current pool."""
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.closeall()
+                cls._instance = None
 
 @contextmanager
-def postgres_cursor(cursor_factory=None):
-    """Context manager for using a PostgreSQL cursor."""
-    conn = get_postgres_connection()
-    cursor = None
+def postgres_connection():
+    """Context manager that checks a connection out of the pool and returns it."""
+    pool = get_postgres_pool()
+    conn = pool.getconn()
     try:
-        if cursor_factory:
-            cursor = conn.cursor(cursor_factory=cursor_factory)
-        else:
-            cursor = conn.cursor()
-        yield cursor
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"Database error: {e}")
-        raise
+        yield conn
     finally:
-        if cursor:
-            cursor.close()
+        pool.putconn(conn)
+
+@contextmanager
+def postgres_cursor(cursor_factory=None):
+    """Context manager for using a PostgreSQL cursor on a pooled connection."""
+    with postgres_connection() as conn:
+        cursor = None
+        try:
+            if cursor_factory:
+                cursor = conn.cursor(cursor_factory=cursor_factory)
+            else:
+                cursor = conn.cursor()
+            yield cursor
+            conn.commit()
+        except GeneratorExit:
+            # The consumer stopped iterating early; drop the open transaction.
+            conn.rollback()
+            raise
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            if cursor and not cursor.closed:
+                cursor.close()
 
 @contextmanager
 def dict_cursor():
@@ -73,20 +208,48 @@ def dict_cursor():
     with postgres_cursor(RealDictCursor) as cursor:
         yield cursor
 
-def get_postgres_connection():
-    return PostgresConnection.get_connection()
+@contextmanager
+def server_side_cursor(name, itersize=2000, cursor_factory=None):
+    """
+    Context manager for a named (server-side) PostgreSQL cursor.
+
+    Rows stay on the server and are pulled `itersize` at a time, so the
+    client never holds the whole result set.
+    """
+    with postgres_connection() as conn:
+        cursor = None
+        try:
+            cursor = conn.cursor(name=name, cursor_factory=cursor_factory)
+            cursor.itersize = itersize
+            yield cursor
+            cursor.close()
+            conn.commit()
+        except GeneratorExit:
+            # The consumer stopped iterating early; drop the open transaction.
+            conn.rollback()
+            raise
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            if cursor and not cursor.closed:
+                cursor.close()
+
+def get_postgres_pool():
+    return PostgresConnectionPool.get_pool()
+
+def get_postgres_pool_stats():
+    """Stats of this process' pool, or None if no connection was made yet."""
+    pool = PostgresConnectionPool._instance
+    if pool is None or pool._pid != os.getpid():
+        return None
+    return pool.stats()
 
 def get_new_postgres_connection():
-    """Create a new PostgreSQL connection without using the singleton."""
-    load_dotenv()
+    """Create a new PostgreSQL connection outside of the pool."""
     try:
-        connection = psycopg2.connect(
-            dbname=os.getenv('POSTGRES_DB'),
-            user=os.getenv('POSTGRES_USER'),
-            password=os.getenv('POSTGRES_PASSWORD'),
-            host=os.getenv('POSTGRES_HOST'),
-            port=os.getenv('POSTGRES_PORT')
-        )
+        connection = psycopg2.connect(**_connection_kwargs())
         logger.info("New PostgreSQL connection created.")
         return connection
     except Exception as e:
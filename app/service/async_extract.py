@@ -0,0 +1,186 @@
+import logging
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from ..config import EXTRACT_CONFIG
+from .records import ItemRecord, OrderRecord
+from .extract import (
+    MIN_PAIR_FREQUENCY, TRANSACTION_PRODUCTS_QUERY, PRODUCT_PROFILE_COUNTS_QUERY, FREQUENCY_ITEMSETS_QUERY,
+    ORDER_BASKETS_QUERY, ORDERS_PAGE_QUERY, ORDER_ITEMS_QUERY
+)
+
+logger = logging.getLogger(__name__)
+
+_NAMED_PARAMETER = re.compile(r"%\((\w+)\)s")
+
+def asyncpg_query(query: str) -> Tuple[str, List[str]]:
+    """
+    Rewrite a psycopg2 query with %(name)s parameters for asyncpg: returns
+    the query with $1, $2... placeholders and the parameter names in order.
+    Every named parameter of the extract queries is an integer, which is
+    stated explicitly since `$n IS NULL` alone does not give Postgres a type.
+    """
+    names = []
+
+    def placeholder(match):
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}::integer"
+
+    return _NAMED_PARAMETER.sub(placeholder, query), names
+
+async def _fetch(pool, query: str, params: Dict, label: str) -> list:
+    """Run `query` on a pooled connection and return its rows as tuples."""
+    sql, names = asyncpg_query(query)
+    try:
+        rows = await pool.fetch(sql, *(params[name] for name in names))
+        logger.info(f"Fetched {len(rows)} {label}")
+        return [tuple(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Error fetching {label}: {e}")
+        raise
+
+async def _stream(pool, query: str, params: Dict, itersize: int, label: str) -> AsyncIterator[list]:
+    """
+    Async version of a server-side cursor: yields the rows of `query` in
+    batches of at most `itersize` tuples, holding one pooled connection.
+    """
+    sql, names = asyncpg_query(query)
+    try:
+        total = 0
+        async with pool.acquire() as conn:
+            # asyncpg cursors only live inside a transaction
+            async with conn.transaction():
+                cursor = await conn.cursor(sql, *(params[name] for name in names))
+                while True:
+                    rows = await cursor.fetch(itersize)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    yield [tuple(row) for row in rows]
+        logger.info(f"Streamed {total} {label}")
+    except Exception as e:
+        logger.error(f"Error streaming {label}: {e}")
+        raise
+
+async def fetch_transaction_products_async(pool, since_id: int = 0, until_id: Optional[int] = None) -> list:
+    """Async version of `extract.fetch_transaction_products`."""
+    return await _fetch(
+        pool, TRANSACTION_PRODUCTS_QUERY, {'since_id': since_id, 'until_id': until_id}, "transaction products"
+    )
+
+def stream_transaction_products_async(
+        pool,
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> AsyncIterator[list]:
+    """Async version of `extract.stream_transaction_products`."""
+    return _stream(
+        pool, TRANSACTION_PRODUCTS_QUERY, {'since_id': since_id, 'until_id': until_id}, itersize,
+        "transaction products"
+    )
+
+async def fetch_product_profile_counts_async(pool, since_id: int = 0, until_id: Optional[int] = None) -> list:
+    """Async version of `extract.fetch_product_profile_counts`."""
+    return await _fetch(
+        pool, PRODUCT_PROFILE_COUNTS_QUERY, {'since_id': since_id, 'until_id': until_id}, "product profile counts"
+    )
+
+def stream_product_profile_counts_async(
+        pool,
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> AsyncIterator[list]:
+    """Async version of `extract.stream_product_profile_counts`."""
+    return _stream(
+        pool, PRODUCT_PROFILE_COUNTS_QUERY, {'since_id': since_id, 'until_id': until_id}, itersize,
+        "product profile counts"
+    )
+
+async def get_frequency_itemsets_async(
+        pool,
+        min_frequency: int = MIN_PAIR_FREQUENCY,
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> list:
+    """Async version of `extract.get_frequency_itemsets`."""
+    return await _fetch(
+        pool, FREQUENCY_ITEMSETS_QUERY,
+        {'min_frequency': min_frequency, 'since_id': since_id, 'until_id': until_id}, "frequency itemsets"
+    )
+
+def stream_frequency_itemsets_async(
+        pool,
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        min_frequency: int = MIN_PAIR_FREQUENCY,
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> AsyncIterator[list]:
+    """Async version of `extract.stream_frequency_itemsets`."""
+    return _stream(
+        pool, FREQUENCY_ITEMSETS_QUERY,
+        {'min_frequency': min_frequency, 'since_id': since_id, 'until_id': until_id}, itersize, "frequency itemsets"
+    )
+
+async def fetch_order_baskets_async(pool, since_id: int = 0, until_id: Optional[int] = None) -> list:
+    """Async version of `extract.fetch_order_baskets`."""
+    return await _fetch(pool, ORDER_BASKETS_QUERY, {'since_id': since_id, 'until_id': until_id}, "basket items")
+
+def stream_order_baskets_async(
+        pool,
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> AsyncIterator[list]:
+    """Async version of `extract.stream_order_baskets`."""
+    return _stream(pool, ORDER_BASKETS_QUERY, {'since_id': since_id, 'until_id': until_id}, itersize, "basket items")
+
+async def stream_orders_with_customers_and_items_async(
+        pool,
+        itersize: int = EXTRACT_CONFIG['ORDERS_CHUNK_SIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> AsyncIterator[List[OrderRecord]]:
+    """Async version of `extract.stream_orders_with_customers_and_items`."""
+    page_sql, page_names = asyncpg_query(ORDERS_PAGE_QUERY)
+    items_sql = ORDER_ITEMS_QUERY.replace("%s", "$1::integer[]")
+    try:
+        total_orders = 0
+        total_items = 0
+        last_id = since_id
+        async with pool.acquire() as conn:
+            while True:
+                params = {'last_id': last_id, 'until_id': until_id, 'limit': itersize}
+                rows = await conn.fetch(page_sql, *(params[name] for name in page_names))
+                orders = [OrderRecord(*row) for row in rows]
+                if not orders:
+                    break
+
+                last_id = orders[-1].id
+                items_by_order = {}
+                for order_id, *item in await conn.fetch(items_sql, [order.id for order in orders]):
+                    items_by_order.setdefault(order_id, []).append(ItemRecord(*item))
+                for order in orders:
+                    order.itens = items_by_order.get(order.id, [])
+
+                total_orders += len(orders)
+                total_items += sum(len(o.itens) for o in orders)
+                yield orders
+        logger.info(f"Streamed {total_orders} orders with {total_items} items")
+    except Exception as e:
+        logger.error(f"Error streaming orders: {e}")
+        raise
+
+async def extract_orders_with_customers_and_items_async(
+        pool,
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> list:
+    """Async version of `extract.extract_orders_with_customers_and_items`."""
+    orders = []
+    async for chunk in stream_orders_with_customers_and_items_async(
+            pool, EXTRACT_CONFIG['ORDERS_CHUNK_SIZE'], since_id, until_id):
+        orders.extend(chunk)
+    logger.info(f"Fetched {len(orders)} orders with {sum(len(o.itens) for o in orders)} items")
+    return orders
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable
+from pymongo.errors import BulkWriteError
+from ..config import ASYNC_CONFIG, LOAD_CONFIG
+from .codec import warehouse_collection
+from .load import _envelope_documents, _latency_summary, _order_replacements
+
+logger = logging.getLogger(__name__)
+
+async def _write_batches_async(
+        items: Iterable[Any],
+        batch_size: int,
+        concurrency: int,
+        write_batch,
+        collection_name: str
+    ) -> Dict[str, Any]:
+    """
+    Async version of `load._write_batches`: up to `concurrency` `write_batch`
+    calls of at most `batch_size` items in flight.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    counts = {'loaded': 0, 'failed': 0}
+    latencies = []
+    start = time.perf_counter()
+
+    async def write(batch):
+        batch_start = time.perf_counter()
+        try:
+            counts['loaded'] += await write_batch(batch)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            counts['loaded'] += len(batch) - len(errors)
+            counts['failed'] += len(errors)
+            logger.warning(f"{len(errors)} documents failed in batch for {collection_name}")
+        finally:
+            latencies.append(time.perf_counter() - batch_start)
+            slots.release()
+
+    items = iter(items)
+    try:
+        # Any other error cancels the writes in flight and stops the batching
+        async with asyncio.TaskGroup() as group:
+            while True:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    break
+                # Wait for a free slot before building the next batch, so at most
+                # `concurrency` batches are held in memory
+                await slots.acquire()
+                group.create_task(write(batch))
+    except ExceptionGroup as e:
+        raise e.exceptions[0]
+
+    duration = time.perf_counter() - start
+    stats = {
+        'success': counts['failed'] == 0,
+        'documents_loaded': counts['loaded'],
+        'documents_skipped': 0,
+        'documents_failed': counts['failed'],
+        'batches': len(latencies),
+        'duration_seconds': duration,
+        'rows_per_sec': counts['loaded'] / duration if duration > 0 else 0.0,
+        'batch_latency': _latency_summary(latencies)
+    }
+    logger.info(
+        f"Bulk loaded {counts['loaded']} documents into {collection_name} "
+        f"in {stats['batches']} batches ({stats['rows_per_sec']:.0f} rows/sec)"
+    )
+    return stats
+
+async def bulk_insert_documents_async(
+        client,
+        documents: Iterable[Dict[str, Any]],
+        db_name: str,
+        collection_name: str,
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        concurrency: int = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+    ) -> Dict[str, Any]:
+    """
+    Async version of `load.bulk_insert_documents`: unordered `insert_many`
+    calls of at most `batch_size` documents, with up to `concurrency` of them
+    in flight on the AsyncMongoClient `client`.
+
+    Returns:
+        dict: Load statistics, see `load.bulk_insert_documents`.
+    """
+    collection = warehouse_collection(client, db_name, collection_name)
+
+    async def write_batch(batch):
+        result = await collection.insert_many(batch, ordered=False)
+        return len(result.inserted_ids)
+
+    return await _write_batches_async(documents, batch_size, concurrency, write_batch, collection_name)
+
+async def bulk_write_requests_async(
+        client,
+        requests: Iterable[Any],
+        db_name: str,
+        collection_name: str,
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        concurrency: int = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+    ) -> Dict[str, Any]:
+    """
+    Async version of `load.bulk_write_requests` (without guarded upserts),
+    with up to `concurrency` `bulk_write` calls in flight.
+
+    Returns:
+        dict: Load statistics, see `load.bulk_insert_documents`.
+    """
+    collection = warehouse_collection(client, db_name, collection_name)
+
+    async def write_batch(batch):
+        await collection.bulk_write(batch, ordered=False)
+        return len(batch)
+
+    return await _write_batches_async(requests, batch_size, concurrency, write_batch, collection_name)
+
+async def _bulk_load_async(client, data, db_name, collection_name, batch_size, concurrency, label):
+    """Shared error handling for the async bulk loaders."""
+    try:
+        return await bulk_insert_documents_async(
+            client, _envelope_documents(data), db_name, collection_name, batch_size, concurrency
+        )
+    except Exception as e:
+        logger.error(f"Error bulk loading {label} data: {e}")
+        return {'success': False, 'error': str(e)}
+
+async def _insert_one_async(client, data, db_name, collection_name, label) -> bool:
+    """Shared error handling for the async single-document loaders."""
+    try:
+        result = await warehouse_collection(client, db_name, collection_name).insert_one(data)
+        logger.info(f"Loaded {label} data. ID: {result.inserted_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error loading {label} data: {e}")
+        return False
+
+async def load_product_predominant_profile_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-predominant_profile'
+    ) -> bool:
+    """Async version of `load.load_product_predominant_profile`."""
+    return await _insert_one_async(client, data, db_name, collection_name, 'predominant profile')
+
+async def load_most_common_products_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-most_common_products'
+    ) -> bool:
+    """Async version of `load.load_most_common_products`."""
+    return await _insert_one_async(client, data, db_name, collection_name, 'most common products')
+
+async def load_complete_orders_to_dw_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-orders'
+    ) -> bool:
+    """Async version of `load.load_complete_orders_to_dw`."""
+    return await _insert_one_async(client, data, db_name, collection_name, 'orders')
+
+async def bulk_load_product_predominant_profile_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-predominant_profile',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        concurrency: int = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+    ) -> Dict[str, Any]:
+    """Async version of `load.bulk_load_product_predominant_profile`."""
+    return await _bulk_load_async(
+        client, data, db_name, collection_name, batch_size, concurrency, 'predominant profile'
+    )
+
+async def bulk_load_most_common_products_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-most_common_products',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        concurrency: int = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+    ) -> Dict[str, Any]:
+    """Async version of `load.bulk_load_most_common_products`."""
+    return await _bulk_load_async(
+        client, data, db_name, collection_name, batch_size, concurrency, 'most common products'
+    )
+
+async def bulk_load_complete_orders_to_dw_async(
+        client,
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-orders',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        concurrency: int = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+    ) -> Dict[str, Any]:
+    """Async version of `load.bulk_load_complete_orders_to_dw`: orders are replaced by order id."""
+    try:
+        return await bulk_write_requests_async(
+            client, _order_replacements(data), db_name, collection_name, batch_size, concurrency
+        )
+    except Exception as e:
+        logger.error(f"Error bulk loading orders data: {e}")
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import zstandard
+
+from ..config import CACHE_CONFIG
+from .staging import decode_value, encode_value
+
+logger = logging.getLogger(__name__)
+
+_DATA_SUFFIX = ".json.zst"
+_META_SUFFIX = ".meta.json"
+
+def result_cache_key(flow_name: str, fingerprint: Dict[str, Any], settings: Dict[str, Any]) -> str:
+    """Key of a flow's result for a source fingerprint and the settings that shape its output."""
+    payload = json.dumps({"flow": flow_name, "sources": fingerprint, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """
+    On-disk cache of the transformed output of each flow, keyed on a
+    fingerprint of its sources.
+
+    Every flow keeps one entry: a small metadata file (key, whether the
+    output was loaded) and the zstd-compressed output itself. Eviction only
+    removes outputs, so a flow whose sources did not change can still skip
+    its load after its output was evicted.
+    """
+
+    def __init__(
+            self,
+            directory: str = CACHE_CONFIG['DIR'],
+            max_size_mb: float = CACHE_CONFIG['MAX_SIZE_MB'],
+            max_age_days: float = CACHE_CONFIG['MAX_AGE_DAYS'],
+            compression_level: int = CACHE_CONFIG['COMPRESSION_LEVEL']
+        ):
+        self.directory = directory
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.compression_level = compression_level
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, flow_name: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{flow_name}{suffix}")
+
+    def get(self, flow_name: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry of `flow_name` if it matches `key`: its metadata,
+        plus the cached output under 'output' when it was not evicted.
+        """
+        try:
+            with open(self._path(flow_name, _META_SUFFIX)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key:
+            return None
+
+        try:
+            with open(self._path(flow_name, _DATA_SUFFIX), "rb") as f:
+                raw = zstandard.ZstdDecompressor().decompress(f.read())
+            meta["output"] = json.loads(raw, object_hook=decode_value)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached output of {flow_name}: {e}")
+        return meta
+
+    def put(self, flow_name: str, key: str, output: Optional[Dict[str, Any]], loaded: bool = False) -> None:
+        """Replace the entry of `flow_name`; `output` may be None to only record the key."""
+        data_path = self._path(flow_name, _DATA_SUFFIX)
+        meta = {"flow": flow_name, "key": key, "loaded": loaded, "created_at": datetime.now().isoformat()}
+
+        if output is not None:
+            raw = json.dumps(output, default=encode_value).encode()
+            compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(raw)
+            with open(data_path + ".tmp", "wb") as f:
+                f.write(compressed)
+            os.replace(data_path + ".tmp", data_path)
+            meta["size_bytes"] = len(compressed)
+            meta["compression_ratio"] = len(raw) / len(compressed) if compressed else None
+        elif os.path.exists(data_path):
+            os.remove(data_path)
+
+        with open(self._path(flow_name, _META_SUFFIX), "w") as f:
+            json.dump(meta, f)
+        self.evict()
+
+    def mark_loaded(self, flow_name: str, key: str) -> None:
+        """Record that the output cached for `key` is in the warehouse."""
+        meta_path = self._path(flow_name, _META_SUFFIX)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {"flow": flow_name, "key": key, "created_at": datetime.now().isoformat()}
+        if meta.get("key") != key:
+            meta = {"flow": flow_name, "key": key, "created_at": datetime.now().isoformat()}
+        meta["loaded"] = True
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def evict(self) -> None:
+        """Remove outputs older than the maximum age, then the oldest ones until under the size limit."""
+        now = time.time()
+        outputs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_DATA_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            if now - stat.st_mtime > self.max_age_seconds:
+                os.remove(path)
+                logger.info(f"Evicted expired cached output {name}")
+            else:
+                outputs.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in outputs)
+        for _, size, path in sorted(outputs):
+            if total <= self.max_size_bytes:
+                break
+            os.remove(path)
+            total -= size
+            logger.info(f"Evicted cached output {os.path.basename(path)} to stay under the cache size limit")
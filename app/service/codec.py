@@ -0,0 +1,45 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from bson.codec_options import CodecOptions, TypeEncoder, TypeRegistry
+from bson.decimal128 import Decimal128
+from ..config import LOAD_CONFIG
+
+DECIMAL_ENCODINGS = ("float", "decimal128")
+
+class DecimalFloatEncoder(TypeEncoder):
+    """Store Decimal values as BSON doubles (what the warehouse has always held)."""
+    python_type = Decimal
+
+    def transform_python(self, value: Decimal) -> float:
+        return float(value)
+
+class DecimalDecimal128Encoder(TypeEncoder):
+    """Store Decimal values as exact BSON Decimal128."""
+    python_type = Decimal
+
+    def transform_python(self, value: Decimal) -> Decimal128:
+        return Decimal128(value)
+
+class DateEncoder(TypeEncoder):
+    """Store dates as BSON datetimes at midnight; BSON has no date-only type."""
+    python_type = date
+
+    def transform_python(self, value: date) -> datetime:
+        return datetime.combine(value, time())
+
+def bson_codec_options(decimal_encoding: str = LOAD_CONFIG['DECIMAL_ENCODING']) -> CodecOptions:
+    """
+    Codec options that let pymongo encode Decimal and date values while
+    serializing documents, so loaders can write transform results as is.
+    """
+    if decimal_encoding not in DECIMAL_ENCODINGS:
+        raise ValueError(f"Unknown decimal encoding: {decimal_encoding}")
+    decimal_encoder = DecimalDecimal128Encoder() if decimal_encoding == "decimal128" else DecimalFloatEncoder()
+    return CodecOptions(type_registry=TypeRegistry([decimal_encoder, DateEncoder()]))
+
+BSON_CODEC_OPTIONS = bson_codec_options()
+
+def warehouse_collection(client: Any, db_name: str, collection_name: str, codec_options: CodecOptions = None):
+    """`client[db_name][collection_name]` with the warehouse codec options (works for sync and async clients)."""
+    return client[db_name].get_collection(collection_name, codec_options=codec_options or BSON_CODEC_OPTIONS)
@@ -1,26 +1,310 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import logging
-from ..db.postgree_connection import postgres_cursor, dict_cursor
+import re
+from ..config import EXTRACT_CONFIG, TRANSFORM_CONFIG
+from ..db.postgree_connection import postgres_cursor, server_side_cursor
+from .groupby import ExternalGroupBy
+from .records import ItemRecord, OrderRecord
+from .transform import AGE_RANGE_LABELS, AGE_RANGE_UPPER_BOUNDS
 
 logger = logging.getLogger(__name__)
 
-def fetch_transaction_products() -> list:
+# Product pairs must be bought together more than this many times
+MIN_PAIR_FREQUENCY = 3
+
+TRANSACTION_PRODUCTS_QUERY = '''
+    SELECT
+        p.id as product_id,
+        p.nome as product_name,
+        c.gender,
+        c.age
+    FROM produtos p
+    JOIN itens_venda iv ON p.id = iv.id_produto
+    JOIN vendas v ON iv.id_venda = v.id
+    JOIN clientes c ON v.id_cliente = c.id
+    WHERE v.id > %(since_id)s
+      AND (%(until_id)s IS NULL OR v.id <= %(until_id)s)
+'''
+
+def age_range_case_sql(column: str) -> str:
+    """SQL CASE expression equivalent to `transform.age_range` for `column`."""
+    branches = [
+        f"WHEN {column} <= {upper} THEN '{label}'"
+        for upper, label in zip(AGE_RANGE_UPPER_BOUNDS, AGE_RANGE_LABELS)
+    ]
+    branches.append(f"WHEN {column} > {AGE_RANGE_UPPER_BOUNDS[-1]} THEN '{AGE_RANGE_LABELS[-1]}'")
+    return "CASE " + " ".join(branches) + " END"
+
+PRODUCT_PROFILE_COUNTS_QUERY = f'''
+    SELECT
+        p.id as product_id,
+        p.nome as product_name,
+        c.gender,
+        {age_range_case_sql('c.age')} as age_range,
+        COUNT(*) as total
+    FROM produtos p
+    JOIN itens_venda iv ON p.id = iv.id_produto
+    JOIN vendas v ON iv.id_venda = v.id
+    JOIN clientes c ON v.id_cliente = c.id
+    WHERE v.id > %(since_id)s
+      AND (%(until_id)s IS NULL OR v.id <= %(until_id)s)
+    GROUP BY 1, 2, 3, 4
+'''
+
+FREQUENCY_ITEMSETS_QUERY = '''
+    WITH produtos_por_venda AS (
+        SELECT
+            v.id as venda_id,
+            p1.id as produto1_id,
+            p1.nome as produto1_nome,
+            p2.id as produto2_id,
+            p2.nome as produto2_nome
+        FROM vendas v
+        JOIN itens_venda iv1 ON v.id = iv1.id_venda
+        JOIN produtos p1 ON iv1.id_produto = p1.id
+        JOIN itens_venda iv2 ON v.id = iv2.id_venda
+        JOIN produtos p2 ON iv2.id_produto = p2.id
+        WHERE p1.id < p2.id
+          AND v.id > %(since_id)s
+          AND (%(until_id)s IS NULL OR v.id <= %(until_id)s)
+    )
+    SELECT
+        produto1_nome,
+        produto2_nome,
+        COUNT(*) as frequencia
+    FROM produtos_por_venda
+    GROUP BY produto1_nome, produto2_nome
+    HAVING COUNT(*) > %(min_frequency)s
+    ORDER BY frequencia DESC
+'''
+
+ORDER_BASKETS_QUERY = '''
+    SELECT
+        iv.id_venda,
+        p.id,
+        p.nome
+    FROM itens_venda iv
+    JOIN produtos p ON iv.id_produto = p.id
+    WHERE iv.id_venda > %(since_id)s
+      AND (%(until_id)s IS NULL OR iv.id_venda <= %(until_id)s)
+    ORDER BY iv.id_venda
+'''
+
+SALES_LINES_QUERY = '''
+    SELECT
+        v.id,
+        v.data_venda,
+        v.valor_total,
+        c.id as cliente_id,
+        c.nome,
+        c.email,
+        c.gender,
+        c.age,
+        p.id as product_id,
+        p.nome as product_name,
+        iv.quantidade,
+        iv.preco_unitario,
+        cat.nome as categoria
+    FROM vendas v
+    JOIN clientes c ON v.id_cliente = c.id
+    LEFT JOIN itens_venda iv ON iv.id_venda = v.id
+    LEFT JOIN produtos p ON iv.id_produto = p.id
+    LEFT JOIN categorias cat ON p.id_categoria = cat.id
+    WHERE v.id > %(since_id)s
+      AND (%(until_id)s IS NULL OR v.id <= %(until_id)s)
+'''
+
+# Sorting the whole join is the most expensive part of the scan; without it,
+# lines are grouped into orders client side (see `group_sales_lines_into_orders`)
+ORDERED_SALES_LINES_QUERY = SALES_LINES_QUERY + '''    ORDER BY v.id, iv.id
+'''
+
+# Keyset pagination on the primary key: pages, and so the extracted and
+# loaded orders, come in order id order rather than latest `data_venda` first
+ORDERS_PAGE_QUERY = '''
+    SELECT
+        v.id,
+        v.data_venda,
+        v.valor_total,
+        c.id as cliente_id,
+        c.nome,
+        c.email,
+        c.gender,
+        c.age
+    FROM vendas v
+    JOIN clientes c ON v.id_cliente = c.id
+    WHERE v.id > %(last_id)s
+      AND (%(until_id)s IS NULL OR v.id <= %(until_id)s)
+    ORDER BY v.id
+    LIMIT %(limit)s
+'''
+
+ORDER_ITEMS_QUERY = '''
+    SELECT
+        iv.id_venda,
+        p.id,
+        p.nome,
+        iv.quantidade,
+        iv.preco_unitario,
+        cat.nome as categoria
+    FROM itens_venda iv
+    JOIN produtos p ON iv.id_produto = p.id
+    LEFT JOIN categorias cat ON p.id_categoria = cat.id
+    WHERE iv.id_venda = ANY(%s)
+'''
+
+SOURCE_HIGH_WATER_MARK_QUERY = '''
+    SELECT MAX(id), MAX(data_venda) FROM vendas
+'''
+
+SOURCE_TABLES = ('vendas', 'itens_venda', 'clientes', 'produtos', 'categorias')
+
+# Tables that may be range-partitioned by `data_venda` month (see app/db/models.py)
+SALES_TABLES = ('vendas', 'itens_venda')
+
+_PARTITION_NAME = re.compile(r"p\d{6}")
+_SALES_TABLE = re.compile(r"\b(vendas|itens_venda)\b")
+
+def partition_query(query: str, partition: Optional[str] = None) -> str:
+    """
+    Point `query` at the `partition` (e.g. 'p202401') of each sales table
+    instead of the whole table. The items of a sale are in the partition of
+    its month, so the joins stay within the partition.
+    """
+    if partition is None:
+        return query
+    if not _PARTITION_NAME.fullmatch(partition):
+        raise ValueError(f"Invalid sales partition: {partition}")
+    return _SALES_TABLE.sub(lambda match: f"{match.group(1)}_{partition}", query)
+
+# Modification counters of every monthly partition; cumulative statistics
+# only, so listing the partitions reads no table
+SALES_PARTITIONS_QUERY = '''
+    SELECT
+        parent.relname,
+        child.relname,
+        COALESCE(stats.n_tup_ins + stats.n_tup_upd + stats.n_tup_del, 0)
+    FROM pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_class child ON child.oid = i.inhrelid
+    LEFT JOIN pg_stat_user_tables stats ON stats.relid = child.oid
+    WHERE parent.relname IN ('vendas', 'itens_venda')
+'''
+
+def _table_fingerprint_sql(table: str) -> str:
+    # MAX(id) is read from the primary key index; the insert, update and
+    # delete counters are summed over the table and its partitions, whose
+    # parent keeps none of its own.
+    return f'''
+        SELECT
+            '{table}',
+            (SELECT MAX(id) FROM {table}),
+            COALESCE(SUM(stats.n_tup_ins + stats.n_tup_upd + stats.n_tup_del), 0)
+        FROM pg_stat_user_tables stats
+        WHERE stats.relid = '{table}'::regclass
+           OR stats.relid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = '{table}'::regclass)
+    '''
+
+PARTITION_BOUNDS_QUERY = '''
+    SELECT
+        percentile_disc(%(fractions)s::float8[]) WITHIN GROUP (ORDER BY id),
+        MAX(id)
+    FROM vendas
+    WHERE id > %(since_id)s
+      AND (%(until_id)s IS NULL OR id <= %(until_id)s)
+'''
+
+def _iter_batches(cursor, batch_size: int) -> Iterator[list]:
+    """Yield the remaining rows of `cursor` in lists of at most `batch_size`."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+def _attach_items(cursor, orders: List[OrderRecord], partition: Optional[str] = None) -> None:
+    """Fetch the items of `orders` and store them in each order's `itens`."""
+    order_ids = [order.id for order in orders]
+    if not order_ids:
+        return
+
+    # A single array parameter keeps the statement the same size whatever
+    # the number of orders in the chunk.
+    cursor.execute(partition_query(ORDER_ITEMS_QUERY, partition), (order_ids,))
+
+    items_by_order = {}
+    for order_id, *item in cursor.fetchall():
+        if order_id not in items_by_order:
+            items_by_order[order_id] = []
+        items_by_order[order_id].append(ItemRecord(*item))
+
+    for order in orders:
+        order.itens = items_by_order.get(order.id, [])
+
+def get_source_high_water_mark() -> Tuple[Optional[int], Optional[str]]:
+    """
+    Returns the current (max order id, max order date) of `vendas`, used as the
+    upper bound of an incremental run.
+    """
+    with postgres_cursor() as cursor:
+        cursor.execute(SOURCE_HIGH_WATER_MARK_QUERY)
+        last_id, last_date = cursor.fetchone()
+        return last_id, last_date.isoformat() if last_date else None
+
+def get_sales_partitions() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the monthly partitions of the sales tables, {partition:
+    {table: rows inserted, updated or deleted so far}}, empty if the tables
+    are not partitioned. A partition whose counters did not change since
+    they were last seen was not written to.
+    """
+    try:
+        with postgres_cursor() as cursor:
+            cursor.execute(SALES_PARTITIONS_QUERY)
+            partitions = {}
+            for table, child, modifications in cursor.fetchall():
+                partition = child[len(table) + 1:]
+                if child.startswith(f"{table}_") and _PARTITION_NAME.fullmatch(partition):
+                    partitions.setdefault(partition, {})[table] = modifications
+            return partitions
+    except Exception as e:
+        logger.error(f"Error listing sales partitions: {e}")
+        raise
+
+def get_source_fingerprint(tables: Tuple[str, ...] = SOURCE_TABLES) -> Dict[str, Dict]:
+    """
+    Returns a cheap fingerprint of the source tables: max id and the number
+    of rows inserted, updated or deleted so far (Postgres' cumulative
+    statistics, partitions included) of each table. No table is scanned.
+    Equal fingerprints mean the sources did not change, with two caveats of
+    statistics: writes committed within the last second or so may not be
+    counted yet, and a statistics reset changes the fingerprint (the next
+    cached run recomputes its flows).
+    """
+    unknown = set(tables) - set(SOURCE_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown source tables: {sorted(unknown)}")
+
+    try:
+        with postgres_cursor() as cursor:
+            cursor.execute(" UNION ALL ".join(_table_fingerprint_sql(table) for table in tables))
+            return {
+                table: {'max_id': max_id, 'modifications': modifications}
+                for table, max_id, modifications in cursor.fetchall()
+            }
+    except Exception as e:
+        logger.error(f"Error computing source fingerprint: {e}")
+        raise
+
+def fetch_transaction_products(since_id: int = 0, until_id: Optional[int] = None) -> list:
     """
     For each sell made, return the product id, product
+
+    Only orders with since_id < id <= until_id are read (all orders by default).
     """
     try:
         with postgres_cursor() as cursor:
-            cursor.execute('''
-                SELECT
-                    p.id as product_id,
-                    p.nome as product_name,
-                    c.gender,
-                    c.age
-                FROM produtos p
-                JOIN itens_venda iv ON p.id = iv.id_produto
-                JOIN vendas v ON iv.id_venda = v.id
-                JOIN clientes c ON v.id_cliente = c.id
-            ''')
+            cursor.execute(TRANSACTION_PRODUCTS_QUERY, {'since_id': since_id, 'until_id': until_id})
             data = cursor.fetchall()
             logger.info(f"Fetched {len(data)} transaction products")
             return data
@@ -28,37 +312,124 @@ def fetch_transaction_products() -> list:
         logger.error(f"Error fetching transaction products: {e}")
         raise
 
-def get_frequency_itemsets() -> List[Tuple[str, str, int]]:
+def get_partition_ranges(
+        partitions: int,
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split the orders in (since_id, until_id] into at most `partitions`
+    consecutive id ranges holding about the same number of orders.
+
+    Returns:
+        (since_id, until_id) bounds of each range, suitable for the
+        `since_id`/`until_id` arguments of the extractors.
+    """
+    if partitions <= 1:
+        return [(since_id, until_id)]
+
+    try:
+        fractions = [n / partitions for n in range(1, partitions)]
+        with postgres_cursor() as cursor:
+            cursor.execute(PARTITION_BOUNDS_QUERY, {
+                'fractions': fractions, 'since_id': since_id, 'until_id': until_id
+            })
+            cuts, max_id = cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Error computing partition ranges: {e}")
+        raise
+
+    if max_id is None:
+        return [(since_id, until_id)]
+
+    ranges = []
+    lower = since_id
+    for cut in sorted(set(cuts or [])):
+        if lower < cut < max_id:
+            ranges.append((lower, cut))
+            lower = cut
+    ranges.append((lower, until_id if until_id is not None else max_id))
+    logger.info(f"Split orders {since_id}..{max_id} into {len(ranges)} partitions")
+    return ranges
+
+def stream_transaction_products(
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        partition: Optional[str] = None
+        ) -> Iterator[list]:
+    """
+    Streaming version of `fetch_transaction_products`.
+    Yields batches of at most `itersize` rows read from a server-side cursor.
+    """
+    try:
+        total = 0
+        with server_side_cursor('transaction_products', itersize) as cursor:
+            query = partition_query(TRANSACTION_PRODUCTS_QUERY, partition)
+            cursor.execute(query, {'since_id': since_id, 'until_id': until_id})
+            for batch in _iter_batches(cursor, itersize):
+                total += len(batch)
+                yield batch
+        logger.info(f"Streamed {total} transaction products")
+    except Exception as e:
+        logger.error(f"Error streaming transaction products: {e}")
+        raise
+
+def fetch_product_profile_counts(
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> List[Tuple[int, str, str, str, int]]:
+    """
+    Aggregation pushdown for `fetch_transaction_products`: returns one
+    (product id, product name, gender, age range, count) row per combination
+    instead of one row per sold item.
+    """
+    try:
+        with postgres_cursor() as cursor:
+            cursor.execute(PRODUCT_PROFILE_COUNTS_QUERY, {'since_id': since_id, 'until_id': until_id})
+            data = cursor.fetchall()
+            logger.info(f"Fetched {len(data)} product profile counts")
+            return data
+    except Exception as e:
+        logger.error(f"Error fetching product profile counts: {e}")
+        raise
+
+def stream_product_profile_counts(
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        partition: Optional[str] = None
+        ) -> Iterator[List[Tuple[int, str, str, str, int]]]:
+    """
+    Streaming version of `fetch_product_profile_counts`.
+    """
+    try:
+        total = 0
+        with server_side_cursor('product_profile_counts', itersize) as cursor:
+            query = partition_query(PRODUCT_PROFILE_COUNTS_QUERY, partition)
+            cursor.execute(query, {'since_id': since_id, 'until_id': until_id})
+            for batch in _iter_batches(cursor, itersize):
+                total += len(batch)
+                yield batch
+        logger.info(f"Streamed {total} product profile counts")
+    except Exception as e:
+        logger.error(f"Error streaming product profile counts: {e}")
+        raise
+
+def get_frequency_itemsets(
+        min_frequency: int = MIN_PAIR_FREQUENCY,
+        since_id: int = 0,
+        until_id: Optional[int] = None
+        ) -> List[Tuple[str, str, int]]:
     """
     Returns the frequency of itemsets (product pairs)
-    that were sold together more than 3 times.
+    that were sold together more than `min_frequency` times.
     """
     try:
         with postgres_cursor() as cursor:
-            cursor.execute('''
-                WITH produtos_por_venda AS (
-                    SELECT
-                        v.id as venda_id,
-                        p1.id as produto1_id,
-                        p1.nome as produto1_nome,
-                        p2.id as produto2_id,
-                        p2.nome as produto2_nome
-                    FROM vendas v
-                    JOIN itens_venda iv1 ON v.id = iv1.id_venda
-                    JOIN produtos p1 ON iv1.id_produto = p1.id
-                    JOIN itens_venda iv2 ON v.id = iv2.id_venda
-                    JOIN produtos p2 ON iv2.id_produto = p2.id
-                    WHERE p1.id < p2.id
-                )
-                SELECT
-                    produto1_nome,
-                    produto2_nome,
-                    COUNT(*) as frequencia
-                FROM produtos_por_venda
-                GROUP BY produto1_nome, produto2_nome
-                HAVING COUNT(*) > 3
-                ORDER BY frequencia DESC
-            ''')
+            cursor.execute(FREQUENCY_ITEMSETS_QUERY, {
+                'min_frequency': min_frequency, 'since_id': since_id, 'until_id': until_id
+            })
             data = cursor.fetchall()
             logger.info(f"Fetched {len(data)} frequency itemsets")
             return data
@@ -66,59 +437,201 @@ def get_frequency_itemsets() -> List[Tuple[str, str, int]]:
         logger.error(f"Error fetching frequency itemsets: {e}")
         raise
 
-def extract_orders_with_customers_and_items() -> list:
+def stream_frequency_itemsets(
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        min_frequency: int = MIN_PAIR_FREQUENCY,
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        partition: Optional[str] = None
+        ) -> Iterator[List[Tuple[str, str, int]]]:
+    """
+    Streaming version of `get_frequency_itemsets`.
+    Yields batches of at most `itersize` product pairs.
+    """
+    try:
+        total = 0
+        with server_side_cursor('frequency_itemsets', itersize) as cursor:
+            cursor.execute(partition_query(FREQUENCY_ITEMSETS_QUERY, partition), {
+                'min_frequency': min_frequency, 'since_id': since_id, 'until_id': until_id
+            })
+            for batch in _iter_batches(cursor, itersize):
+                total += len(batch)
+                yield batch
+        logger.info(f"Streamed {total} frequency itemsets")
+    except Exception as e:
+        logger.error(f"Error streaming frequency itemsets: {e}")
+        raise
+
+def fetch_order_baskets(since_id: int = 0, until_id: Optional[int] = None) -> List[Tuple[int, int, str]]:
+    """
+    Returns one (order id, product id, product name) row per sold item,
+    ordered by order id so consecutive rows form an order's basket.
+    """
+    try:
+        with postgres_cursor() as cursor:
+            cursor.execute(ORDER_BASKETS_QUERY, {'since_id': since_id, 'until_id': until_id})
+            data = cursor.fetchall()
+            logger.info(f"Fetched {len(data)} basket items")
+            return data
+    except Exception as e:
+        logger.error(f"Error fetching order baskets: {e}")
+        raise
+
+def stream_order_baskets(
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        partition: Optional[str] = None
+        ) -> Iterator[List[Tuple[int, int, str]]]:
     """
-    Fetch all complete orders (with customer and items).
+    Streaming version of `fetch_order_baskets`.
+    Yields batches of at most `itersize` rows; a basket may span two batches.
     """
     try:
-        with dict_cursor() as cursor:
-            cursor.execute('''
-                SELECT
-                    v.id,
-                    v.data_venda,
-                    v.valor_total,
-                    c.id as cliente_id,
-                    c.nome,
-                    c.email,
-                    c.gender,
-                    c.age
-                FROM vendas v
-                JOIN clientes c ON v.id_cliente = c.id
-                ORDER BY v.data_venda DESC  -- Ordenação para análise temporal
-            ''')
-            orders = cursor.fetchall()
-
-            order_ids = [order['id'] for order in orders]
-            if not order_ids:
-                return []
-
-            placeholders = ','.join(['%s'] * len(order_ids))
-            cursor.execute(f'''
-                SELECT
-                    iv.id_venda,
-                    p.id,
-                    p.nome,
-                    iv.quantidade,
-                    iv.preco_unitario,
-                    cat.nome as categoria
-                FROM itens_venda iv
-                JOIN produtos p ON iv.id_produto = p.id
-                LEFT JOIN categorias cat ON p.id_categoria = cat.id
-                WHERE iv.id_venda IN ({placeholders})
-            ''', order_ids)
-
-            items_by_order = {}
-            for item in cursor.fetchall():
-                order_id = item.pop('id_venda')
-                if order_id not in items_by_order:
-                    items_by_order[order_id] = []
-                items_by_order[order_id].append(item)
-
-            for order in orders:
-                order['itens'] = items_by_order.get(order['id'], [])
-
-            logger.info(f"Fetched {len(orders)} orders with {sum(len(o['itens']) for o in orders)} items")
-            return orders
+        total = 0
+        with server_side_cursor('order_baskets', itersize) as cursor:
+            query = partition_query(ORDER_BASKETS_QUERY, partition)
+            cursor.execute(query, {'since_id': since_id, 'until_id': until_id})
+            for batch in _iter_batches(cursor, itersize):
+                total += len(batch)
+                yield batch
+        logger.info(f"Streamed {total} basket items")
+    except Exception as e:
+        logger.error(f"Error streaming order baskets: {e}")
+        raise
+
+def stream_sales_lines(
+        itersize: int = EXTRACT_CONFIG['ITERSIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        ordered: bool = True
+        ) -> Iterator[list]:
+    """
+    Single pass over the joined sales data (orders, customers, items,
+    products and categories), one row per sold item, ordered by order id
+    unless `ordered` is False. Orders without items appear once with NULL
+    item columns.
+    """
+    try:
+        total = 0
+        query = ORDERED_SALES_LINES_QUERY if ordered else SALES_LINES_QUERY
+        with server_side_cursor('sales_lines', itersize) as cursor:
+            cursor.execute(query, {'since_id': since_id, 'until_id': until_id})
+            for batch in _iter_batches(cursor, itersize):
+                total += len(batch)
+                yield batch
+        logger.info(f"Streamed {total} sales lines")
+    except Exception as e:
+        logger.error(f"Error streaming sales lines: {e}")
+        raise
+
+def _add_sales_line(order: Optional[OrderRecord], line: tuple) -> OrderRecord:
+    """Add a `stream_sales_lines` row to its order, creating the order from its first row."""
+    if order is None:
+        order = OrderRecord(*line[:8])
+    if line[8] is not None:
+        order.itens.append(ItemRecord(*line[8:]))
+    return order
+
+def _merge_order_items(order: OrderRecord, other: OrderRecord) -> OrderRecord:
+    order.itens.extend(other.itens)
+    return order
+
+def group_sales_lines_into_orders(
+        batches: Iterator[list],
+        ordered: bool = True,
+        memory_budget_mb: Optional[float] = TRANSFORM_CONFIG['MEMORY_BUDGET_MB'],
+        batch_size: int = EXTRACT_CONFIG['ORDERS_CHUNK_SIZE']
+        ) -> Iterator[List[OrderRecord]]:
+    """
+    Turn batches of `stream_sales_lines` rows into batches of complete orders,
+    shaped like the rows of `extract_orders_with_customers_and_items`.
+
+    Ordered lines are grouped as they stream: an order split across two row
+    batches is emitted with the later batch. Unordered lines are grouped by
+    order id with an `ExternalGroupBy`, spilling to disk past
+    `memory_budget_mb`, and orders come out in batches of `batch_size` once
+    every line was read, in no particular order.
+    """
+    if not ordered:
+        with ExternalGroupBy(
+                lambda: None, _add_sales_line, _merge_order_items, memory_budget_mb=memory_budget_mb
+                ) as grouper:
+            for rows in batches:
+                for line in rows:
+                    grouper.add(line[0], line)
+            orders = []
+            for order_id, order in grouper.groups():
+                orders.append(order)
+                if len(orders) >= batch_size:
+                    yield orders
+                    orders = []
+            if orders:
+                yield orders
+        return
+
+    current = None
+    for rows in batches:
+        orders = []
+        for line in rows:
+            if current is None or current.id != line[0]:
+                if current is not None:
+                    orders.append(current)
+                current = None
+            current = _add_sales_line(current, line)
+        if orders:
+            yield orders
+    if current is not None:
+        yield [current]
+
+def extract_orders_with_customers_and_items(since_id: int = 0, until_id: Optional[int] = None) -> list:
+    """
+    Fetch all complete orders (with customer and items) as `OrderRecord`s,
+    ordered by order id.
+    """
+    try:
+        orders = []
+        for chunk in stream_orders_with_customers_and_items(EXTRACT_CONFIG['ORDERS_CHUNK_SIZE'], since_id, until_id):
+            orders.extend(chunk)
+
+        logger.info(f"Fetched {len(orders)} orders with {sum(len(o.itens) for o in orders)} items")
+        return orders
     except Exception as e:
         logger.error(f"Error fetching all orders: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def stream_orders_with_customers_and_items(
+        itersize: int = EXTRACT_CONFIG['ORDERS_CHUNK_SIZE'],
+        since_id: int = 0,
+        until_id: Optional[int] = None,
+        partition: Optional[str] = None
+        ) -> Iterator[list]:
+    """
+    Walk `vendas` in keyset-paginated chunks of at most `itersize` orders
+    (ordered by id) and yield each chunk of `OrderRecord`s, with their items,
+    as soon as it is ready.
+
+    Like the other streaming extractors, only reads the monthly `partition`
+    of the sales tables if one is given (see `partition_query`).
+    """
+    try:
+        total_orders = 0
+        total_items = 0
+        last_id = since_id
+        page_query = partition_query(ORDERS_PAGE_QUERY, partition)
+        with postgres_cursor() as cursor:
+            while True:
+                cursor.execute(page_query, {'last_id': last_id, 'until_id': until_id, 'limit': itersize})
+                orders = [OrderRecord(*row) for row in cursor.fetchall()]
+                if not orders:
+                    break
+
+                last_id = orders[-1].id
+                _attach_items(cursor, orders, partition)
+                total_orders += len(orders)
+                total_items += sum(len(o.itens) for o in orders)
+                yield orders
+        logger.info(f"Streamed {total_orders} orders with {total_items} items")
+    except Exception as e:
+        logger.error(f"Error streaming orders: {e}")
+        raise
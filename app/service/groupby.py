@@ -0,0 +1,144 @@
+import logging
+import os
+import tempfile
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from ..config import TRANSFORM_CONFIG
+from ..utils.metrics import estimate_bytes
+from .staging import StagingWriter, read_batches, remove_staging
+
+logger = logging.getLogger(__name__)
+
+# Adds between two estimates of the size of the groups held in memory
+SIZE_CHECK_INTERVAL = 1000
+
+def _append(state: list, value: Any) -> list:
+    state.append(value)
+    return state
+
+def _extend(state: list, other: list) -> list:
+    state.extend(other)
+    return state
+
+class ExternalGroupBy:
+    """
+    Group values by key within a memory budget.
+
+    Each key has one state: a new state is created by `create`, and `add`
+    folds each value into it. The default collects the values into a list.
+    When the estimated size of the states goes over `memory_budget_mb`, the
+    states are hash-partitioned by key into `partitions` spill files and
+    memory is cleared. `groups()` then reads back one partition at a time
+    and combines the spilled states of each key with `merge`, so only about
+    1/`partitions` of the groups is in memory at once.
+
+    Keys must be str or int so they survive the round trip through the
+    spill files. Once anything was spilled, groups come out in no particular
+    order.
+    """
+
+    def __init__(
+            self,
+            create: Callable[[], Any] = list,
+            add: Callable[[Any, Any], Any] = _append,
+            merge: Callable[[Any, Any], Any] = _extend,
+            memory_budget_mb: Optional[float] = TRANSFORM_CONFIG['MEMORY_BUDGET_MB'],
+            partitions: int = TRANSFORM_CONFIG['SPILL_PARTITIONS'],
+            directory: str = TRANSFORM_CONFIG['SPILL_DIR']
+        ):
+        self.create = create
+        self.add_fn = add
+        self.merge = merge
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.partitions = max(1, partitions)
+        self.directory = directory
+        self.groups_in_memory: Dict[Hashable, Any] = {}
+        self.spills = 0
+        self.spilled_groups = 0
+        self._spill_dir = None
+        self._writers = {}
+        self._adds_since_check = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, key: Hashable, value: Any) -> None:
+        """Fold `value` into the state of `key`."""
+        state = self.groups_in_memory.get(key)
+        if state is None:
+            state = self.create()
+        self.groups_in_memory[key] = self.add_fn(state, value)
+
+        self._adds_since_check += 1
+        if self.memory_budget_bytes and self._adds_since_check >= SIZE_CHECK_INTERVAL:
+            self._adds_since_check = 0
+            if self.estimated_bytes() > self.memory_budget_bytes:
+                self.spill()
+
+    def estimated_bytes(self) -> int:
+        """Estimated in-memory size of the groups held in memory, from a sample of them."""
+        if not self.groups_in_memory:
+            return 0
+        sample = list(islice(self.groups_in_memory.items(), 100))
+        return int(estimate_bytes(sample) / len(sample) * len(self.groups_in_memory))
+
+    def _partition(self, key: Hashable) -> int:
+        return hash(key) % self.partitions
+
+    def spill(self) -> None:
+        """Write the groups held in memory to their partition's spill files and clear them."""
+        if not self.groups_in_memory:
+            return
+        if self._spill_dir is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="groupby-", dir=self.directory)
+
+        by_partition = {}
+        for key, state in self.groups_in_memory.items():
+            by_partition.setdefault(self._partition(key), []).append([key, state])
+        for partition, pairs in by_partition.items():
+            if partition not in self._writers:
+                self._writers[partition] = StagingWriter(
+                    os.path.join(self._spill_dir, f"partition-{partition:04d}"), workers=1
+                )
+            self._writers[partition].write_all([pairs])
+
+        self.spills += 1
+        self.spilled_groups += len(self.groups_in_memory)
+        logger.info(f"Spilled {len(self.groups_in_memory)} groups to {self._spill_dir} (spill {self.spills})")
+        self.groups_in_memory = {}
+
+    def groups(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Yield every (key, state); spill files are removed as their partition is read."""
+        if self._spill_dir is None:
+            yield from self.groups_in_memory.items()
+            self.groups_in_memory = {}
+            return
+
+        self.spill()
+        try:
+            for partition in sorted(self._writers):
+                partition_dir = self._writers[partition].directory
+                states = {}
+                for pairs in read_batches(partition_dir):
+                    for key, state in pairs:
+                        if key in states:
+                            states[key] = self.merge(states[key], state)
+                        else:
+                            states[key] = state
+                remove_staging(partition_dir)
+                yield from states.items()
+                del states
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Remove the spill files, if any."""
+        if self._spill_dir is not None:
+            remove_staging(self._spill_dir)
+            self._spill_dir = None
+            self._writers = {}
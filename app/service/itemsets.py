@@ -0,0 +1,153 @@
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from ..config import ITEMSET_CONFIG
+from .transform import most_common_products
+
+Itemset = Tuple[Hashable, ...]
+
+class _FPNode:
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+def _build_tree(transactions: List[Tuple[Iterable, int]], min_count: int):
+    """
+    Build an FP-tree from weighted transactions, keeping only items with at
+    least `min_count` support.
+
+    Returns:
+        (header, support): nodes of each frequent item and the item supports
+    """
+    support = Counter()
+    for items, weight in transactions:
+        for item in items:
+            support[item] += weight
+    support = {item: count for item, count in support.items() if count >= min_count}
+
+    root = _FPNode(None, None)
+    header = {item: [] for item in support}
+    for items, weight in transactions:
+        # Most frequent items first, so common prefixes share nodes
+        path = sorted((item for item in items if item in support), key=lambda i: (-support[i], i))
+        node = root
+        for item in path:
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = _FPNode(item, node)
+                header[item].append(child)
+            child.count += weight
+            node = child
+
+    return header, support
+
+def _mine(transactions, min_count: int, suffix: Itemset, max_size: Optional[int], output: list) -> None:
+    header, support = _build_tree(transactions, min_count)
+
+    for item in sorted(header, key=lambda i: (support[i], i)):
+        itemset = (item,) + suffix
+        output.append((itemset, support[item]))
+        if max_size and len(itemset) >= max_size:
+            continue
+
+        # Conditional pattern base: the prefix path of every node of `item`
+        conditional = []
+        for node in header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional.append((path, node.count))
+        if conditional:
+            _mine(conditional, min_count, itemset, max_size, output)
+
+def frequent_itemsets(
+        baskets: Iterable[Iterable[Hashable]],
+        min_support: Union[int, float] = ITEMSET_CONFIG['MIN_SUPPORT'],
+        max_size: Optional[int] = ITEMSET_CONFIG['MAX_SIZE'],
+        min_size: int = 1
+        ) -> List[Tuple[Itemset, int]]:
+    """
+    Mine frequent itemsets with FP-Growth.
+
+    `baskets` is consumed once; identical baskets are collapsed into a single
+    weighted transaction before the tree is built.
+
+    Args:
+        min_support: Minimum number of baskets containing the itemset, or a
+            fraction of all baskets if below 1.
+        max_size: Largest itemset size to mine (None for no limit).
+        min_size: Smallest itemset size to return.
+
+    Returns:
+        (itemset, support) pairs; items of each itemset are sorted.
+    """
+    weighted = Counter(tuple(sorted(set(basket))) for basket in baskets)
+    return frequent_itemsets_from_counts(weighted, min_support, max_size, min_size)
+
+def frequent_itemsets_from_counts(
+        weighted: Counter,
+        min_support: Union[int, float] = ITEMSET_CONFIG['MIN_SUPPORT'],
+        max_size: Optional[int] = ITEMSET_CONFIG['MAX_SIZE'],
+        min_size: int = 1
+        ) -> List[Tuple[Itemset, int]]:
+    """
+    Same as `frequent_itemsets`, for baskets already collapsed into a
+    {sorted basket tuple: number of orders} Counter.
+    """
+    if isinstance(min_support, float) and min_support < 1:
+        min_count = max(1, int(min_support * sum(weighted.values()) + 0.5))
+    else:
+        min_count = int(min_support)
+
+    output = []
+    _mine(list(weighted.items()), min_count, (), max_size, output)
+    return [(tuple(sorted(itemset)), count) for itemset, count in output if len(itemset) >= min_size]
+
+def iter_baskets(rows: Iterable[Tuple[int, int, str]], product_names: Dict[int, str]) -> Iterable[set]:
+    """
+    Group (order_id, product_id, product_name) rows, ordered by order id, into
+    sets of product ids. Product names are collected into `product_names`.
+    """
+    for _, order_rows in groupby(rows, key=itemgetter(0)):
+        basket = set()
+        for _, product_id, product_name in order_rows:
+            product_names[product_id] = product_name
+            basket.add(product_id)
+        yield basket
+
+def most_common_itemsets(
+        rows: Iterable[Tuple[int, int, str]],
+        min_support: Union[int, float] = ITEMSET_CONFIG['MIN_SUPPORT'],
+        max_size: Optional[int] = ITEMSET_CONFIG['MAX_SIZE']
+        ) -> Dict[str, Any]:
+    """
+    Returns the products most often bought together, mining itemsets of any
+    size (2 up to `max_size`) from (order_id, product_id, product_name) rows.
+
+    The output has the shape of `most_common_products`, with one
+    Product_<n> key per item of the itemset.
+    """
+    product_names = {}
+    itemsets = frequent_itemsets(iter_baskets(rows, product_names), min_support, max_size, min_size=2)
+    return itemsets_to_most_common_products(itemsets, product_names)
+
+def itemsets_to_most_common_products(
+        itemsets: List[Tuple[Itemset, int]],
+        product_names: Dict[int, str]
+        ) -> Dict[str, Any]:
+    """Format mined (product ids, support) itemsets like `most_common_products`, most frequent first."""
+    itemsets = sorted(itemsets, key=lambda itemset: (-itemset[1], len(itemset[0]), itemset[0]))
+
+    return most_common_products(
+        (*(product_names[product_id] for product_id in itemset), count)
+        for itemset, count in itemsets
+    )
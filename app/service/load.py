@@ -1,11 +1,194 @@
 import logging
-from typing import Dict, Any
+import time
+from itertools import islice
+from typing import Dict, Any, Iterable, List
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from ..config import LOAD_CONFIG
 from ..db.mongo_connection import mongo_context
-import json
-from decimal import Decimal
+from .codec import warehouse_collection
+from .transform import ProductProfileCounters
 
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+
+def _latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Summarize batch latencies (in seconds) as milliseconds."""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+
+    return {
+        'min_ms': ordered[0] * 1000,
+        'avg_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+def _envelope_metadata(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Processing metadata of a transform result (everything but 'data')."""
+    return {key: value for key, value in data.items() if key != 'data'}
+
+def _envelope_documents(data: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """
+    Split a transform result ({'processing_date': ..., 'data': [...]}) into one
+    document per entry, each carrying the envelope's processing metadata.
+    """
+    metadata = _envelope_metadata(data)
+    for entry in data.get('data', []):
+        yield {**entry, **metadata}
+
+def _write_batches(
+        items: Iterable[Any],
+        batch_size: int,
+        write_batch,
+        collection_name: str,
+        skip_duplicates: bool = False
+    ) -> Dict[str, Any]:
+    """
+    Feed `items` to `write_batch` in lists of at most `batch_size` and collect
+    load statistics. `write_batch` returns the number of items written; a
+    BulkWriteError only fails the offending items. With `skip_duplicates`
+    (guarded upserts, see `bulk_write_requests`), duplicate-key errors mean
+    the item was already applied and count as skipped instead of failed.
+    """
+    loaded = 0
+    skipped = 0
+    failed = 0
+    latencies = []
+    start = time.perf_counter()
+
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+
+        batch_start = time.perf_counter()
+        try:
+            loaded += write_batch(batch)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            duplicates = sum(
+                1 for error in errors if skip_duplicates and error.get('code') == DUPLICATE_KEY_ERROR
+            )
+            loaded += len(batch) - len(errors)
+            skipped += duplicates
+            failed += len(errors) - duplicates
+            if len(errors) > duplicates:
+                logger.warning(f"{len(errors) - duplicates} documents failed in batch for {collection_name}")
+        latencies.append(time.perf_counter() - batch_start)
+
+    duration = time.perf_counter() - start
+    stats = {
+        'success': failed == 0,
+        'documents_loaded': loaded,
+        'documents_skipped': skipped,
+        'documents_failed': failed,
+        'batches': len(latencies),
+        'duration_seconds': duration,
+        'rows_per_sec': loaded / duration if duration > 0 else 0.0,
+        'batch_latency': _latency_summary(latencies)
+    }
+    logger.info(
+        f"Bulk loaded {loaded} documents into {collection_name} "
+        f"in {stats['batches']} batches ({stats['rows_per_sec']:.0f} rows/sec)"
+    )
+    return stats
+
+def combine_load_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the statistics of several bulk load calls into one summary."""
+    combined = {
+        'success': all(item.get('success', False) for item in stats),
+        'documents_loaded': sum(item.get('documents_loaded', 0) for item in stats),
+        'documents_skipped': sum(item.get('documents_skipped', 0) for item in stats),
+        'documents_failed': sum(item.get('documents_failed', 0) for item in stats),
+        'batches': sum(item.get('batches', 0) for item in stats),
+        'duration_seconds': sum(item.get('duration_seconds', 0.0) for item in stats),
+        'calls': len(stats)
+    }
+    duration = combined['duration_seconds']
+    combined['rows_per_sec'] = combined['documents_loaded'] / duration if duration > 0 else 0.0
+
+    latencies = [item['batch_latency'] for item in stats if item.get('batch_latency')]
+    if latencies:
+        combined['batch_latency'] = {
+            'min_ms': min(latency['min_ms'] for latency in latencies),
+            'max_ms': max(latency['max_ms'] for latency in latencies),
+            # Exact percentiles across calls are not recoverable; report the worst call
+            'p95_ms': max(latency['p95_ms'] for latency in latencies),
+        }
+    errors = [item['error'] for item in stats if item.get('error')]
+    if errors:
+        combined['error'] = errors[0]
+    return combined
+
+def bulk_insert_documents(
+        documents: Iterable[Dict[str, Any]],
+        db_name: str,
+        collection_name: str,
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Insert documents with unordered `insert_many` calls of at most `batch_size`
+    documents. A failing document does not stop the rest of its batch or the
+    following batches.
+
+    Returns:
+        dict: Load statistics (documents loaded/failed, batches, rows/sec and
+        batch latencies). `success` is False if any document failed.
+    """
+    with mongo_context() as client:
+        collection = warehouse_collection(client, db_name, collection_name)
+
+        def write_batch(batch):
+            return len(collection.insert_many(batch, ordered=False).inserted_ids)
+
+        return _write_batches(documents, batch_size, write_batch, collection_name)
+
+def bulk_write_requests(
+        requests: Iterable[Any],
+        db_name: str,
+        collection_name: str,
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE'],
+        guarded: bool = False
+    ) -> Dict[str, Any]:
+    """
+    Apply write operations (UpdateOne, ReplaceOne...) with unordered
+    `bulk_write` calls of at most `batch_size` operations.
+
+    `guarded` requests are upserts by `_id` that only match a stored document
+    whose watermark is below theirs. When the stored document already
+    includes their watermark, the upsert inserts a duplicate `_id` instead;
+    such duplicate-key errors count as skipped rather than failed. Documents
+    inserted by the bulk loaders have generated ids, so upserts neither match
+    nor collide with them.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    with mongo_context() as client:
+        collection = warehouse_collection(client, db_name, collection_name)
+
+        def write_batch(batch):
+            collection.bulk_write(batch, ordered=False)
+            return len(batch)
+
+        return _write_batches(requests, batch_size, write_batch, collection_name, skip_duplicates=guarded)
+
+def _bulk_load(data, db_name, collection_name, batch_size, label) -> Dict[str, Any]:
+    """Shared error handling for the bulk loaders."""
+    try:
+        return bulk_insert_documents(_envelope_documents(data), db_name, collection_name, batch_size)
+    except Exception as e:
+        logger.error(f"Error bulk loading {label} data: {e}")
+        return {'success': False, 'error': str(e)}
+
 def load_product_predominant_profile(
         data: Dict[str, Any],
         db_name: str = 'DW-MarcosJunior',
@@ -19,8 +202,7 @@ def load_product_predominant_profile(
     """
     try:
         with mongo_context() as client:
-            db = client[db_name]
-            collection = db[collection_name]
+            collection = warehouse_collection(client, db_name, collection_name)
             result = collection.insert_one(data)
             logger.info(f"Loaded predominant profile data. ID: {result.inserted_id}")
             return True
@@ -41,8 +223,7 @@ def load_most_common_products(
     """
     try:
         with mongo_context() as client:
-            db = client[db_name]
-            collection = db[collection_name]
+            collection = warehouse_collection(client, db_name, collection_name)
             result = collection.insert_one(data)
             logger.info(f"Loaded most common products data. ID: {result.inserted_id}")
             return True
@@ -59,16 +240,191 @@ def load_complete_orders_to_dw(
     Load the full orders data into MongoDB.
     """
     try:
-        # Converter Decimal para float
-        data_str = json.dumps(data, default=lambda x: float(x) if isinstance(x, Decimal) else None)
-        data = json.loads(data_str)
-
         with mongo_context() as client:
-            db = client[db_name]
-            collection = db[collection_name]
+            collection = warehouse_collection(client, db_name, collection_name)
             result = collection.insert_one(data)
             logger.info(f"Loaded orders data. ID: {result.inserted_id}")
             return True
     except Exception as e:
         logger.error(f"Error loading orders data: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def bulk_load_product_predominant_profile(
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-predominant_profile',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Load the product predominant profile data into MongoDB, one document per product.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    return _bulk_load(data, db_name, collection_name, batch_size, 'predominant profile')
+
+def bulk_load_most_common_products(
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-most_common_products',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Load the most common products bought together into MongoDB, one document per pair.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    return _bulk_load(data, db_name, collection_name, batch_size, 'most common products')
+
+def _order_replacements(data: Dict[str, Any]) -> Iterable[ReplaceOne]:
+    """Replace each order of a transform result by its order id (`_id`), inserting it if missing."""
+    return (
+        ReplaceOne({'_id': document['order_id']}, document, upsert=True)
+        for document in _envelope_documents(data)
+    )
+
+def bulk_load_complete_orders_to_dw(
+        data: Dict[str, Any],
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-orders',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Load the full orders data into MongoDB, one document per order with the
+    order id as `_id`. Orders are replaced rather than inserted, so loading
+    them again (a rerun, a resumed run or an incremental run) does not
+    duplicate them.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    try:
+        return bulk_write_requests(_order_replacements(data), db_name, collection_name, batch_size)
+    except Exception as e:
+        logger.error(f"Error bulk loading orders data: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+def upsert_product_predominant_profile(
+        data: Dict[str, Any],
+        watermark: int,
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-predominant_profile',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Merge an incremental predominant profile into MongoDB, one document per
+    product with the product name as `_id`.
+
+    The delta's gender and age range counts are added to the stored counters and
+    the predominant gender/age range are recomputed from the merged counters.
+    Each document remembers the `watermark` (last order id) it includes, so
+    re-applying the same delta is a no-op.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    try:
+        metadata = _envelope_metadata(data)
+        entries = data.get('data', [])
+        requests = (
+            UpdateOne(
+                {'_id': entry['Product'], 'Last_Order_Id': {'$lt': watermark}},
+                {
+                    '$inc': {
+                        **{f'Gender_Counts.{g}': n for g, n in entry['Gender_Counts'].items()},
+                        **{f'Age_Range_Counts.{r}': n for r, n in entry['Age_Range_Counts'].items()}
+                    },
+                    '$set': {**metadata, 'Product': entry['Product'], 'Last_Order_Id': watermark}
+                },
+                upsert=True
+            )
+            for entry in entries
+        )
+        stats = bulk_write_requests(requests, db_name, collection_name, batch_size, guarded=True)
+
+        # Derive the predominant fields from the merged counters
+        products = [entry['Product'] for entry in entries]
+        with mongo_context() as client:
+            collection = warehouse_collection(client, db_name, collection_name)
+            for start in range(0, len(products), batch_size):
+                merged = collection.find(
+                    {'_id': {'$in': products[start:start + batch_size]}},
+                    {'Product': 1, 'Gender_Counts': 1, 'Age_Range_Counts': 1}
+                )
+                updates = [
+                    UpdateOne(
+                        {'_id': entry['Product']},
+                        {'$set': {
+                            'Predominant_Gender': entry['Predominant_Gender'],
+                            'Predominant_Age_Range': entry['Predominant_Age_Range']
+                        }}
+                    )
+                    for entry in ProductProfileCounters.from_documents(merged).to_documents()
+                ]
+                if updates:
+                    collection.bulk_write(updates, ordered=False)
+        return stats
+    except Exception as e:
+        logger.error(f"Error upserting predominant profile data: {e}")
+        return {'success': False, 'error': str(e)}
+
+def upsert_most_common_products(
+        data: Dict[str, Any],
+        watermark: int,
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-most_common_products',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Merge incremental pair counts into MongoDB, one document per product pair
+    with the pair as `_id`.
+
+    The delta's counts are added to the stored `Count`; consumers apply their
+    own minimum frequency. Re-applying the same delta (same `watermark`) is a no-op.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    try:
+        metadata = _envelope_metadata(data)
+        requests = (
+            UpdateOne(
+                {
+                    '_id': {'Product_1': entry['Product_1'], 'Product_2': entry['Product_2']},
+                    'Last_Order_Id': {'$lt': watermark}
+                },
+                {
+                    '$inc': {'Count': entry['Count']},
+                    '$set': {
+                        **metadata,
+                        'Product_1': entry['Product_1'],
+                        'Product_2': entry['Product_2'],
+                        'Last_Order_Id': watermark
+                    }
+                },
+                upsert=True
+            )
+            for entry in data.get('data', [])
+        )
+        return bulk_write_requests(requests, db_name, collection_name, batch_size, guarded=True)
+    except Exception as e:
+        logger.error(f"Error upserting most common products data: {e}")
+        return {'success': False, 'error': str(e)}
+
+def upsert_complete_orders_to_dw(
+        data: Dict[str, Any],
+        watermark: int = None,
+        db_name: str = 'DW-MarcosJunior',
+        collection_name: str = 'ETL-orders',
+        batch_size: int = LOAD_CONFIG['BATCH_SIZE']
+    ) -> Dict[str, Any]:
+    """
+    Upsert orders into MongoDB, like `bulk_load_complete_orders_to_dw`.
+    Replacing by key is naturally idempotent, so `watermark` is not needed.
+
+    Returns:
+        dict: Load statistics, see `bulk_insert_documents`.
+    """
+    return bulk_load_complete_orders_to_dw(data, db_name, collection_name, batch_size)
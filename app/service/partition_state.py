@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import pickle
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+import zstandard
+
+from ..config import CACHE_CONFIG, PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_DATA_SUFFIX = ".pickle.zst"
+_META_SUFFIX = ".meta.json"
+# Marks an entry saved without a partial result
+_NO_PARTIAL = object()
+
+class PartitionStore:
+    """
+    On-disk state of the date-partitioned mode: for each flow and monthly
+    sales partition, the key of the sources the partition was last processed
+    with and, for flows that merge every partition into one result, the
+    partition's partial result (pickled, as exchanged with the workers).
+
+    Unlike `ResultCache` entries, partials are never evicted: an unchanged
+    partition is only read from the database again if its partial is lost.
+    """
+
+    def __init__(
+            self,
+            directory: str = PIPELINE_CONFIG['PARTITION_STATE_DIR'],
+            compression_level: int = CACHE_CONFIG['COMPRESSION_LEVEL']
+        ):
+        self.directory = directory
+        self.compression_level = compression_level
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, flow_name: str, partition: str, suffix: str) -> str:
+        return os.path.join(self.directory, flow_name, f"{partition}{suffix}")
+
+    def get(self, flow_name: str, partition: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry of a partition if it matches `key`: its metadata,
+        plus its partial result under 'partial' if one was saved.
+        """
+        try:
+            with open(self._path(flow_name, partition, _META_SUFFIX)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key:
+            return None
+
+        if meta.get("has_partial"):
+            try:
+                with open(self._path(flow_name, partition, _DATA_SUFFIX), "rb") as f:
+                    meta["partial"] = pickle.loads(zstandard.ZstdDecompressor().decompress(f.read()))
+            except Exception as e:
+                logger.warning(f"Discarding unreadable partial of {flow_name} for partition {partition}: {e}")
+        return meta
+
+    def put(self, flow_name: str, partition: str, key: str, partial: Any = _NO_PARTIAL) -> None:
+        """Replace the entry of a partition, with its partial result if given."""
+        os.makedirs(os.path.join(self.directory, flow_name), exist_ok=True)
+        data_path = self._path(flow_name, partition, _DATA_SUFFIX)
+        meta = {"flow": flow_name, "partition": partition, "key": key, "created_at": datetime.now().isoformat()}
+
+        if partial is not _NO_PARTIAL:
+            compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(
+                pickle.dumps(partial, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+            with open(data_path + ".tmp", "wb") as f:
+                f.write(compressed)
+            os.replace(data_path + ".tmp", data_path)
+            meta["has_partial"] = True
+            meta["size_bytes"] = len(compressed)
+        elif os.path.exists(data_path):
+            os.remove(data_path)
+
+        meta_path = self._path(flow_name, partition, _META_SUFFIX)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def partitions(self, flow_name: str) -> Set[str]:
+        """Partitions with an entry for `flow_name`."""
+        try:
+            names = os.listdir(os.path.join(self.directory, flow_name))
+        except FileNotFoundError:
+            return set()
+        return {name[:-len(_META_SUFFIX)] for name in names if name.endswith(_META_SUFFIX)}
+
+    def remove(self, flow_name: str, partition: str) -> None:
+        """Forget a partition, e.g. one that was dropped from the database."""
+        for suffix in (_META_SUFFIX, _DATA_SUFFIX):
+            path = self._path(flow_name, partition, suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
@@ -0,0 +1,126 @@
+import time
+from collections import Counter
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..config import ITEMSET_CONFIG
+from .extract import MIN_PAIR_FREQUENCY
+from .itemsets import frequent_itemsets_from_counts, itemsets_to_most_common_products, iter_baskets
+from .transform import ProductProfileCounters, most_common_products, product_predominant_profile
+from .vectorized import profile_counters_from_columns
+
+# Partial transforms run in the worker processes: each turns the batches of
+# one partition into a result that can be merged with the other partitions'.
+
+def profile_counters_partial(batches: Iterable[list]) -> ProductProfileCounters:
+    """Count (product_id, product_name, gender, age) rows of one partition."""
+    return ProductProfileCounters().update(chain.from_iterable(batches))
+
+def vectorized_profile_counters_partial(batches: Iterable[list]) -> ProductProfileCounters:
+    """`profile_counters_partial` for the NumPy engine: each batch is counted from its columns."""
+    counters = ProductProfileCounters()
+    for batch in batches:
+        if batch:
+            _, product_names, genders, ages = zip(*batch)
+            counters.merge(profile_counters_from_columns(product_names, genders, ages))
+    return counters
+
+def profile_counts_partial(batches: Iterable[list]) -> ProductProfileCounters:
+    """Add pre-aggregated (product_id, product_name, gender, age range, count) rows of one partition."""
+    return ProductProfileCounters().update_counts(chain.from_iterable(batches))
+
+def pair_counts_partial(batches: Iterable[list]) -> Counter:
+    """Sum (produto1_nome, produto2_nome, frequencia) rows of one partition by pair."""
+    pairs = Counter()
+    for first, second, count in chain.from_iterable(batches):
+        pairs[(first, second)] += count
+    return pairs
+
+def basket_counts_partial(batches: Iterable[list]) -> Tuple[Counter, Dict[int, str]]:
+    """Collapse the (order_id, product_id, product_name) rows of one partition into weighted baskets."""
+    product_names = {}
+    baskets = Counter(
+        tuple(sorted(basket)) for basket in iter_baskets(chain.from_iterable(batches), product_names)
+    )
+    return baskets, product_names
+
+# Combiners fold one partial into another, so a stream of batches can be
+# reduced to a single partial as it arrives instead of keeping every one.
+
+def combine_profile_counters(total: ProductProfileCounters, other: ProductProfileCounters) -> ProductProfileCounters:
+    return total.merge(other)
+
+def combine_pair_counts(total: Counter, other: Counter) -> Counter:
+    total.update(other)
+    return total
+
+def combine_basket_counts(
+        total: Tuple[Counter, Dict[int, str]],
+        other: Tuple[Counter, Dict[int, str]]
+        ) -> Tuple[Counter, Dict[int, str]]:
+    total[0].update(other[0])
+    total[1].update(other[1])
+    return total
+
+def transform_partial(transform_fn: Callable[[Iterable], Any], batches: Iterable[list]) -> Any:
+    """Apply a flow's own transform to the rows of one partition."""
+    return transform_fn(chain.from_iterable(batches))
+
+def merge_profile_counters(partials: List[ProductProfileCounters]) -> Dict[str, Any]:
+    """Merge the counters of every partition into the predominant profile."""
+    counters = ProductProfileCounters()
+    for partial in partials:
+        counters.merge(partial)
+    return product_predominant_profile(counters)
+
+def merge_pair_counts(partials: List[Counter], min_frequency: int = MIN_PAIR_FREQUENCY) -> Dict[str, Any]:
+    """Sum the pair counts of every partition, then keep the pairs above `min_frequency`."""
+    pairs = Counter()
+    for partial in partials:
+        pairs.update(partial)
+    return most_common_products(
+        (first, second, count)
+        for (first, second), count in pairs.most_common()
+        if count > min_frequency
+    )
+
+def merge_basket_counts(
+        partials: List[Tuple[Counter, Dict[int, str]]],
+        min_support: Union[int, float] = ITEMSET_CONFIG['MIN_SUPPORT'],
+        max_size: Optional[int] = ITEMSET_CONFIG['MAX_SIZE']
+        ) -> Dict[str, Any]:
+    """Mine itemsets from the baskets of every partition."""
+    baskets = Counter()
+    product_names = {}
+    for partial_baskets, partial_names in partials:
+        baskets.update(partial_baskets)
+        product_names.update(partial_names)
+    itemsets = frequent_itemsets_from_counts(baskets, min_support, max_size, min_size=2)
+    return itemsets_to_most_common_products(itemsets, product_names)
+
+def run_partition(
+        stream_extract: Callable[..., Iterable[list]],
+        partial_transform: Callable[[Iterable[list]], Any],
+        extract_args: Dict[str, Any]
+        ) -> Dict[str, Any]:
+    """
+    Worker process entry point: extract one partition with `stream_extract`
+    on the worker's own connection and reduce it with `partial_transform`.
+    """
+    start = time.perf_counter()
+    stats = {"records_extracted": 0, "batches_extracted": 0}
+
+    def counted(batches):
+        for batch in batches:
+            stats["records_extracted"] += len(batch)
+            stats["batches_extracted"] += 1
+            yield batch
+
+    partial = partial_transform(counted(stream_extract(**extract_args)))
+    return {
+        "partial": partial,
+        "since_id": extract_args.get("since_id"),
+        "until_id": extract_args.get("until_id"),
+        "duration": time.perf_counter() - start,
+        **stats
+    }
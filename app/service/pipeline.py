@@ -1,18 +1,244 @@
+import asyncio
 import logging
+import multiprocessing
+from operator import attrgetter, itemgetter
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
-from typing import Dict, Any
+from functools import partial
+from itertools import chain
+from typing import Dict, Any, Iterator, List, Union
 import traceback
 
-from .extract import fetch_transaction_products, get_frequency_itemsets, extract_orders_with_customers_and_items
-from .transform import product_predominant_profile, most_common_products, transform_complete_orders_to_dw_format
-from .load import load_product_predominant_profile, load_most_common_products, load_complete_orders_to_dw
+from ..db.async_connection import create_async_mongo_client, create_async_postgres_pool
+from ..db.postgree_connection import get_postgres_pool_stats
+from ..config import (
+    ASYNC_CONFIG, CACHE_CONFIG, EXTRACT_CONFIG, ITEMSET_CONFIG, LOAD_CONFIG, METRICS_CONFIG, MONGO_CONFIG, PIPELINE_CONFIG,
+    STAGING_CONFIG, TRANSFORM_CONFIG
+)
+from ..utils.metrics import FlowInstrumentation, estimate_bytes
+from .extract import (
+    get_source_high_water_mark, fetch_transaction_products, get_frequency_itemsets, extract_orders_with_customers_and_items,
+    stream_transaction_products, stream_frequency_itemsets, stream_orders_with_customers_and_items,
+    fetch_order_baskets, stream_order_baskets, fetch_product_profile_counts, stream_product_profile_counts,
+    stream_sales_lines, group_sales_lines_into_orders, get_partition_ranges, MIN_PAIR_FREQUENCY,
+    get_source_fingerprint, get_sales_partitions, SOURCE_TABLES, SALES_TABLES
+)
+from .transform import (
+    product_predominant_profile, product_predominant_profile_from_counts, most_common_products,
+    transform_complete_orders_to_dw_format, OUTPUT_LAYOUT_VERSION
+)
+from .async_extract import (
+    fetch_transaction_products_async, stream_transaction_products_async, fetch_product_profile_counts_async,
+    stream_product_profile_counts_async, get_frequency_itemsets_async, stream_frequency_itemsets_async,
+    fetch_order_baskets_async, stream_order_baskets_async, extract_orders_with_customers_and_items_async,
+    stream_orders_with_customers_and_items_async
+)
+from .async_load import (
+    load_product_predominant_profile_async, load_most_common_products_async, load_complete_orders_to_dw_async,
+    bulk_load_product_predominant_profile_async, bulk_load_most_common_products_async,
+    bulk_load_complete_orders_to_dw_async
+)
+from .cache import ResultCache, result_cache_key
+from .itemsets import most_common_itemsets
+from .vectorized import product_predominant_profile_vectorized, transform_complete_orders_to_dw_format_vectorized
+from .load import (
+    load_product_predominant_profile, load_most_common_products, load_complete_orders_to_dw,
+    bulk_load_product_predominant_profile, bulk_load_most_common_products, bulk_load_complete_orders_to_dw,
+    upsert_product_predominant_profile, upsert_most_common_products, upsert_complete_orders_to_dw,
+    combine_load_stats
+)
+from .partition_state import PartitionStore
+from .partitioned import (
+    run_partition, transform_partial, profile_counters_partial, profile_counts_partial, pair_counts_partial,
+    basket_counts_partial, combine_profile_counters, combine_pair_counts, combine_basket_counts,
+    merge_profile_counters, merge_pair_counts, merge_basket_counts, vectorized_profile_counters_partial
+)
+from .shared_scan import ItemsetConsumer, OrdersConsumer, PairCountConsumer, ProfileConsumer
+from .stages import run_stages
+from .staging import (
+    StagingWriter, completed_stats, mark_complete, read_batches, remove_old_runs, remove_staging
+)
+from .state import get_watermark, save_watermark, get_checkpoint, save_checkpoint, clear_checkpoints
 
 logger = logging.getLogger(__name__)
 
 class ETLPipeline:
     """ Orquestrates the ETL process for the application. """
 
-    def __init__(self):
+    def __init__(
+            self,
+            streaming: bool = None,
+            itersize: int = None,
+            bulk_load: bool = None,
+            load_batch_size: int = None,
+            incremental: bool = None,
+            transform_engine: Union[str, Dict[str, str]] = None,
+            itemset_engine: str = None,
+            profile_pushdown: bool = None,
+            max_workers: int = None,
+            dependencies: Dict[str, List[str]] = None,
+            pipelined: bool = None,
+            queue_size: int = None,
+            shared_scan: bool = None,
+            partitions: int = None,
+            partition_workers: int = None,
+            date_partitions: bool = None,
+            trace_memory: bool = None,
+            profile_flows: List[str] = None,
+            resume: bool = False,
+            cache: bool = None,
+            refresh_cache: bool = False,
+            staging: bool = None,
+            staging_format: str = None,
+            from_staging: str = None,
+            async_mode: bool = None,
+            db_name: str = None
+        ):
+        """
+        Args:
+            streaming: Extract with server-side cursors and hand batches to the
+                transforms instead of materializing whole result sets.
+            itersize: Rows fetched per round trip in streaming mode.
+            bulk_load: Write one document per order/product/pair with batched
+                unordered writes instead of a single document per flow. Orders
+                are replaced by order id, so loading them again (a rerun, or a
+                resumed run reloading a batch that failed part way) does not
+                duplicate them.
+            load_batch_size: Documents per insert batch in bulk load mode.
+            incremental: Only read orders past each flow's stored high-water
+                mark and merge them into the warehouse with upserts.
+            transform_engine: 'python' or 'numpy', or a {flow_name: engine}
+                dict to choose per flow. Flows without a NumPy transform
+                always use the pure-Python one.
+            itemset_engine: 'sql' to count product pairs in Postgres, or
+                'fpgrowth' to mine itemsets of any size in-process (see
+                ITEMSET_CONFIG for support and size limits).
+            profile_pushdown: Have Postgres return grouped (product, gender,
+                age range) counts for the profile flow instead of one row
+                per sold item.
+            max_workers: Number of flows allowed to run at the same time.
+            dependencies: {flow_name: [flow names it must wait for]}. A flow
+                whose dependency failed is skipped.
+            pipelined: Run extract, transform and load of each flow as
+                concurrent stages connected by bounded queues of batches.
+            queue_size: Batches buffered between two stages in pipelined mode.
+            shared_scan: Read the joined sales lines once and feed every
+                flow's transform from that single pass, instead of one
+                query per flow. Not compatible with pipelined, staged,
+                cached, partitioned or concurrent runs, nor with profile
+                pushdown.
+            partitions: Split the orders of each flow into this many id
+                ranges, extracted and transformed in worker processes with
+                their own connections and merged before loading.
+            partition_workers: Worker processes in partitioned mode
+                (default: one per partition, up to the number of CPUs).
+            date_partitions: Process each monthly partition of the sales
+                tables on its own, in worker processes, skipping those not
+                written to since the flow last processed them. Flows keyed
+                by order upsert the documents of the changed partitions;
+                the others merge the partial results of the changed
+                partitions with those stored for the unchanged ones
+                (PIPELINE_CONFIG['PARTITION_STATE_DIR']). Requires tables
+                created with `app/db/models.py --partitioned`.
+            trace_memory: Record the peak Python memory of each stage with
+                tracemalloc (slows allocations down).
+            profile_flows: Names of the flows to run under cProfile; the
+                most expensive functions are added to their metrics.
+            resume: Continue the previous, unfinished run: flows it completed
+                are skipped and flows loaded batch by batch restart after
+                their last committed batch. Otherwise progress is reset.
+            cache: Fingerprint the source tables of each flow and skip the
+                flow when they did not change since it last loaded, or load
+                its cached output if only the load failed. Not used by
+                incremental or date partitioned runs, whose watermarks and
+                partition state already skip unchanged sources.
+            refresh_cache: Ignore cached results and stored partition state
+                (they are still refreshed).
+            staging: Spill the extracted rows and the transformed batches of
+                each flow to compressed files under STAGING_CONFIG['DIR'];
+                each stage streams the previous one's files back, so
+                datasets larger than memory can be processed.
+            staging_format: 'ndjson' or 'msgpack'.
+            from_staging: Id of a previous staged run to reload (implies
+                `staging`): flows whose transformed batches were all staged
+                by that run are loaded from its files, without extracting
+                and transforming again; the others run as usual under the
+                same run id.
+            async_mode: Run the flows as tasks on a single event loop, with
+                an asyncpg pool for the extracts and an AsyncMongoClient for
+                the loads (concurrency limits in ASYNC_CONFIG). Only full
+                runs with plain or streaming extraction are supported; the
+                result cache and checkpoints are not used.
+            db_name: MongoDB database of the loaded documents and of the
+                watermarks and checkpoints (default: MONGO_CONFIG['DATABASE']).
+        """
+        self.streaming = EXTRACT_CONFIG['STREAMING'] if streaming is None else streaming
+        self.itersize = itersize or EXTRACT_CONFIG['ITERSIZE']
+        self.bulk_load = LOAD_CONFIG['BULK'] if bulk_load is None else bulk_load
+        self.load_batch_size = load_batch_size or LOAD_CONFIG['BATCH_SIZE']
+        self.incremental = PIPELINE_CONFIG['INCREMENTAL'] if incremental is None else incremental
+        self.transform_engine = transform_engine or TRANSFORM_CONFIG['ENGINE']
+        self.itemset_engine = itemset_engine or ITEMSET_CONFIG['ENGINE']
+        self.profile_pushdown = EXTRACT_CONFIG['PROFILE_PUSHDOWN'] if profile_pushdown is None else profile_pushdown
+        if self.itemset_engine not in ("sql", "fpgrowth"):
+            raise ValueError(f"Unknown itemset engine: {self.itemset_engine}")
+        if self.incremental and self.itemset_engine == "fpgrowth":
+            # Supports of itemsets mined from a delta cannot be merged with the stored ones
+            raise ValueError("The fpgrowth itemset engine does not support incremental runs")
+        self.max_workers = max_workers or PIPELINE_CONFIG['MAX_WORKERS']
+        self.dependencies = PIPELINE_CONFIG['FLOW_DEPENDENCIES'] if dependencies is None else dependencies
+        self.pipelined = PIPELINE_CONFIG['PIPELINED'] if pipelined is None else pipelined
+        self.queue_size = queue_size or PIPELINE_CONFIG['QUEUE_SIZE']
+        self.shared_scan = PIPELINE_CONFIG['SHARED_SCAN'] if shared_scan is None else shared_scan
+        self.partitions = partitions or PIPELINE_CONFIG['PARTITIONS']
+        # Capped by the number of partitions of each step
+        self.partition_workers = partition_workers or PIPELINE_CONFIG['PARTITION_WORKERS'] or os.cpu_count() or 1
+        self.date_partitions = PIPELINE_CONFIG['DATE_PARTITIONS'] if date_partitions is None else date_partitions
+        self.sales_partitions = None
+        self.partition_store = PartitionStore() if self.date_partitions else None
+        self.trace_memory = METRICS_CONFIG['TRACE_MEMORY'] if trace_memory is None else trace_memory
+        self.profile_flows = METRICS_CONFIG['PROFILE_FLOWS'] if profile_flows is None else profile_flows
+        self.resume = resume
+        cache = CACHE_CONFIG['ENABLED'] if cache is None else cache
+        self.cache = ResultCache() if cache and not (self.incremental or self.date_partitions) else None
+        self.refresh_cache = refresh_cache
+        self.source_fingerprint = None
+        self.from_staging = from_staging
+        self.staging = bool(from_staging) or (STAGING_CONFIG['ENABLED'] if staging is None else staging)
+        self.staging_format = staging_format or STAGING_CONFIG['FORMAT']
+        self.run_id = None
+        if self.staging and (self.streaming or self.pipelined) and (self.bulk_load or self.incremental):
+            # Those runs load batch by batch and resume from checkpoints instead
+            raise ValueError(
+                "Staged mode does not support streaming or pipelined runs with bulk or incremental loads"
+            )
+        if self.from_staging and self.incremental:
+            # The staged window may end before the current high-water mark
+            raise ValueError("Reloading a staged run does not support incremental runs")
+        self.async_mode = ASYNC_CONFIG['ENABLED'] if async_mode is None else async_mode
+        if self.async_mode and (
+                self.incremental or self.pipelined or self.shared_scan or self.staging or self.partitions > 1):
+            raise ValueError(
+                "Async mode does not support incremental, pipelined, shared scan, staged or partitioned runs"
+            )
+        if self.date_partitions and (self.incremental or self.shared_scan or self.partitions > 1 or self.async_mode):
+            raise ValueError(
+                "Date partitioned mode does not support incremental, shared scan, id range partitioned or async runs"
+            )
+        if self.shared_scan and (
+                self.pipelined or self.staging or self.cache or self.partitions > 1 or self.max_workers > 1
+                or self.profile_pushdown):
+            # The single scan feeds every flow itself, in one thread, from the sales lines
+            raise ValueError(
+                "Shared scan mode does not support pipelined, staged, cached, id range partitioned or concurrent "
+                "runs, nor profile pushdown"
+            )
+        self.db_name = db_name or MONGO_CONFIG['DATABASE']
+        self.max_concurrent_flows = ASYNC_CONFIG['MAX_CONCURRENT_FLOWS']
+        self.max_concurrent_batches = ASYNC_CONFIG['MAX_CONCURRENT_BATCHES']
+        self.max_concurrent_writes = ASYNC_CONFIG['MAX_CONCURRENT_WRITES']
+        self.high_water_mark = None
         self.start_time = None
         self.end_time = None
         self.metrics = {
@@ -21,72 +247,1199 @@ class ETLPipeline:
             "success": {}
         }
 
-    def _run_etl_step(self, name, extract_fn, transform_fn, load_fn):
+    def _iter_streamed_rows(self, batches, step_metrics, instrumentation) -> Iterator:
+        """
+        Flatten a stream of batches into rows while recording extract metrics.
+        Only the time spent waiting for the next batch counts as extract time.
+        """
+        step_metrics["batches_extracted"] = 0
+        for batch in instrumentation.timed_batches("extract", batches):
+            step_metrics["batches_extracted"] += 1
+            yield from batch
+
+    def _run_etl_step(self, name, extract_fn, transform_fn, load_fn, instrumentation=None):
         """Helper method to run a single ETL flow"""
+        instrumentation = instrumentation or FlowInstrumentation(name)
         step_metrics = {}
 
-        # Extract
+        if self.streaming:
+            # Extract + Transform, interleaved batch by batch
+            rows = self._iter_streamed_rows(extract_fn(), step_metrics, instrumentation)
+            with instrumentation.stage("transform") as transform_metrics:
+                transformed_data = transform_fn(rows)
+            extract_metrics = instrumentation.stage_metrics("extract")
+            # The transform pulled the batches: waiting for them is extract time
+            transform_metrics.seconds -= extract_metrics.seconds
+        else:
+            # Extract
+            with instrumentation.stage("extract") as extract_metrics:
+                raw_data = extract_fn()
+                extract_metrics.rows_out = len(raw_data) if hasattr(raw_data, '__len__') else 0
+                extract_metrics.bytes_out = estimate_bytes(raw_data) if isinstance(raw_data, list) else 0
+
+            # Transform
+            with instrumentation.stage("transform") as transform_metrics:
+                transformed_data = transform_fn(raw_data)
+
+        transform_metrics.rows_in = extract_metrics.rows_out
+        transform_metrics.bytes_in = extract_metrics.bytes_out
+        documents = transformed_data.get("data", []) if isinstance(transformed_data, dict) else []
+        transform_metrics.rows_out = len(documents)
+        transform_metrics.bytes_out = estimate_bytes(documents)
+
+        # Load
+        with instrumentation.stage("load") as load_metrics:
+            load_metrics.rows_in = transform_metrics.rows_out
+            load_metrics.bytes_in = transform_metrics.bytes_out
+            load_result = load_fn(transformed_data)
+
+        step_metrics["extract_duration"] = extract_metrics.seconds
+        step_metrics["records_extracted"] = extract_metrics.rows_out
+        step_metrics["transform_duration"] = transform_metrics.seconds
+        step_metrics["load_duration"] = load_metrics.seconds
+
+        # Bulk loaders report their own statistics instead of a plain flag
+        if isinstance(load_result, dict):
+            step_metrics["load_stats"] = load_result
+            load_success = load_result.get("success", False)
+            load_metrics.rows_out = load_result.get("documents_loaded", 0)
+        else:
+            load_success = load_result
+            load_metrics.rows_out = 1 if load_success else 0
+        step_metrics["success"] = load_success
+
+        return step_metrics, load_success
+
+    def _run_checkpointed_step(self, name, flow, extract_fn, transform_fn, load_fn, instrumentation, batches_loaded=0):
+        """
+        Run a single ETL flow batch by batch, loading each transformed batch
+        and recording a checkpoint (last order id, batches loaded) once it is
+        committed. Stops at the first batch that fails to load, so a resumed
+        run starts again with that batch.
+        """
+        step_metrics = {"resumed_batches": batches_loaded}
+        checkpoint_key = flow["checkpoint_key"]
+        load_results = []
+
+        for batch in instrumentation.timed_batches("extract", extract_fn()):
+            with instrumentation.stage("transform") as transform_metrics:
+                transformed_data = transform_fn(batch)
+                transform_metrics.rows_in += len(batch)
+                transform_metrics.rows_out += len(transformed_data.get("data", []))
+
+            with instrumentation.stage("load") as load_metrics:
+                load_result = load_fn(transformed_data)
+            load_results.append(load_result)
+            if isinstance(load_result, dict):
+                load_metrics.rows_out += load_result.get("documents_loaded", 0)
+                batch_success = load_result.get("success", False)
+            else:
+                batch_success = load_result
+            if not batch_success:
+                logger.error(f"Flow {name}: batch {batches_loaded + 1} failed to load, stopping at the last checkpoint")
+                break
+
+            batches_loaded += 1
+            save_checkpoint(
+                name, last_order_id=checkpoint_key(batch[-1]), batches_loaded=batches_loaded, db_name=self.db_name
+            )
+
+        extract_metrics = instrumentation.stage_metrics("extract")
+        step_metrics["extract_duration"] = extract_metrics.seconds
+        step_metrics["records_extracted"] = extract_metrics.rows_out
+        step_metrics["transform_duration"] = instrumentation.stage_metrics("transform").seconds
+        step_metrics["load_duration"] = instrumentation.stage_metrics("load").seconds
+        step_metrics["batches_loaded"] = batches_loaded
+
+        if all(isinstance(result, dict) for result in load_results):
+            step_metrics["load_stats"] = combine_load_stats(load_results)
+            load_success = step_metrics["load_stats"]["success"]
+        else:
+            load_success = all(load_results)
+        step_metrics["success"] = load_success
+
+        return step_metrics, load_success
+
+    def _run_staged_step(self, name, extract_fn, transform_fn, load_fn, batch_transform, instrumentation):
+        """
+        Run a single ETL flow through staging files: the extracted batches are
+        written to disk, the transform streams them back and writes its
+        results, and the load streams those. Files are kept if the flow fails,
+        so its output can be inspected or reloaded.
+        """
+        flow_dir = os.path.join(STAGING_CONFIG['DIR'], self.run_id, name)
+        extract_dir = os.path.join(flow_dir, "extract")
+        transform_dir = os.path.join(flow_dir, "transform")
+        transform_stats = completed_stats(transform_dir) if self.from_staging else None
+        reloaded = transform_stats is not None
+        if reloaded:
+            logger.info(f"Reloading the transformed batches of {name} staged in {transform_dir}")
+        else:
+            # Drop the files of an interrupted attempt before writing the parts again
+            remove_staging(flow_dir)
+
+        with instrumentation.stage("extract") as extract_metrics:
+            if reloaded:
+                extract_stats = completed_stats(extract_dir) or {"rows": 0, "raw_bytes": 0}
+            else:
+                extract_stats = StagingWriter(extract_dir, self.staging_format).write_all(extract_fn())
+                mark_complete(extract_dir, extract_stats)
+                extract_metrics.rows_out = extract_stats["rows"]
+                extract_metrics.bytes_out = extract_stats["raw_bytes"]
+
+        with instrumentation.stage("transform") as transform_metrics:
+            if not reloaded:
+                staged_batches = read_batches(extract_dir)
+                if batch_transform:
+                    results = (transform_fn(batch) for batch in staged_batches)
+                else:
+                    results = iter([transform_fn(chain.from_iterable(staged_batches))])
+                transform_stats = StagingWriter(transform_dir, self.staging_format).write_all(
+                    [result] for result in results
+                )
+                mark_complete(transform_dir, transform_stats)
+                transform_metrics.rows_in = extract_stats["rows"]
+                transform_metrics.bytes_out = transform_stats["raw_bytes"]
+
+        with instrumentation.stage("load") as load_metrics:
+            results = (batch[0] for batch in read_batches(transform_dir))
+            if self.bulk_load or self.incremental:
+                load_results = [load_fn(result) for result in results]
+            else:
+                # A single document per flow: merge the staged batch results
+                results = list(results) or [transform_fn([])]
+                load_results = [load_fn(self._merge_envelopes(results))]
+
+        step_metrics = {
+            "extract_duration": extract_metrics.seconds,
+            "records_extracted": extract_stats["rows"],
+            "transform_duration": transform_metrics.seconds,
+            "load_duration": load_metrics.seconds,
+            "staging": {"extract": extract_stats, "transform": transform_stats, "reloaded": reloaded}
+        }
+        if all(isinstance(result, dict) for result in load_results):
+            step_metrics["load_stats"] = combine_load_stats(load_results)
+            load_success = step_metrics["load_stats"]["success"]
+        else:
+            load_success = all(load_results)
+        step_metrics["success"] = load_success
+
+        if load_success and not STAGING_CONFIG['KEEP']:
+            remove_staging(flow_dir)
+            try:
+                os.rmdir(os.path.dirname(flow_dir))
+            except OSError:
+                # Other flows of the run are still staged
+                pass
+        elif not load_success:
+            logger.warning(f"Flow {name} failed; staged files kept in {flow_dir}")
+        return step_metrics, load_success
+
+    def _run_pipelined_step(self, name, extract_fn, transform_fn, load_fn, batch_transform=False):
+        """
+        Run a single ETL flow as concurrent extract, transform and load stages
+        connected by bounded queues of batches.
+
+        Transforms marked as `batch_transform` map each batch independently;
+        the others consume the whole stream and emit one result. Loaders
+        writing one document per entry load each result as it arrives.
+        """
+        step_metrics = {"records_extracted": 0, "batches_extracted": 0}
+
+        def extract():
+            for batch in extract_fn():
+                step_metrics["records_extracted"] += len(batch)
+                step_metrics["batches_extracted"] += 1
+                yield batch
+
+        def transform(batches):
+            if batch_transform:
+                for batch in batches:
+                    yield transform_fn(batch)
+            else:
+                yield transform_fn(chain.from_iterable(batches))
+
+        def load(results):
+            if self.bulk_load or self.incremental:
+                for result in results:
+                    yield load_fn(result)
+            else:
+                # A single document per flow: wait for every transformed batch
+                results = list(results) or [transform_fn([])]
+                yield load_fn(self._merge_envelopes(results))
+
+        load_results, stage_metrics = run_stages(
+            extract, [("transform", transform), ("load", load)], queue_size=self.queue_size
+        )
+        step_metrics.update(stage_metrics)
+
+        if all(isinstance(result, dict) for result in load_results):
+            step_metrics["load_stats"] = combine_load_stats(load_results)
+            load_success = step_metrics["load_stats"]["success"]
+        else:
+            load_success = all(load_results)
+        step_metrics["success"] = load_success
+
+        logger.info(f"Flow {name} bottleneck stage: {stage_metrics['bottleneck']}")
+        return step_metrics, load_success
+
+    def _run_partitioned_step(self, name, flow, extract_args, transform_fn, load_fn):
+        """
+        Run a single ETL flow over id range partitions. Every partition is
+        extracted and reduced to a mergeable partial result (counters, pair
+        counts, transformed documents) in a worker process; the partials are
+        merged and loaded by this process.
+        """
+        step_metrics = {}
+        extract_args = dict(extract_args)
+        since_id = extract_args.pop("since_id", 0)
+        until_id = extract_args.pop("until_id", None)
+        extract_args.update(flow.get("partition_extract_args", {}))
+
+        ranges = get_partition_ranges(self.partitions, since_id, until_id)
+        partial_transform = self._partial_transform(flow, transform_fn)
+        merge_partials = flow.get("merge_partials") or self._merge_envelopes
+
+        # Workers are spawned rather than forked so they do not inherit the
+        # parent's connections or the locks held by other flow threads.
         extract_start = datetime.now()
-        raw_data = extract_fn()
+        with ProcessPoolExecutor(
+                max_workers=min(self.partition_workers, len(ranges)),
+                mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+            futures = [
+                executor.submit(run_partition, flow["stream_extract"], partial_transform, {
+                    "itersize": self.itersize, "since_id": lower, "until_id": upper, **extract_args
+                })
+                for lower, upper in ranges
+            ]
+            partitions = [future.result() for future in futures]
         extract_end = datetime.now()
         step_metrics["extract_duration"] = (extract_end - extract_start).total_seconds()
-        step_metrics["records_extracted"] = len(raw_data) if hasattr(raw_data, '__len__') else 0
+        step_metrics["records_extracted"] = sum(p["records_extracted"] for p in partitions)
+        step_metrics["partitions"] = [
+            {key: value for key, value in p.items() if key != "partial"} for p in partitions
+        ]
 
-        # Transform
-        transform_start = datetime.now()
-        transformed_data = transform_fn(raw_data)
-        transform_end = datetime.now()
-        step_metrics["transform_duration"] = (transform_end - transform_start).total_seconds()
+        merge_start = datetime.now()
+        transformed_data = merge_partials([p["partial"] for p in partitions])
+        step_metrics["transform_duration"] = (datetime.now() - merge_start).total_seconds()
 
-        # Load
         load_start = datetime.now()
-        load_success = load_fn(transformed_data)
-        load_end = datetime.now()
-        step_metrics["load_duration"] = (load_end - load_start).total_seconds()
+        load_result = load_fn(transformed_data)
+        step_metrics["load_duration"] = (datetime.now() - load_start).total_seconds()
+
+        if isinstance(load_result, dict):
+            step_metrics["load_stats"] = load_result
+            load_success = load_result.get("success", False)
+        else:
+            load_success = load_result
         step_metrics["success"] = load_success
 
         return step_metrics, load_success
 
+    def _run_date_partitioned_step(self, flow, transform_fn, load_fn):
+        """
+        Run a single ETL flow over the monthly partitions of the sales
+        tables. Only the partitions whose sources changed since the flow
+        last processed them are extracted, each reduced to a partial result
+        in a worker process, `partition_workers` at a time.
+
+        Flows with `partition_upsert` upsert the documents of each changed
+        partition as soon as it is done. The others merge the partials of the
+        changed partitions with those stored for the unchanged ones, and
+        load the merged result.
+        """
+        name = flow["name"]
+        upsert = flow.get("partition_upsert", False)
+        step_metrics = {"date_partitions": True}
+
+        # A partition's output also depends on the dimension tables it joins
+        dimensions = {
+            table: self.source_fingerprint[table]
+            for table in flow.get("sources", SOURCE_TABLES) if table not in SALES_TABLES
+        }
+        settings = self._output_settings(flow)
+        keys = {
+            partition: result_cache_key(
+                f"{name}:{partition}", {"sales": counters, "dimensions": dimensions}, settings
+            )
+            for partition, counters in self.sales_partitions.items()
+        }
+
+        stored = {}
+        touched = []
+        for partition in sorted(keys):
+            entry = None if self.refresh_cache else self.partition_store.get(name, partition, keys[partition])
+            if entry is not None and (upsert or "partial" in entry):
+                stored[partition] = entry.get("partial")
+            else:
+                touched.append(partition)
+        # Partitions dropped from the database since the last run
+        dropped = sorted(self.partition_store.partitions(name) - keys.keys())
+        step_metrics["partitions_touched"] = touched
+        step_metrics["partitions_unchanged"] = len(stored)
+        step_metrics["partitions_dropped"] = dropped
+
+        if not touched and (upsert or not dropped):
+            logger.info(f"No sales partition of {name} changed since its last run, skipping")
+            for partition in dropped:
+                self.partition_store.remove(name, partition)
+            step_metrics["skipped"] = True
+            step_metrics["success"] = True
+            return step_metrics, True
+
+        if upsert:
+            partial_transform = partial(transform_partial, transform_fn)
+            load_fn = partial(flow["upsert_load"], batch_size=self.load_batch_size)
+        else:
+            partial_transform = self._partial_transform(flow, transform_fn)
+        extract_args = {"itersize": self.itersize, **flow.get("partition_extract_args", {})}
+
+        partition_metrics = {}
+        partials = {}
+        load_results = []
+        load_duration = 0.0
+        extract_start = datetime.now()
+        if touched:
+            logger.info(f"Processing {len(touched)} changed sales partitions of {name}: {touched}")
+            # Spawned like the id range partition workers, see `_run_partitioned_step`
+            with ProcessPoolExecutor(
+                    max_workers=min(self.partition_workers, len(touched)),
+                    mp_context=multiprocessing.get_context("spawn")
+                    ) as executor:
+                futures = {
+                    executor.submit(
+                        run_partition, flow["stream_extract"], partial_transform,
+                        {**extract_args, "partition": partition}
+                    ): partition
+                    for partition in touched
+                }
+                for future in as_completed(futures):
+                    partition = futures[future]
+                    result = future.result()
+                    partials[partition] = result.pop("partial")
+                    partition_metrics[partition] = {
+                        key: value for key, value in result.items() if key not in ("since_id", "until_id")
+                    }
+                    if upsert:
+                        # Load while the other partitions are still being extracted
+                        load_start = datetime.now()
+                        load_result = load_fn(partials.pop(partition))
+                        load_duration += (datetime.now() - load_start).total_seconds()
+                        load_results.append(load_result)
+                        partition_metrics[partition]["success"] = load_result.get("success", False)
+                        if partition_metrics[partition]["success"]:
+                            self.partition_store.put(name, partition, keys[partition])
+        step_metrics["extract_duration"] = (datetime.now() - extract_start).total_seconds() - load_duration
+        step_metrics["records_extracted"] = sum(metrics["records_extracted"] for metrics in partition_metrics.values())
+        step_metrics["partitions"] = partition_metrics
+
+        if upsert:
+            step_metrics["load_duration"] = load_duration
+            step_metrics["load_stats"] = combine_load_stats(load_results)
+            success = step_metrics["load_stats"]["success"]
+        else:
+            merge_start = datetime.now()
+            merge_partials = flow.get("merge_partials") or self._merge_envelopes
+            all_partials = [stored[partition] for partition in sorted(stored)]
+            all_partials += [partials[partition] for partition in touched]
+            transformed_data = merge_partials(all_partials) if all_partials else transform_fn([])
+            step_metrics["transform_duration"] = (datetime.now() - merge_start).total_seconds()
+
+            load_start = datetime.now()
+            load_result = load_fn(transformed_data)
+            step_metrics["load_duration"] = (datetime.now() - load_start).total_seconds()
+            if isinstance(load_result, dict):
+                step_metrics["load_stats"] = load_result
+                success = load_result.get("success", False)
+            else:
+                success = load_result
+            if success:
+                # Only partials that made it into the warehouse are kept
+                for partition in touched:
+                    self.partition_store.put(name, partition, keys[partition], partials[partition])
+
+        if success:
+            for partition in dropped:
+                self.partition_store.remove(name, partition)
+        step_metrics["success"] = success
+        return step_metrics, success
+
+    @staticmethod
+    def _merge_envelopes(results):
+        """Concatenate the data of several transform results into the first one's envelope."""
+        merged = {key: value for key, value in results[0].items() if key != "data"}
+        merged["data"] = [entry for result in results for entry in result["data"]]
+        return merged
+
+    def _etl_flows(self):
+        """Define ETL flows"""
+        if self.profile_pushdown:
+            product_profile = {
+                "name": "product_profile",
+                "sources": ("vendas", "itens_venda", "clientes", "produtos"),
+                "extract": fetch_product_profile_counts,
+                "stream_extract": stream_product_profile_counts,
+                "async_extract": fetch_product_profile_counts_async,
+                "async_stream_extract": stream_product_profile_counts_async,
+                "transform": product_predominant_profile_from_counts,
+                "partial_transform": profile_counts_partial,
+                "combine_partials": combine_profile_counters,
+                "merge_partials": merge_profile_counters,
+                "load": load_product_predominant_profile,
+                "bulk_load": bulk_load_product_predominant_profile,
+                "upsert_load": upsert_product_predominant_profile,
+                "async_load": load_product_predominant_profile_async,
+                "async_bulk_load": bulk_load_product_predominant_profile_async
+            }
+        else:
+            product_profile = {
+                "name": "product_profile",
+                "sources": ("vendas", "itens_venda", "clientes", "produtos"),
+                "extract": fetch_transaction_products,
+                "stream_extract": stream_transaction_products,
+                "async_extract": fetch_transaction_products_async,
+                "async_stream_extract": stream_transaction_products_async,
+                "transform": product_predominant_profile,
+                "vectorized_transform": product_predominant_profile_vectorized,
+                "partial_transform": profile_counters_partial,
+                "vectorized_partial_transform": vectorized_profile_counters_partial,
+                "combine_partials": combine_profile_counters,
+                "merge_partials": merge_profile_counters,
+                "load": load_product_predominant_profile,
+                "bulk_load": bulk_load_product_predominant_profile,
+                "upsert_load": upsert_product_predominant_profile,
+                "async_load": load_product_predominant_profile_async,
+                "async_bulk_load": bulk_load_product_predominant_profile_async
+            }
+
+        if self.itemset_engine == "fpgrowth":
+            common_products = {
+                "name": "common_products",
+                "sources": ("itens_venda", "produtos"),
+                "extract": fetch_order_baskets,
+                "stream_extract": stream_order_baskets,
+                "async_extract": fetch_order_baskets_async,
+                "async_stream_extract": stream_order_baskets_async,
+                "transform": partial(
+                    most_common_itemsets,
+                    min_support=ITEMSET_CONFIG['MIN_SUPPORT'],
+                    max_size=ITEMSET_CONFIG['MAX_SIZE']
+                ),
+                "partial_transform": basket_counts_partial,
+                "combine_partials": combine_basket_counts,
+                # A basket may span two streamed batches: keep the rows of an order together
+                "group_key": itemgetter(0),
+                "merge_partials": partial(
+                    merge_basket_counts,
+                    min_support=ITEMSET_CONFIG['MIN_SUPPORT'],
+                    max_size=ITEMSET_CONFIG['MAX_SIZE']
+                ),
+                "load": load_most_common_products,
+                "bulk_load": bulk_load_most_common_products,
+                "async_load": load_most_common_products_async,
+                "async_bulk_load": bulk_load_most_common_products_async
+            }
+        else:
+            common_products = {
+                "name": "common_products",
+                "sources": ("vendas", "itens_venda", "produtos"),
+                "extract": get_frequency_itemsets,
+                "stream_extract": stream_frequency_itemsets,
+                "async_extract": get_frequency_itemsets_async,
+                "async_stream_extract": stream_frequency_itemsets_async,
+                # Deltas are merged by summing counts, so keep every pair
+                "incremental_extract_args": {"min_frequency": 0},
+                "transform": most_common_products,
+                "batch_transform": True,
+                # Pair counts are only filtered once every partition is summed
+                "partition_extract_args": {"min_frequency": 0},
+                "partial_transform": pair_counts_partial,
+                "combine_partials": combine_pair_counts,
+                "merge_partials": partial(
+                    merge_pair_counts, min_frequency=0 if self.incremental else MIN_PAIR_FREQUENCY
+                ),
+                "load": load_most_common_products,
+                "bulk_load": bulk_load_most_common_products,
+                "upsert_load": upsert_most_common_products,
+                "async_load": load_most_common_products_async,
+                "async_bulk_load": bulk_load_most_common_products_async
+            }
+
+        flows = [
+            product_profile,
+            common_products,
+            {
+                "name": "orders",
+                "sources": ("vendas", "itens_venda", "clientes", "produtos", "categorias"),
+                "extract": extract_orders_with_customers_and_items,
+                "stream_extract": stream_orders_with_customers_and_items,
+                "async_extract": extract_orders_with_customers_and_items_async,
+                "async_stream_extract": stream_orders_with_customers_and_items_async,
+                "transform": transform_complete_orders_to_dw_format,
+                "vectorized_transform": transform_complete_orders_to_dw_format_vectorized,
+                "batch_transform": True,
+                # Batches are ordered by order id, so a run can resume after the last one loaded
+                "checkpoint_key": attrgetter("id"),
+                # Documents are keyed by order: only the changed date partitions are reloaded
+                "partition_upsert": True,
+                "load": load_complete_orders_to_dw,
+                "bulk_load": bulk_load_complete_orders_to_dw,
+                "upsert_load": upsert_complete_orders_to_dw,
+                "async_load": load_complete_orders_to_dw_async,
+                "async_bulk_load": bulk_load_complete_orders_to_dw_async
+            }
+        ]
+        for flow in flows:
+            for key in ("load", "bulk_load", "upsert_load", "async_load", "async_bulk_load"):
+                if key in flow:
+                    flow[key] = partial(flow[key], db_name=self.db_name)
+        return flows
+
+    def _transform_fn(self, flow):
+        """Pick the transform of a flow for the configured engine."""
+        engine = self.transform_engine
+        if isinstance(engine, dict):
+            engine = engine.get(flow["name"], TRANSFORM_CONFIG['ENGINE'])
+        if engine not in ("python", "numpy"):
+            raise ValueError(f"Unknown transform engine: {engine}")
+        if engine == "numpy" and "vectorized_transform" in flow:
+            return "numpy", flow["vectorized_transform"]
+        return "python", flow["transform"]
+
+    def _partial_transform(self, flow, transform_fn):
+        """
+        Pick the per-partition (or per-batch) transform of a flow, for the
+        same engine as its transform so the reported engine is the one that ran.
+        """
+        engine, _ = self._transform_fn(flow)
+        if engine == "numpy" and "vectorized_partial_transform" in flow:
+            return flow["vectorized_partial_transform"]
+        return flow.get("partial_transform") or partial(transform_partial, transform_fn)
+
+    def _load_fn(self, flow):
+        """Pick the loader of a flow for the current mode."""
+        if self.incremental:
+            return partial(flow["upsert_load"], watermark=self.high_water_mark[0], batch_size=self.load_batch_size)
+        if self.bulk_load:
+            return partial(flow["bulk_load"], batch_size=self.load_batch_size)
+        return flow["load"]
+
+    def _flow_since_id(self, flow):
+        """
+        Returns (order id an incremental run of the flow starts after, whether
+        there are new orders past it).
+        """
+        until_id = self.high_water_mark[0]
+        watermark = get_watermark(flow["name"], db_name=self.db_name)
+        since_id = watermark["last_order_id"] if watermark else 0
+        if until_id is None or since_id >= until_id:
+            logger.info(f"No new orders for {flow['name']} since order id {since_id}, skipping")
+            return since_id, False
+        return since_id, True
+
+    def _output_settings(self, flow):
+        """Every setting that shapes the output of a flow, as keyed by the result cache and partition state."""
+        return {
+            "layout_version": OUTPUT_LAYOUT_VERSION,
+            "bulk_load": self.bulk_load,
+            "transform_engine": self._transform_fn(flow)[0],
+            "profile_pushdown": self.profile_pushdown,
+            "itemset_engine": self.itemset_engine,
+            "min_support": ITEMSET_CONFIG['MIN_SUPPORT'],
+            "max_itemset_size": ITEMSET_CONFIG['MAX_SIZE'],
+            "min_pair_frequency": MIN_PAIR_FREQUENCY
+        }
+
+    def _cache_key(self, flow):
+        """Result cache key of a flow for the current sources and settings, or None if not cached."""
+        if self.cache is None or self.source_fingerprint is None or "sources" not in flow:
+            return None
+        return result_cache_key(
+            flow["name"],
+            {table: self.source_fingerprint[table] for table in flow["sources"]},
+            self._output_settings(flow)
+        )
+
+    def _load_cached_output(self, flow, output, cache_key):
+        """Load the cached transform output of a flow whose previous load failed."""
+        logger.info(f"Sources of {flow['name']} unchanged, loading its cached output")
+        started_at = datetime.now()
+        instrumentation = FlowInstrumentation(flow["name"])
+        with instrumentation.stage("load") as load_metrics:
+            load_metrics.rows_in = len(output.get("data", []))
+            load_result = self._load_fn(flow)(output)
+
+        metrics = {"cache": "hit", "load_duration": load_metrics.seconds}
+        if isinstance(load_result, dict):
+            metrics["load_stats"] = load_result
+            success = load_result.get("success", False)
+        else:
+            success = load_result
+        if success:
+            self.cache.mark_loaded(flow["name"], cache_key)
+        metrics.update(instrumentation.to_dict())
+        metrics["success"] = success
+        metrics["started_at"] = started_at.isoformat()
+        metrics["finished_at"] = datetime.now().isoformat()
+        return metrics, success
+
+    def _run_flow(self, flow):
+        """Resolve the extract and load functions of a flow for the current mode and run it."""
+        checkpoint = get_checkpoint(flow["name"], db_name=self.db_name) if self.resume else None
+        if checkpoint and checkpoint.get("completed"):
+            logger.info(f"Flow {flow['name']} completed in the previous run, skipping")
+            return {"skipped": True, "resumed": True, "success": True}, True
+
+        cache_key = self._cache_key(flow)
+        if cache_key and not self.refresh_cache:
+            entry = self.cache.get(flow["name"], cache_key)
+            if entry and entry.get("loaded"):
+                logger.info(f"Sources of {flow['name']} unchanged since its last load, skipping")
+                return {"skipped": True, "cache": "unchanged", "success": True}, True
+            if entry and "output" in entry:
+                return self._load_cached_output(flow, entry["output"], cache_key)
+
+        # Flows whose batches are loaded as they come can resume after their
+        # last committed batch; the others rerun as a whole.
+        checkpointed = (
+            "checkpoint_key" in flow
+            and (self.streaming or self.pipelined)
+            and (self.bulk_load or self.incremental)
+            and self.partitions <= 1
+            and not self.date_partitions
+        )
+        batches_loaded = 0
+        resume_after = 0
+        if checkpointed and checkpoint and checkpoint.get("last_order_id") is not None:
+            resume_after = checkpoint["last_order_id"]
+            batches_loaded = checkpoint.get("batches_loaded", 0)
+            logger.info(f"Resuming flow {flow['name']} after order id {resume_after} ({batches_loaded} batches loaded)")
+
+        extract_args = {"since_id": resume_after} if resume_after else {}
+        if self.incremental:
+            until_id, until_date = self.high_water_mark
+            since_id, has_new_orders = self._flow_since_id(flow)
+            if not has_new_orders:
+                return {"skipped": True, "watermark": since_id, "success": True}, True
+            extract_args = {
+                "since_id": max(since_id, resume_after), "until_id": until_id,
+                **flow.get("incremental_extract_args", {})
+            }
+
+        if self.streaming or self.pipelined or self.staging:
+            extract_fn = partial(flow["stream_extract"], itersize=self.itersize, **extract_args)
+        else:
+            extract_fn = partial(flow["extract"], **extract_args)
+
+        load_fn = self._load_fn(flow)
+
+        engine, transform_fn = self._transform_fn(flow)
+        cached_output = False
+        if cache_key and not (checkpointed or self.pipelined or self.staging or self.partitions > 1):
+            # Single transform result: keep it so a failed load can be retried from the cache
+            flow_transform_fn = transform_fn
+
+            def transform_fn(data):
+                nonlocal cached_output
+                result = flow_transform_fn(data)
+                self.cache.put(flow["name"], cache_key, result)
+                cached_output = True
+                return result
+
+        instrumentation = FlowInstrumentation(
+            flow["name"],
+            trace_memory=self.trace_memory,
+            profile=flow["name"] in self.profile_flows,
+            profile_top=METRICS_CONFIG['PROFILE_TOP']
+        )
+        started_at = datetime.now()
+        with instrumentation.flow():
+            if self.date_partitions:
+                metrics, success = self._run_date_partitioned_step(flow, transform_fn, load_fn)
+            elif self.partitions > 1:
+                metrics, success = self._run_partitioned_step(flow["name"], flow, extract_args, transform_fn, load_fn)
+            elif checkpointed:
+                metrics, success = self._run_checkpointed_step(
+                    flow["name"], flow, extract_fn, transform_fn, load_fn, instrumentation, batches_loaded
+                )
+            elif self.staging:
+                metrics, success = self._run_staged_step(
+                    flow["name"], extract_fn, transform_fn, load_fn, flow.get("batch_transform", False), instrumentation
+                )
+            elif self.pipelined:
+                metrics, success = self._run_pipelined_step(
+                    flow["name"], extract_fn, transform_fn, load_fn, flow.get("batch_transform", False)
+                )
+            else:
+                metrics, success = self._run_etl_step(flow["name"], extract_fn, transform_fn, load_fn, instrumentation)
+        # Pipelined steps report their own per-stage metrics under "stages"
+        for key, value in instrumentation.to_dict().items():
+            metrics.setdefault(key, value)
+        metrics["transform_engine"] = engine
+        metrics["started_at"] = started_at.isoformat()
+        metrics["finished_at"] = datetime.now().isoformat()
+
+        if self.incremental:
+            metrics["watermark"] = {"from": since_id, "to": until_id}
+            if success:
+                save_watermark(flow["name"], until_id, until_date, db_name=self.db_name)
+        if success:
+            save_checkpoint(
+                flow["name"], completed=True, batches_loaded=metrics.get("batches_loaded", 0), db_name=self.db_name
+            )
+        if cache_key:
+            metrics["cache"] = "refresh" if self.refresh_cache else "miss"
+            if success and cached_output:
+                self.cache.mark_loaded(flow["name"], cache_key)
+            elif success:
+                self.cache.put(flow["name"], cache_key, None, loaded=True)
+        return metrics, success
+
+    def _run_flows(self, flows) -> bool:
+        """
+        Run the flows, at most `max_workers` at a time. A flow starts once every
+        flow it depends on has finished, and is skipped if one of them failed.
+        Metrics are recorded by flow name, so the order in which flows finish
+        does not matter.
+
+        Returns:
+            bool: True if every flow succeeded
+        """
+        names = {flow["name"] for flow in flows}
+        dependencies = {name: set(self.dependencies.get(name, ())) for name in names}
+        for name, flow_dependencies in dependencies.items():
+            unknown = flow_dependencies - names
+            if unknown:
+                raise ValueError(f"Flow {name} depends on unknown flows: {sorted(unknown)}")
+
+        pending = {flow["name"]: flow for flow in flows}
+        results = {}
+
+        def record(name, metrics, success):
+            self.metrics[name] = metrics
+            results[name] = success
+
+        def take_ready_flows():
+            ready = []
+            progress = True
+            while progress:
+                progress = False
+                for name in list(pending):
+                    if not dependencies[name] <= results.keys():
+                        continue
+                    flow = pending.pop(name)
+                    failed = sorted(dep for dep in dependencies[name] if not results[dep])
+                    if failed:
+                        logger.warning(f"Skipping ETL flow {name}: dependencies failed: {failed}")
+                        record(name, {"skipped": True, "failed_dependencies": failed, "success": False}, False)
+                        progress = True
+                    else:
+                        ready.append(flow)
+            return ready
+
+        if self.max_workers <= 1:
+            while pending:
+                ready = take_ready_flows()
+                if not ready and pending:
+                    raise ValueError(f"Circular flow dependencies between: {sorted(pending)}")
+                for flow in ready:
+                    logger.info(f"Running ETL flow: {flow['name']}")
+                    record(flow["name"], *self._run_flow(flow))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="etl-flow") as executor:
+                running = {}
+                while pending or running:
+                    for flow in take_ready_flows():
+                        logger.info(f"Running ETL flow: {flow['name']}")
+                        running[executor.submit(self._run_flow, flow)] = flow["name"]
+                    if not running:
+                        if pending:
+                            raise ValueError(f"Circular flow dependencies between: {sorted(pending)}")
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(running.pop(future), *future.result())
+
+        return all(results.values())
+
+    @staticmethod
+    def _split_last_group(batch, group_key):
+        """Split a batch into the rows before its last group (by `group_key`) and that group's rows."""
+        last_key = group_key(batch[-1])
+        split = len(batch)
+        while split and group_key(batch[split - 1]) == last_key:
+            split -= 1
+        return batch[:split], batch[split:]
+
+    async def _run_flow_async(self, flow, pool, client):
+        """
+        Async counterpart of `_run_flow`. Flows with a batch transform
+        transform and load each streamed batch as a task, at most
+        `max_concurrent_batches` at a time, while the next batch is fetched;
+        the other flows fold each streamed batch into one partial result
+        (counters, pair or basket counts) with their `combine_partials`.
+        Transforms run in the loop's default executor so they do not stall
+        the queries and writes in flight.
+        """
+        engine, transform_fn = self._transform_fn(flow)
+        if self.bulk_load:
+            load_fn = partial(
+                flow["async_bulk_load"], client, batch_size=self.load_batch_size, concurrency=self.max_concurrent_writes
+            )
+        else:
+            load_fn = partial(flow["async_load"], client)
+
+        started_at = datetime.now()
+        step_metrics = {
+            "async": True,
+            "transform_engine": engine,
+            "records_extracted": 0,
+            "batches_extracted": 0,
+            "extract_duration": 0.0,
+            "transform_duration": 0.0,
+            "load_duration": 0.0
+        }
+        results = []
+        load_results = []
+
+        async def transform(rows, fn=transform_fn):
+            transform_start = datetime.now()
+            result = await asyncio.to_thread(fn, rows)
+            step_metrics["transform_duration"] += (datetime.now() - transform_start).total_seconds()
+            return result
+
+        async def load(result):
+            load_start = datetime.now()
+            load_results.append(await load_fn(result))
+            step_metrics["load_duration"] += (datetime.now() - load_start).total_seconds()
+
+        async def process(batch):
+            try:
+                result = await transform(batch)
+                if self.bulk_load:
+                    await load(result)
+                else:
+                    results.append(result)
+            finally:
+                slots.release()
+
+        batch_transform = flow.get("batch_transform", False)
+        folded = None
+        fold_lock = asyncio.Lock()
+
+        async def fold(batch):
+            nonlocal folded
+            try:
+                batch_partial = await transform([batch], self._partial_transform(flow, transform_fn))
+                async with fold_lock:
+                    if folded is None:
+                        folded = batch_partial
+                    else:
+                        folded = await transform(batch_partial, partial(flow["combine_partials"], folded))
+            finally:
+                slots.release()
+
+        if self.streaming:
+            batches = flow["async_stream_extract"](pool, itersize=self.itersize)
+            slots = asyncio.Semaphore(self.max_concurrent_batches)
+            group_key = flow.get("group_key")
+            carried = []
+            rows = []
+            try:
+                # A failed batch cancels the others in flight
+                async with asyncio.TaskGroup() as group:
+                    while True:
+                        fetch_start = datetime.now()
+                        batch = await anext(batches, None)
+                        step_metrics["extract_duration"] += (datetime.now() - fetch_start).total_seconds()
+                        if batch is None:
+                            break
+                        step_metrics["records_extracted"] += len(batch)
+                        step_metrics["batches_extracted"] += 1
+                        if batch_transform:
+                            await slots.acquire()
+                            group.create_task(process(batch))
+                        elif "combine_partials" in flow:
+                            if group_key:
+                                # Hold the rows of the batch's last group back until the next batch
+                                batch, carried = self._split_last_group(carried + batch, group_key)
+                                if not batch:
+                                    continue
+                            await slots.acquire()
+                            group.create_task(fold(batch))
+                        else:
+                            rows.extend(batch)
+                    if carried:
+                        await slots.acquire()
+                        group.create_task(fold(carried))
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+            if batch_transform:
+                if not self.bulk_load:
+                    # A single document per flow: merge the batch results
+                    await load(self._merge_envelopes(results or [await transform([])]))
+            elif "combine_partials" in flow:
+                if folded is None:
+                    await load(await transform([]))
+                else:
+                    await load(await transform([folded], flow["merge_partials"]))
+            else:
+                await load(await transform(rows))
+        else:
+            extract_start = datetime.now()
+            rows = await flow["async_extract"](pool)
+            step_metrics["extract_duration"] = (datetime.now() - extract_start).total_seconds()
+            step_metrics["records_extracted"] = len(rows)
+            await load(await transform(rows))
+
+        if all(isinstance(result, dict) for result in load_results):
+            step_metrics["load_stats"] = combine_load_stats(load_results)
+            success = step_metrics["load_stats"]["success"]
+        else:
+            success = all(load_results)
+        step_metrics["success"] = success
+        step_metrics["started_at"] = started_at.isoformat()
+        step_metrics["finished_at"] = datetime.now().isoformat()
+        return step_metrics, success
+
+    async def _run_flows_async(self, flows) -> bool:
+        """
+        Run every flow as a task on the current event loop, at most
+        `max_concurrent_flows` at a time, sharing one asyncpg pool and one
+        AsyncMongoClient. Dependencies are honoured as in `_run_flows`.
+
+        Returns:
+            bool: True if every flow succeeded
+        """
+        names = {flow["name"] for flow in flows}
+        dependencies = {name: set(self.dependencies.get(name, ())) for name in names}
+        for name, flow_dependencies in dependencies.items():
+            unknown = flow_dependencies - names
+            if unknown:
+                raise ValueError(f"Flow {name} depends on unknown flows: {sorted(unknown)}")
+        ordered = set()
+        while len(ordered) < len(names):
+            ready = {name for name in names - ordered if dependencies[name] <= ordered}
+            if not ready:
+                raise ValueError(f"Circular flow dependencies between: {sorted(names - ordered)}")
+            ordered |= ready
+
+        pool = await create_async_postgres_pool(ASYNC_CONFIG['POOL_MIN_SIZE'], ASYNC_CONFIG['POOL_MAX_SIZE'])
+        try:
+            client = await create_async_mongo_client()
+        except Exception:
+            await pool.close()
+            raise
+        slots = asyncio.Semaphore(self.max_concurrent_flows)
+        tasks = {}
+
+        async def run(flow):
+            name = flow["name"]
+            dependency_results = {dep: await tasks[dep] for dep in sorted(dependencies[name])}
+            failed = [dep for dep, success in dependency_results.items() if not success]
+            if failed:
+                logger.warning(f"Skipping ETL flow {name}: dependencies failed: {failed}")
+                self.metrics[name] = {"skipped": True, "failed_dependencies": failed, "success": False}
+                return False
+            async with slots:
+                logger.info(f"Running ETL flow: {name}")
+                metrics, success = await self._run_flow_async(flow, pool, client)
+            self.metrics[name] = metrics
+            return success
+
+        try:
+            for flow in flows:
+                tasks[flow["name"]] = asyncio.create_task(run(flow))
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            await client.close()
+            await pool.close()
+        return all(results)
+
+    def _shared_consumer(self, flow):
+        """Returns (transform engine, shared scan consumer) of a flow."""
+        if flow["name"] == "product_profile":
+            engine, _ = self._transform_fn(flow)
+            return engine, ProfileConsumer(engine)
+        if flow["name"] == "common_products":
+            if self.itemset_engine == "fpgrowth":
+                return "python", ItemsetConsumer(ITEMSET_CONFIG['MIN_SUPPORT'], ITEMSET_CONFIG['MAX_SIZE'])
+            extract_args = flow.get("incremental_extract_args", {}) if self.incremental else {}
+            return "python", PairCountConsumer(**extract_args)
+        engine, transform_fn = self._transform_fn(flow)
+        return engine, OrdersConsumer(transform_fn)
+
+    def _run_shared_scan(self, flows) -> bool:
+        """
+        Run every flow from a single streaming pass over the sales lines. Each
+        batch of orders is handed to every flow's consumer; results produced
+        batch by batch are loaded as they come when the loader writes one
+        document per entry, the others once the scan is done.
+
+        In incremental mode the scan starts at the oldest flow watermark and
+        each flow only sees the orders past its own.
+
+        Returns:
+            bool: True if every flow succeeded
+        """
+        since_ids = {}
+        active = []
+        for flow in flows:
+            if self.incremental:
+                since_id, has_new_orders = self._flow_since_id(flow)
+                if not has_new_orders:
+                    self.metrics[flow["name"]] = {"skipped": True, "watermark": since_id, "success": True}
+                    continue
+                since_ids[flow["name"]] = since_id
+            else:
+                since_ids[flow["name"]] = 0
+            active.append(flow)
+        if not active:
+            return True
+
+        until_id, until_date = self.high_water_mark if self.incremental else (None, None)
+        scan_since_id = min(since_ids.values())
+        scan_metrics = {"records_extracted": 0, "batches_extracted": 0, "orders_scanned": 0, "extract_duration": 0.0}
+        state = {}
+        for flow in active:
+            engine, consumer = self._shared_consumer(flow)
+            state[flow["name"]] = {
+                "consumer": consumer,
+                "load_fn": self._load_fn(flow),
+                "results": [],
+                "load_results": [],
+                "metrics": {
+                    "shared_scan": True,
+                    "transform_engine": engine,
+                    "records_extracted": 0,
+                    "transform_duration": 0.0,
+                    "load_duration": 0.0,
+                    "started_at": datetime.now().isoformat()
+                }
+            }
+
+        def load(flow_state, result):
+            load_start = datetime.now()
+            flow_state["load_results"].append(flow_state["load_fn"](result))
+            flow_state["metrics"]["load_duration"] += (datetime.now() - load_start).total_seconds()
+
+        def count_rows(batches):
+            for batch in batches:
+                scan_metrics["records_extracted"] += len(batch)
+                scan_metrics["batches_extracted"] += 1
+                yield batch
+
+        # With a memory budget, skip the database sort of the whole join and
+        # group the lines into orders client side, spilling to disk as needed
+        ordered = not TRANSFORM_CONFIG['MEMORY_BUDGET_MB']
+        orders_batches = group_sales_lines_into_orders(
+            count_rows(stream_sales_lines(
+                itersize=self.itersize, since_id=scan_since_id, until_id=until_id, ordered=ordered
+            )),
+            ordered=ordered
+        )
+        scan_start = datetime.now()
+        while True:
+            fetch_start = datetime.now()
+            orders = next(orders_batches, None)
+            scan_metrics["extract_duration"] += (datetime.now() - fetch_start).total_seconds()
+            if orders is None:
+                break
+            scan_metrics["orders_scanned"] += len(orders)
+
+            for name, flow_state in state.items():
+                flow_orders = [order for order in orders if order.id > since_ids[name]]
+                if not flow_orders:
+                    continue
+                flow_state["metrics"]["records_extracted"] += len(flow_orders)
+                transform_start = datetime.now()
+                result = flow_state["consumer"].consume(flow_orders)
+                flow_state["metrics"]["transform_duration"] += (datetime.now() - transform_start).total_seconds()
+                if result is None:
+                    continue
+                if self.bulk_load or self.incremental:
+                    load(flow_state, result)
+                else:
+                    flow_state["results"].append(result)
+        scan_metrics["duration"] = (datetime.now() - scan_start).total_seconds()
+        scan_metrics["watermark"] = {"from": scan_since_id, "to": until_id}
+        self.metrics["shared_scan"] = scan_metrics
+
+        all_success = True
+        for flow in active:
+            flow_state = state[flow["name"]]
+            step_metrics = flow_state["metrics"]
+            consumer = flow_state["consumer"]
+
+            transform_start = datetime.now()
+            result = consumer.finish()
+            step_metrics["transform_duration"] += (datetime.now() - transform_start).total_seconds()
+            if result is not None:
+                load(flow_state, result)
+            elif not flow_state["load_results"]:
+                # A single document per flow: merge the batch results, if any
+                results = flow_state["results"] or [consumer.consume([])]
+                load(flow_state, self._merge_envelopes(results))
+
+            load_results = flow_state["load_results"]
+            if all(isinstance(load_result, dict) for load_result in load_results):
+                step_metrics["load_stats"] = combine_load_stats(load_results)
+                success = step_metrics["load_stats"]["success"]
+            else:
+                success = all(load_results)
+            step_metrics["success"] = success
+            step_metrics["finished_at"] = datetime.now().isoformat()
+
+            if self.incremental:
+                step_metrics["watermark"] = {"from": since_ids[flow["name"]], "to": until_id}
+                if success:
+                    save_watermark(flow["name"], until_id, until_date, db_name=self.db_name)
+            self.metrics[flow["name"]] = step_metrics
+            all_success = all_success and success
+
+        return all_success
+
     def run(self) -> Dict[str, Any]:
         """Execute the ETL pipeline."""
         self.start_time = datetime.now()
+        self.run_id = self.from_staging or self.start_time.strftime("%Y%m%d_%H%M%S")
         logger.info(f"Starting ETL pipeline at {self.start_time}")
 
         try:
-            # Define ETL flows
-            etl_flows = [
-                {
-                    "name": "product_profile",
-                    "extract": fetch_transaction_products,
-                    "transform": product_predominant_profile,
-                    "load": load_product_predominant_profile
-                },
-                {
-                    "name": "common_products",
-                    "extract": get_frequency_itemsets,
-                    "transform": most_common_products,
-                    "load": load_most_common_products
-                },
-                {
-                    "name": "orders",
-                    "extract": extract_orders_with_customers_and_items,
-                    "transform": transform_complete_orders_to_dw_format,
-                    "load": load_complete_orders_to_dw
-                }
-            ]
+            if not self.resume:
+                clear_checkpoints(db_name=self.db_name)
+            if self.staging:
+                remove_old_runs(keep=self.run_id)
+            if self.incremental:
+                # Fix the upper bound once so every flow reads the same snapshot
+                self.high_water_mark = get_source_high_water_mark()
+            if self.cache is not None:
+                self.source_fingerprint = get_source_fingerprint()
+            if self.date_partitions:
+                # Listing the partitions only reads statistics, never the sales tables
+                self.sales_partitions = get_sales_partitions()
+                if not self.sales_partitions:
+                    raise ValueError("The sales tables are not partitioned (see app/db/models.py --partitioned)")
+                self.source_fingerprint = get_source_fingerprint(
+                    tuple(table for table in SOURCE_TABLES if table not in SALES_TABLES)
+                )
 
             # Run each ETL flow
-            all_success = True
-            for flow in etl_flows:
-                logger.info(f"Running ETL flow: {flow['name']}")
-                metrics, success = self._run_etl_step(
-                    flow["name"],
-                    flow["extract"],
-                    flow["transform"],
-                    flow["load"]
-                )
-                self.metrics[flow["name"]] = metrics
-                all_success = all_success and success
+            if self.async_mode:
+                all_success = asyncio.run(self._run_flows_async(self._etl_flows()))
+            elif self.shared_scan:
+                all_success = self._run_shared_scan(self._etl_flows())
+            else:
+                all_success = self._run_flows(self._etl_flows())
+            if all_success:
+                # Nothing left to resume
+                clear_checkpoints(db_name=self.db_name)
 
             self.end_time = datetime.now()
             total_duration = (self.end_time - self.start_time).total_seconds()
@@ -96,7 +1449,8 @@ class ETLPipeline:
                 "start_time": self.start_time.isoformat(),
                 "end_time": self.end_time.isoformat(),
                 "total_duration_seconds": total_duration,
-                "metrics": self.metrics
+                "metrics": self.metrics,
+                "postgres_pool": get_postgres_pool_stats()
             }
 
             logger.info(f"ETL pipeline completed in {total_duration:.2f} seconds. Status: {result['status']}")
@@ -113,5 +1467,6 @@ class ETLPipeline:
                 "error_details": error_details,
                 "start_time": self.start_time.isoformat() if self.start_time else None,
                 "end_time": self.end_time.isoformat(),
-                "metrics": self.metrics
+                "metrics": self.metrics,
+                "postgres_pool": get_postgres_pool_stats()
             }
\ No newline at end of file
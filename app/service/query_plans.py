@@ -0,0 +1,149 @@
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+from ..config import EXTRACT_CONFIG, QUERY_PLAN_CONFIG
+from ..db.postgree_connection import postgres_cursor
+from .extract import (
+    MIN_PAIR_FREQUENCY, SOURCE_TABLES, TRANSACTION_PRODUCTS_QUERY, PRODUCT_PROFILE_COUNTS_QUERY,
+    FREQUENCY_ITEMSETS_QUERY, ORDER_BASKETS_QUERY, SALES_LINES_QUERY, ORDERED_SALES_LINES_QUERY,
+    ORDERS_PAGE_QUERY, ORDER_ITEMS_QUERY, SOURCE_HIGH_WATER_MARK_QUERY, PARTITION_BOUNDS_QUERY
+)
+
+logger = logging.getLogger(__name__)
+
+# Estimated rows of the source tables and of their partitions, which plans scan directly
+TABLE_ROWS_QUERY = '''
+    SELECT relname, reltuples
+    FROM pg_class
+    WHERE relkind IN ('r', 'p')
+      AND (relname = ANY(%(tables)s)
+           OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = ANY(%(tables)s::regclass[])))
+'''
+
+def extract_plan_queries(since_id: int, until_id: int, chunk_size: int) -> Dict[str, Tuple[str, Any]]:
+    """The extract queries and representative parameters for the sales window (since_id, until_id]."""
+    window = {'since_id': since_id, 'until_id': until_id}
+    return {
+        'transaction_products': (TRANSACTION_PRODUCTS_QUERY, window),
+        'product_profile_counts': (PRODUCT_PROFILE_COUNTS_QUERY, window),
+        'frequency_itemsets': (FREQUENCY_ITEMSETS_QUERY, {**window, 'min_frequency': MIN_PAIR_FREQUENCY}),
+        'order_baskets': (ORDER_BASKETS_QUERY, window),
+        'sales_lines': (SALES_LINES_QUERY, window),
+        'ordered_sales_lines': (ORDERED_SALES_LINES_QUERY, window),
+        'orders_page': (ORDERS_PAGE_QUERY, {'last_id': since_id, 'until_id': until_id, 'limit': chunk_size}),
+        'order_items': (ORDER_ITEMS_QUERY, (list(range(since_id + 1, since_id + 1 + chunk_size)),)),
+        'source_high_water_mark': (SOURCE_HIGH_WATER_MARK_QUERY, None),
+        'partition_bounds': (PARTITION_BOUNDS_QUERY, {**window, 'fractions': [0.25, 0.5, 0.75]}),
+    }
+
+def explain(cursor, query: str, params: Any = None) -> Dict[str, Any]:
+    """The top-level node of the `EXPLAIN (FORMAT JSON)` plan of `query`; the query is not run."""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    return cursor.fetchone()[0][0]['Plan']
+
+def plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Every node of a plan tree, depth first."""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+def check_plan(
+        plan: Dict[str, Any],
+        big_tables: Dict[str, float],
+        baseline_cost: float = None,
+        tolerance: float = QUERY_PLAN_CONFIG['COST_TOLERANCE']
+        ) -> List[str]:
+    """
+    Problems of a plan: sequential scans of `big_tables` ({name: estimated
+    rows}) and a total cost above `tolerance` times `baseline_cost`.
+    """
+    issues = []
+    for node in plan_nodes(plan):
+        table = node.get('Relation Name')
+        if node['Node Type'] == 'Seq Scan' and table in big_tables:
+            issues.append(f"Seq Scan on {table} (~{big_tables[table]:.0f} rows)")
+    if baseline_cost and plan['Total Cost'] > baseline_cost * tolerance:
+        issues.append(
+            f"Total cost {plan['Total Cost']:.0f} is {plan['Total Cost'] / baseline_cost:.1f}x "
+            f"the baseline {baseline_cost:.0f}"
+        )
+    return issues
+
+def load_baseline(path: str = QUERY_PLAN_CONFIG['BASELINE_PATH']) -> Dict[str, float]:
+    """Baseline total cost per query name, empty if no baseline was saved yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(costs: Dict[str, float], path: str = QUERY_PLAN_CONFIG['BASELINE_PATH']) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(costs, f, indent=2, sort_keys=True)
+
+def check_extract_plans(
+        update_baseline: bool = False,
+        baseline_path: str = QUERY_PLAN_CONFIG['BASELINE_PATH'],
+        window_sales: int = QUERY_PLAN_CONFIG['WINDOW_SALES'],
+        big_table_rows: int = QUERY_PLAN_CONFIG['BIG_TABLE_ROWS']
+        ) -> Dict[str, Any]:
+    """
+    Explain every extract query for the latest `window_sales` sales and flag
+    sequential scans of tables of at least `big_table_rows` rows and total
+    costs past the saved baseline. With `update_baseline`, the current costs
+    become the new baseline.
+
+    Returns:
+        dict: `success`, the number of `issues` and, per query, its
+        `total_cost`, `baseline_cost` and `issues`.
+    """
+    baseline = load_baseline(baseline_path)
+    try:
+        with postgres_cursor() as cursor:
+            cursor.execute(TABLE_ROWS_QUERY, {'tables': list(SOURCE_TABLES)})
+            big_tables = {table: rows for table, rows in cursor.fetchall() if rows >= big_table_rows}
+            cursor.execute(SOURCE_HIGH_WATER_MARK_QUERY)
+            max_id = cursor.fetchone()[0] or 0
+            queries = extract_plan_queries(
+                max(0, max_id - window_sales), max_id, EXTRACT_CONFIG['ORDERS_CHUNK_SIZE']
+            )
+            plans = {name: explain(cursor, query, params) for name, (query, params) in queries.items()}
+    except Exception as e:
+        logger.error(f"Error explaining extract queries: {e}")
+        return {'success': False, 'error': str(e)}
+
+    results = {}
+    for name, plan in plans.items():
+        issues = check_plan(plan, big_tables, None if update_baseline else baseline.get(name))
+        for issue in issues:
+            logger.warning(f"Query plan of {name}: {issue}")
+        results[name] = {'total_cost': plan['Total Cost'], 'baseline_cost': baseline.get(name), 'issues': issues}
+
+    if update_baseline:
+        save_baseline({name: result['total_cost'] for name, result in results.items()}, baseline_path)
+        logger.info(f"Saved query plan baseline to {baseline_path}")
+
+    issue_count = sum(len(result['issues']) for result in results.values())
+    return {'success': issue_count == 0, 'issues': issue_count, 'big_tables': big_tables, 'queries': results}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the query plans of the extract queries")
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="Save the current plan costs as the baseline instead of comparing against it"
+    )
+    parser.add_argument("--baseline", default=QUERY_PLAN_CONFIG['BASELINE_PATH'], help="Baseline cost file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    report = check_extract_plans(args.update_baseline, args.baseline)
+    if 'error' in report:
+        raise SystemExit(f"Query plan check failed: {report['error']}")
+    for name, result in report['queries'].items():
+        status = "; ".join(result['issues']) or "ok"
+        print(f"{name:<24} cost {result['total_cost']:>12.0f}  {status}")
+    raise SystemExit(0 if report['success'] else 1)
@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+class Record:
+    """
+    Base of the compact row records: fixed `__slots__` instead of a per-row
+    dict, so the column names are stored once per class instead of once per
+    row, and fields are read as attributes.
+    """
+    __slots__ = ()
+
+    def to_tuple(self) -> Tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class ItemRecord(Record):
+    """An item of an extracted order: a row of `ORDER_ITEMS_QUERY` without its order id."""
+    __slots__ = ('id', 'nome', 'quantidade', 'preco_unitario', 'categoria')
+
+    def __init__(self, id, nome, quantidade, preco_unitario, categoria):
+        self.id = id
+        self.nome = nome
+        self.quantidade = quantidade
+        self.preco_unitario = preco_unitario
+        self.categoria = categoria
+
+class OrderRecord(Record):
+    """An extracted order: a row of `ORDERS_PAGE_QUERY` and its `ItemRecord`s under `itens`."""
+    __slots__ = ('id', 'data_venda', 'valor_total', 'cliente_id', 'nome', 'email', 'gender', 'age', 'itens')
+
+    def __init__(self, id, data_venda, valor_total, cliente_id, nome, email, gender, age,
+                 itens: Optional[List[ItemRecord]] = None):
+        self.id = id
+        self.data_venda = data_venda
+        self.valor_total = valor_total
+        self.cliente_id = cliente_id
+        self.nome = nome
+        self.email = email
+        self.gender = gender
+        self.age = age
+        self.itens = [] if itens is None else itens
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The order as `RealDictCursor` rows used to shape it, items included."""
+        order = super().to_dict()
+        order['itens'] = [item.to_dict() for item in self.itens]
+        return order
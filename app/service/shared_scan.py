@@ -0,0 +1,113 @@
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..config import ITEMSET_CONFIG
+from .extract import MIN_PAIR_FREQUENCY
+from .records import OrderRecord
+from .itemsets import frequent_itemsets_from_counts, itemsets_to_most_common_products
+from .transform import ProductProfileCounters, age_range, most_common_products, product_predominant_profile
+from .vectorized import profile_counters_from_columns
+
+class OrderConsumer(ABC):
+    """
+    Receives the batches of orders read by a shared scan of the sales lines
+    and builds one flow's transform result from them.
+
+    `consume` returns a result for the batch when the flow's output can be
+    produced (and loaded) batch by batch, None otherwise; `finish` returns
+    the result built from every batch, if any.
+    """
+
+    @abstractmethod
+    def consume(self, orders: List[OrderRecord]) -> Optional[Dict[str, Any]]:
+        ...
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        return None
+
+class ProfileConsumer(OrderConsumer):
+    """
+    Product predominant profile: one gender/age range count per sold item,
+    counted in Python or, with the "numpy" engine, from the columns of each batch.
+    """
+
+    def __init__(self, engine: str = "python"):
+        self.engine = engine
+        self.counters = ProductProfileCounters()
+
+    def consume(self, orders):
+        if self.engine == "numpy":
+            sales = [(item.nome, order.gender, order.age) for order in orders for item in order.itens]
+            if sales:
+                self.counters.merge(profile_counters_from_columns(*zip(*sales)))
+            return None
+        for order in orders:
+            range_key = age_range(order.age)
+            for item in order.itens:
+                self.counters.add(item.nome, order.gender, range_key)
+        return None
+
+    def finish(self):
+        return product_predominant_profile(self.counters)
+
+class PairCountConsumer(OrderConsumer):
+    """
+    Products bought together, counted like `FREQUENCY_ITEMSETS_QUERY`: every
+    pair of items of an order with p1.id < p2.id, grouped by product names.
+    """
+
+    def __init__(self, min_frequency: int = MIN_PAIR_FREQUENCY):
+        self.min_frequency = min_frequency
+        self.pairs = Counter()
+
+    def consume(self, orders):
+        for order in orders:
+            items = order.itens
+            for first in items:
+                for second in items:
+                    if first.id < second.id:
+                        self.pairs[(first.nome, second.nome)] += 1
+        return None
+
+    def finish(self):
+        return most_common_products(
+            (first, second, count)
+            for (first, second), count in self.pairs.most_common()
+            if count > self.min_frequency
+        )
+
+class ItemsetConsumer(OrderConsumer):
+    """Itemsets of any size mined with FP-Growth from the baskets of every order."""
+
+    def __init__(
+            self,
+            min_support: Union[int, float] = ITEMSET_CONFIG['MIN_SUPPORT'],
+            max_size: Optional[int] = ITEMSET_CONFIG['MAX_SIZE']
+        ):
+        self.min_support = min_support
+        self.max_size = max_size
+        self.baskets = Counter()
+        self.product_names = {}
+
+    def consume(self, orders):
+        for order in orders:
+            if not order.itens:
+                continue
+            for item in order.itens:
+                self.product_names[item.id] = item.nome
+            self.baskets[tuple(sorted({item.id for item in order.itens}))] += 1
+        return None
+
+    def finish(self):
+        itemsets = frequent_itemsets_from_counts(self.baskets, self.min_support, self.max_size, min_size=2)
+        return itemsets_to_most_common_products(itemsets, self.product_names)
+
+class OrdersConsumer(OrderConsumer):
+    """Data warehouse order documents, transformed batch by batch with `transform_fn`."""
+
+    def __init__(self, transform_fn: Callable[[List[OrderRecord]], Dict[str, Any]]):
+        self.transform_fn = transform_fn
+
+    def consume(self, orders):
+        return self.transform_fn(orders)
@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+_POLL_SECONDS = 0.1
+
+class StageAborted(Exception):
+    """Raised inside a stage when another stage of the same pipeline failed."""
+
+class _Channel:
+    """Bounded queue between two stages that keeps depth statistics."""
+
+    def __init__(self, maxsize: int, stop: threading.Event):
+        self._queue = queue.Queue(maxsize)
+        self._stop = stop
+        self.capacity = maxsize
+        self.max_depth = 0
+        self._depth_total = 0
+        self._samples = 0
+
+    def _sample(self):
+        depth = self._queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._samples += 1
+
+    def put(self, item) -> float:
+        """Put `item`, blocking while the queue is full. Returns the time blocked."""
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise StageAborted()
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self._sample()
+        return time.perf_counter() - start
+
+    def get(self) -> Tuple[Any, float]:
+        """Get the next item, blocking while the queue is empty. Returns (item, time blocked)."""
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise StageAborted()
+            try:
+                item = self._queue.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        self._sample()
+        return item, time.perf_counter() - start
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "max_depth": self.max_depth,
+            "avg_depth": self._depth_total / self._samples if self._samples else 0.0
+        }
+
+class _StageStats:
+    def __init__(self):
+        self.items_in = 0
+        self.items_out = 0
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+        self.wall = 0.0
+
+    def metrics(self) -> Dict[str, Any]:
+        idle = self.wait_input + self.wait_output
+        busy = max(self.wall - idle, 0.0)
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": busy,
+            "idle_seconds": idle,
+            # Waiting for input means the upstream stage is slower; waiting to
+            # output means a downstream stage is slower (backpressure).
+            "starved_seconds": self.wait_input,
+            "blocked_seconds": self.wait_output,
+            "utilization": busy / self.wall if self.wall > 0 else 0.0
+        }
+
+def run_stages(
+        source: Callable[[], Iterable],
+        stages: List[Tuple[str, Callable[[Iterator], Iterable]]],
+        source_name: str = "extract",
+        queue_size: int = 4
+        ) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Run `source` and each stage in its own thread, connected by bounded queues.
+
+    `source()` returns an iterable of items (e.g. extracted batches). Each stage
+    function receives an iterator over the previous stage's items and returns an
+    iterable of its own outputs, so a stage may map items one by one or consume
+    them all before emitting an aggregate. A full queue blocks its producer
+    (backpressure). If any stage raises, the others are stopped and the error
+    is re-raised.
+
+    Returns:
+        (outputs of the last stage, metrics) where metrics holds busy/idle time
+        per stage and depth statistics per queue.
+    """
+    stop = threading.Event()
+    names = [source_name] + [name for name, _ in stages]
+    channels = [_Channel(queue_size, stop) for _ in stages]
+    stats = {name: _StageStats() for name in names}
+    outputs = []
+    errors = []
+
+    def consume(channel, stage_stats) -> Iterator:
+        while True:
+            item, waited = channel.get()
+            stage_stats.wait_input += waited
+            if item is _END:
+                return
+            stage_stats.items_in += 1
+            yield item
+
+    def run(index):
+        name = names[index]
+        stage_stats = stats[name]
+        start = time.perf_counter()
+        items = None
+        try:
+            if index == 0:
+                items = source()
+            else:
+                items = stages[index - 1][1](consume(channels[index - 1], stage_stats))
+
+            output = channels[index] if index < len(channels) else None
+            for item in items:
+                stage_stats.items_out += 1
+                if output is None:
+                    outputs.append(item)
+                else:
+                    stage_stats.wait_output += output.put(item)
+            if output is not None:
+                stage_stats.wait_output += output.put(_END)
+        except StageAborted:
+            pass
+        except BaseException as e:
+            logger.error(f"Stage {name} failed: {e}")
+            errors.append(e)
+            stop.set()
+        finally:
+            # Release what an interrupted stage holds (e.g. an open cursor)
+            if hasattr(items, "close"):
+                items.close()
+            stage_stats.wall = time.perf_counter() - start
+
+    threads = [
+        threading.Thread(target=run, args=(index,), name=f"etl-stage-{name}", daemon=True)
+        for index, name in enumerate(names)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    stage_metrics = {name: stats[name].metrics() for name in names}
+    metrics = {
+        "stages": stage_metrics,
+        "queues": {
+            f"{names[index]}->{names[index + 1]}": channel.metrics()
+            for index, channel in enumerate(channels)
+        },
+        "bottleneck": max(stage_metrics, key=lambda name: stage_metrics[name]["busy_seconds"])
+    }
+    return outputs, metrics
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import zstandard
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from ..config import STAGING_CONFIG
+from .records import ItemRecord, OrderRecord
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"ndjson": ".ndjson.zst", "msgpack": ".msgpack.zst"}
+# Written last in a staging directory, with the writer's statistics
+_COMPLETE_MARKER = "_COMPLETE.json"
+
+def encode_value(value: Any) -> Any:
+    """Tag the values JSON and msgpack cannot represent, so `decode_value` can restore them."""
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, ItemRecord):
+        return {"__item__": list(value.to_tuple())}
+    if isinstance(value, OrderRecord):
+        return {"__order__": list(value.to_tuple())}
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+def decode_value(document: Dict[str, Any]) -> Any:
+    if len(document) == 1:
+        if "__decimal__" in document:
+            return Decimal(document["__decimal__"])
+        if "__datetime__" in document:
+            return datetime.fromisoformat(document["__datetime__"])
+        if "__date__" in document:
+            return date.fromisoformat(document["__date__"])
+        if "__item__" in document:
+            return ItemRecord(*document["__item__"])
+        if "__order__" in document:
+            return OrderRecord(*document["__order__"])
+    return document
+
+def _serialize(batch: list, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        return msgpack.packb(batch, default=encode_value, use_bin_type=True)
+    return "".join(json.dumps(row, default=encode_value) + "\n" for row in batch).encode()
+
+def _deserialize(raw: bytes, fmt: str) -> list:
+    if fmt == "msgpack":
+        return msgpack.unpackb(raw, object_hook=decode_value, raw=False)
+    return [json.loads(line, object_hook=decode_value) for line in raw.decode().splitlines()]
+
+class StagingWriter:
+    """
+    Spill batches to zstd-compressed files under `directory`, one file per
+    batch, so a later stage can stream them back with `read_batches`.
+
+    Batches are serialized and compressed by `workers` threads (zstd releases
+    the GIL), with at most `2 * workers` batches in flight.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            fmt: str = STAGING_CONFIG['FORMAT'],
+            workers: int = STAGING_CONFIG['WRITERS'],
+            level: int = STAGING_CONFIG['COMPRESSION_LEVEL']
+        ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown staging format: {fmt}")
+        if fmt == "msgpack" and msgpack is None:
+            raise ImportError("msgpack is required for the 'msgpack' staging format (pip install msgpack)")
+        self.directory = directory
+        self.fmt = fmt
+        self.workers = max(1, workers)
+        self.level = level
+        self.files = 0
+        self.rows = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.seconds = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _write_part(self, part: int, batch: list) -> tuple:
+        raw = _serialize(batch, self.fmt)
+        compressed = zstandard.ZstdCompressor(level=self.level).compress(raw)
+        path = os.path.join(self.directory, f"part-{part:06d}{FORMATS[self.fmt]}")
+        with open(path, "wb") as f:
+            f.write(compressed)
+        return len(batch), len(raw), len(compressed)
+
+    def write_batches(self, batches: Iterable[list]) -> Iterator[list]:
+        """
+        Write every batch and yield it back once it is on disk, so writing can
+        be chained with other work on the same stream.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="etl-staging") as executor:
+            pending = []
+            for batch in batches:
+                pending.append((executor.submit(self._write_part, self.files, batch), batch))
+                self.files += 1
+                if len(pending) >= 2 * self.workers:
+                    future, written = pending.pop(0)
+                    self._record(future.result())
+                    yield written
+            for future, written in pending:
+                self._record(future.result())
+                yield written
+        self.seconds += time.perf_counter() - start
+
+    def write_all(self, batches: Iterable[list]) -> Dict[str, Any]:
+        """Write every batch and return the staging statistics."""
+        for _ in self.write_batches(batches):
+            pass
+        return self.stats()
+
+    def _record(self, sizes: tuple) -> None:
+        rows, raw, compressed = sizes
+        self.rows += rows
+        self.raw_bytes += raw
+        self.compressed_bytes += compressed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "format": self.fmt,
+            "files": self.files,
+            "rows": self.rows,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "compression_ratio": self.raw_bytes / self.compressed_bytes if self.compressed_bytes else None,
+            "seconds": self.seconds,
+            "raw_mb_per_sec": self.raw_bytes / 1024 / 1024 / self.seconds if self.seconds > 0 else None
+        }
+
+def read_batches(directory: str) -> Iterator[list]:
+    """Stream back, in order, the batches written to `directory` by a `StagingWriter`."""
+    decompressor = zstandard.ZstdDecompressor()
+    for name in sorted(os.listdir(directory)):
+        for fmt, suffix in FORMATS.items():
+            if name.startswith("part-") and name.endswith(suffix):
+                with open(os.path.join(directory, name), "rb") as f:
+                    yield _deserialize(decompressor.decompress(f.read()), fmt)
+                break
+
+def mark_complete(directory: str, stats: Dict[str, Any]) -> None:
+    """Record that every batch of `directory` was written, so a later run can reload it."""
+    path = os.path.join(directory, _COMPLETE_MARKER)
+    with open(path + ".tmp", "w") as f:
+        json.dump(stats, f)
+    os.replace(path + ".tmp", path)
+
+def completed_stats(directory: str) -> Optional[Dict[str, Any]]:
+    """The statistics recorded by `mark_complete`, or None if `directory` is missing or incomplete."""
+    try:
+        with open(os.path.join(directory, _COMPLETE_MARKER)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def remove_staging(directory: str) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
+
+def remove_old_runs(
+        root: str = STAGING_CONFIG['DIR'],
+        max_age_days: float = STAGING_CONFIG['MAX_AGE_DAYS'],
+        keep: str = None
+    ) -> None:
+    """Remove the staged runs under `root` last written more than `max_age_days` ago, except `keep`."""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return
+    now = time.time()
+    for name in names:
+        path = os.path.join(root, name)
+        if name == keep or not os.path.isdir(path):
+            continue
+        if now - os.stat(path).st_mtime > max_age_days * 24 * 3600:
+            remove_staging(path)
+            logger.info(f"Removed staged run {name}")
@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from ..config import MONGO_CONFIG
+from ..db.mongo_connection import mongo_context
+
+logger = logging.getLogger(__name__)
+
+def get_watermark(
+        flow_name: str,
+        db_name: str = MONGO_CONFIG['DATABASE'],
+        collection_name: str = MONGO_CONFIG['COLLECTIONS']['ETL_STATE']
+    ) -> Optional[Dict[str, Any]]:
+    """
+    Return the high-water mark of the last successful run of `flow_name`,
+    or None if the flow never completed.
+    """
+    with mongo_context() as client:
+        state = client[db_name][collection_name].find_one({'_id': f'watermark:{flow_name}'})
+    if state:
+        logger.info(f"Watermark for {flow_name}: order id {state['last_order_id']}")
+    return state
+
+def save_watermark(
+        flow_name: str,
+        last_order_id: int,
+        last_order_date: Optional[str] = None,
+        db_name: str = MONGO_CONFIG['DATABASE'],
+        collection_name: str = MONGO_CONFIG['COLLECTIONS']['ETL_STATE']
+    ) -> None:
+    """Record the last `vendas` row processed by `flow_name`."""
+    with mongo_context() as client:
+        client[db_name][collection_name].replace_one(
+            {'_id': f'watermark:{flow_name}'},
+            {
+                'flow': flow_name,
+                'last_order_id': last_order_id,
+                'last_order_date': last_order_date,
+                'updated_at': datetime.now().isoformat()
+            },
+            upsert=True
+        )
+    logger.info(f"Saved watermark for {flow_name}: order id {last_order_id}")
+
+def get_checkpoint(
+        flow_name: str,
+        db_name: str = MONGO_CONFIG['DATABASE'],
+        collection_name: str = MONGO_CONFIG['COLLECTIONS']['ETL_STATE']
+    ) -> Optional[Dict[str, Any]]:
+    """
+    Return the progress recorded for `flow_name` by an unfinished run, or
+    None if there is none.
+    """
+    with mongo_context() as client:
+        return client[db_name][collection_name].find_one({'_id': f'checkpoint:{flow_name}'})
+
+def save_checkpoint(
+        flow_name: str,
+        last_order_id: Optional[int] = None,
+        batches_loaded: int = 0,
+        completed: bool = False,
+        db_name: str = MONGO_CONFIG['DATABASE'],
+        collection_name: str = MONGO_CONFIG['COLLECTIONS']['ETL_STATE']
+    ) -> None:
+    """Record the progress of `flow_name`: the last order of its last committed batch, or its completion."""
+    with mongo_context() as client:
+        client[db_name][collection_name].replace_one(
+            {'_id': f'checkpoint:{flow_name}'},
+            {
+                'flow': flow_name,
+                'last_order_id': last_order_id,
+                'batches_loaded': batches_loaded,
+                'completed': completed,
+                'updated_at': datetime.now().isoformat()
+            },
+            upsert=True
+        )
+
+def clear_checkpoints(
+        db_name: str = MONGO_CONFIG['DATABASE'],
+        collection_name: str = MONGO_CONFIG['COLLECTIONS']['ETL_STATE']
+    ) -> None:
+    """Forget the progress of every flow, so the next run starts from scratch."""
+    with mongo_context() as client:
+        result = client[db_name][collection_name].delete_many({'_id': {'$regex': '^checkpoint:'}})
+    if result.deleted_count:
+        logger.info(f"Cleared {result.deleted_count} checkpoints")
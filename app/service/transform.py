@@ -1,5 +1,26 @@
 from datetime import datetime
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Tuple, Any, Union
+from ..config import TRANSFORM_CONFIG
+from .groupby import ExternalGroupBy
+from .records import OrderRecord
+
+# Upper bound (inclusive) of each age range returned by `age_range`; ages above
+# the last bound fall in the final, open-ended range.
+AGE_RANGE_UPPER_BOUNDS = [17, 24, 34, 44, 54, 64]
+AGE_RANGE_LABELS = ["0-17", "18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+
+# Layout of the output documents, such as the Product_<n> keys of
+# `most_common_products`. Cached results are keyed on it: bump it whenever
+# the layout changes.
+OUTPUT_LAYOUT_VERSION = 1
+
+# Gender counted for customers without one (`clientes.gender` is nullable):
+# a None key cannot be stored in a BSON document.
+UNKNOWN_GENDER = "Unknown"
+
+def gender_key(gender: Optional[str]) -> str:
+    """The `Gender_Counts` key of a customer's gender."""
+    return UNKNOWN_GENDER if gender is None else gender
 
 def age_range(age: int) -> str:
     """
@@ -20,68 +41,190 @@ def age_range(age: int) -> str:
     else:
         return "65+"
 
+def predominant_from_counts(
+        gender_count: Dict[str, int],
+        age_ranges_count: Dict[str, int]
+        ) -> Tuple[str, str]:
+    """
+    Returns the (predominant gender, predominant age range) for the given counters.
+    """
+    predominant_gender = 'M' if gender_count.get('M', 0) >= gender_count.get('F', 0) else 'F'
+    predominant_age_range = max(age_ranges_count.items(), key=lambda x: x[1])[0]
 
-def product_predominant_profile(
-        data: List[tuple]
-        ) -> Dict[str, List[Dict[str, str]]]:
-    '''
-    Returns the genres that most consumed a given product and their age range.
-    '''
+    #TODO Improve the logic to return gender or age if have the same count
 
-    products = {}
-    for product_id, product_name, gender, age in data:
-        if product_name not in products:
-            products[product_name] = []
-        
-        products[product_name].append((gender, age))
+    return predominant_gender, predominant_age_range
 
-    output = []
+def profile_document(
+        product_name: str,
+        gender_count: Dict[str, int],
+        age_ranges_count: Dict[str, int]
+        ) -> Dict[str, Any]:
+    """The profile entry of a product, with its counters and the derived predominant values."""
+    predominant_gender, predominant_age_range = predominant_from_counts(gender_count, age_ranges_count)
+    return {
+        'Product': product_name,
+        'Predominant_Gender': predominant_gender,
+        'Predominant_Age_Range': predominant_age_range,
+        'Gender_Counts': gender_count,
+        'Age_Range_Counts': age_ranges_count,
+    }
+
+class ProductProfileCounters:
+    """
+    Per-product gender and age range counters.
+
+    Counters only ever grow by addition, so two instances built from disjoint
+    sets of sales (batches, partitions, incremental runs) can be merged in any
+    order and give the same result as counting everything at once. The
+    predominant gender and age range are derived from the counters on demand.
+    """
+
+    def __init__(self):
+        # product name -> (gender counts, age range counts)
+        self.products: Dict[str, Tuple[Dict[str, int], Dict[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def product_counters(self, product_name: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Return the (gender counts, age range counts) of a product, creating them if needed."""
+        if product_name not in self.products:
+            self.products[product_name] = ({'M': 0, 'F': 0}, {})
+        return self.products[product_name]
+
+    def add(self, product_name: str, gender: str, range_key: str, count: int = 1) -> None:
+        """Count `count` sales of a product to customers of `gender` in the `range_key` age range."""
+        gender_count, age_ranges_count = self.product_counters(product_name)
+        gender = gender_key(gender)
+        gender_count[gender] = gender_count.get(gender, 0) + count
+        age_ranges_count[range_key] = age_ranges_count.get(range_key, 0) + count
+
+    def update(self, rows: Iterable[tuple]) -> 'ProductProfileCounters':
+        """Count (product_id, product_name, gender, age) rows."""
+        for product_id, product_name, gender, age in rows:
+            self.add(product_name, gender, age_range(age))
+        return self
+
+    def update_counts(self, rows: Iterable[tuple]) -> 'ProductProfileCounters':
+        """Add pre-aggregated (product_id, product_name, gender, age range, count) rows."""
+        for product_id, product_name, gender, range_key, count in rows:
+            self.add(product_name, gender, range_key, count)
+        return self
+
+    def merge(self, other: 'ProductProfileCounters') -> 'ProductProfileCounters':
+        """Add the counters of `other` into this instance."""
+        for product_name, (other_gender, other_ages) in other.products.items():
+            gender_count, age_ranges_count = self.product_counters(product_name)
+            for gender, count in other_gender.items():
+                gender_count[gender] = gender_count.get(gender, 0) + count
+            for range_key, count in other_ages.items():
+                age_ranges_count[range_key] = age_ranges_count.get(range_key, 0) + count
+        return self
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict[str, Any]]) -> 'ProductProfileCounters':
+        """Rebuild counters from stored profile documents (see `to_documents`)."""
+        counters = cls()
+        for document in documents:
+            gender_count, age_ranges_count = counters.product_counters(document['Product'])
+            gender_count.update(document.get('Gender_Counts', {}))
+            age_ranges_count.update(document.get('Age_Range_Counts', {}))
+        return counters
+
+    def to_documents(self) -> List[Dict[str, Any]]:
+        """One profile entry per product (see `profile_document`)."""
+        return [
+            profile_document(product_name, gender_count, age_ranges_count)
+            for product_name, (gender_count, age_ranges_count) in self.products.items()
+        ]
+
+def _new_profile_counts() -> Tuple[Dict[str, int], Dict[str, int]]:
+    return {'M': 0, 'F': 0}, {}
+
+def _add_profile_sale(counts, sale: Tuple[str, str]):
+    gender, range_key = sale
+    gender = gender_key(gender)
+    gender_count, age_ranges_count = counts
+    gender_count[gender] = gender_count.get(gender, 0) + 1
+    age_ranges_count[range_key] = age_ranges_count.get(range_key, 0) + 1
+    return counts
 
-    for product_name, profiles in products.items():
-        gender_count = {'M': 0, 'F': 0}
+def _merge_profile_counts(counts, other):
+    for target, source in zip(counts, other):
+        for key, count in source.items():
+            target[key] = target.get(key, 0) + count
+    return counts
 
-        age_ranges_count = {}
-    
-        for gender, age in profiles:
-            gender_count[gender] += 1
-            range_key = age_range(age)
-            age_ranges_count[range_key] = age_ranges_count.get(range_key, 0) + 1
+def external_profile_documents(rows: Iterable[tuple], memory_budget_mb: float) -> List[Dict[str, Any]]:
+    """
+    Profile entries of (product_id, product_name, gender, age) rows, counted
+    per product with an `ExternalGroupBy` so the counters spill to disk past
+    `memory_budget_mb`.
+    """
+    with ExternalGroupBy(
+            _new_profile_counts, _add_profile_sale, _merge_profile_counts, memory_budget_mb=memory_budget_mb
+            ) as grouper:
+        for product_id, product_name, gender, age in rows:
+            grouper.add(product_name, (gender, age_range(age)))
+        return [
+            profile_document(product_name, gender_count, age_ranges_count)
+            for product_name, (gender_count, age_ranges_count) in grouper.groups()
+        ]
 
-        predominant_gender = 'M' if gender_count['M'] >= gender_count['F'] else 'F'
-        predominant_age_range = max(age_ranges_count.items(), key=lambda x: x[1])[0]
+def product_predominant_profile(
+        data: Union[Iterable[tuple], ProductProfileCounters],
+        memory_budget_mb: Optional[float] = TRANSFORM_CONFIG['MEMORY_BUDGET_MB']
+        ) -> Dict[str, List[Dict[str, str]]]:
+    '''
+    Returns the genres that most consumed a given product and their age range.
 
-        #TODO Improve the logic to return gender or age if have the same count
-        
-        output.append({
-            'Product': product_name,
-            'Predominant_Gender': predominant_gender,
-            'Predominant_Age_Range': predominant_age_range,
-        })
+    `data` may be any iterable of rows (e.g. a stream of batches chained
+    together) or already merged `ProductProfileCounters`: rows only update
+    the counters, so memory grows with the number of products instead of
+    the number of sales. With `memory_budget_mb`, the counters of rows are
+    also spilled to disk once they outgrow the budget.
+    '''
+    if isinstance(data, ProductProfileCounters):
+        documents = data.to_documents()
+    elif memory_budget_mb:
+        documents = external_profile_documents(data, memory_budget_mb)
+    else:
+        documents = ProductProfileCounters().update(data).to_documents()
 
     result = {
         'processing_date': datetime.now().strftime("%d/%m/%Y"),
-        'data': output
+        'data': documents
     }
 
     return result
 
+def product_predominant_profile_from_counts(
+        data: Iterable[tuple]
+        ) -> Dict[str, List[Dict[str, str]]]:
+    '''
+    Same as `product_predominant_profile`, for rows already counted by the
+    database: (product_id, product_name, gender, age range, count).
+    '''
+    return product_predominant_profile(ProductProfileCounters().update_counts(data))
+
 def most_common_products(
-        data: List[Tuple[str, str, int]]
+        data: Iterable[tuple]
         ) -> Dict[str, List[Dict[str, str]]]:
     """
     Returns the most common products bought together.
 
     Args:
-        data: List of tuples with (produto1_nome, produto2_nome, frequencia)
+        data: Iterable of tuples with (produto1_nome, produto2_nome, frequencia).
+            Larger itemsets (produto1_nome, ..., produtoN_nome, frequencia)
+            get one Product_<n> key per product.
     """
     output = []
 
-    for produto1_nome, produto2_nome, frequencia in data:
-        output.append({
-            'Product_1': produto1_nome,
-            'Product_2': produto2_nome,
-            'Count': frequencia
-        })
+    for *produtos, frequencia in data:
+        entry = {f'Product_{n}': produto_nome for n, produto_nome in enumerate(produtos, start=1)}
+        entry['Count'] = frequencia
+        output.append(entry)
 
     result = {
         'processing_date': datetime.now().strftime("%d/%m/%Y"),
@@ -90,47 +233,53 @@ def most_common_products(
 
     return result
 
-def transform_complete_orders_to_dw_format(orders: list) -> Dict[str, Any]:
+def dw_order_document(order: OrderRecord, age_group: str) -> Dict[str, Any]:
     """
-    Transform the complete orders data to the desired format for loading into the data warehouse.
+    Build the data warehouse document of one extracted order, given the
+    customer's already computed age group.
     """
-    from datetime import datetime
+    categories = set(item.categoria for item in order.itens if item.categoria)
 
-    result = []
-
-    for order in orders:
-
-        categories = set(item.get('categoria') for item in order.get('itens', [])
-                         if item.get('categoria'))
-
-        transformed_order = {
-            'order_id': order['id'],
-            'order_date': order.get('data_venda').strftime("%Y-%m-%d") if order.get('data_venda') else None,
-            'categories': list(categories),
-            'customer': {
-                'id': order.get('cliente_id'),
-                'name': order.get('nome', ''),
-                'email': order.get('email', ''),
-                'gender': order.get('gender', ''),
-                'age': order.get('age', 0),
-                'age_group': age_range(order.get('age', 0))
-            },
-            'items': [
-                {
-                    'product_id': item.get('id'),
-                    'product_name': item.get('nome', ''),
-                    'category': item.get('categoria', ''),
-                    'quantity': item.get('quantidade', 0),
-                    'unit_price': item.get('preco_unitario', 0),
-                    'total_price': item.get('quantidade', 0) * item.get('preco_unitario', 0)
-                }
-                for item in order.get('itens', [])
-            ]
-        }
-        result.append(transformed_order)
+    return {
+        'order_id': order.id,
+        'order_date': order.data_venda.strftime("%Y-%m-%d") if order.data_venda else None,
+        'categories': list(categories),
+        'customer': {
+            'id': order.cliente_id,
+            'name': order.nome,
+            'email': order.email,
+            'gender': order.gender,
+            'age': order.age,
+            'age_group': age_group
+        },
+        'items': [
+            {
+                'product_id': item.id,
+                'product_name': item.nome,
+                'category': item.categoria,
+                'quantity': item.quantidade,
+                'unit_price': item.preco_unitario,
+                'total_price': item.quantidade * item.preco_unitario
+            }
+            for item in order.itens
+        ]
+    }
 
+def orders_envelope(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Wrap transformed orders with the processing metadata."""
     return {
         'processing_date': datetime.now().strftime("%Y-%m-%d"),
         'processing_timestamp': datetime.now().isoformat(),
-        'data': result
-    }
\ No newline at end of file
+        'data': documents
+    }
+
+def transform_complete_orders_to_dw_format(orders: Iterable[OrderRecord]) -> Dict[str, Any]:
+    """
+    Transform the complete orders data to the desired format for loading into the data warehouse.
+    """
+    result = []
+
+    for order in orders:
+        result.append(dw_order_document(order, age_range(order.age)))
+
+    return orders_envelope(result)
@@ -0,0 +1,138 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .records import OrderRecord
+from .transform import (
+    AGE_RANGE_LABELS, AGE_RANGE_UPPER_BOUNDS, ProductProfileCounters,
+    dw_order_document, gender_key, orders_envelope, product_predominant_profile
+)
+
+CHUNK_SIZE = 100_000
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for the 'numpy' transform engine (pip install numpy)")
+
+def _chunks(rows: Iterable, size: int) -> Iterable[list]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            break
+        yield chunk
+
+def age_range_codes(ages: Sequence[int]) -> "np.ndarray":
+    """
+    Vectorized `age_range`: returns the index in `AGE_RANGE_LABELS` of each age.
+    """
+    _require_numpy()
+    return np.searchsorted(AGE_RANGE_UPPER_BOUNDS, np.asarray(ages), side='left')
+
+def factorize(values: Sequence[Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Encode `values` as integer codes. Uniques are numbered in order of first
+    appearance, so iterating them matches dict insertion order in the
+    pure-Python transforms. Values only need to be hashable: unlike
+    `np.unique`, they are never compared, so None can sit next to strings.
+
+    Returns:
+        (codes, uniques) with uniques[codes] == values
+    """
+    _require_numpy()
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    uniques = np.empty(len(index), dtype=object)
+    for value, code in index.items():
+        uniques[code] = value
+    return codes, uniques
+
+def _grouped_counts(group_codes, value_codes, n_groups: int, n_values: int):
+    """
+    Count (group, value) combinations with a single bincount, and find the row
+    where each combination first appears.
+    """
+    combined = group_codes * n_values + value_codes
+    counts = np.bincount(combined, minlength=n_groups * n_values).reshape(n_groups, n_values)
+    first_seen = np.full(n_groups * n_values, len(combined), dtype=np.int64)
+    np.minimum.at(first_seen, combined, np.arange(len(combined)))
+    return counts, first_seen.reshape(n_groups, n_values)
+
+def profile_counters_from_columns(
+        product_names: Sequence[str],
+        genders: Sequence[str],
+        ages: Sequence[int]
+        ) -> ProductProfileCounters:
+    """
+    Build `ProductProfileCounters` from columnar product name, gender and age arrays.
+    """
+    _require_numpy()
+    counters = ProductProfileCounters()
+    if len(product_names) == 0:
+        return counters
+
+    product_codes, products = factorize(product_names)
+    gender_codes, gender_labels = factorize(genders)
+    bucket_codes = age_range_codes(ages)
+
+    gender_counts, gender_first_seen = _grouped_counts(
+        product_codes, gender_codes, len(products), len(gender_labels)
+    )
+    bucket_counts, bucket_first_seen = _grouped_counts(
+        product_codes, bucket_codes, len(products), len(AGE_RANGE_LABELS)
+    )
+
+    for code, product_name in enumerate(products):
+        gender_count, age_ranges_count = counters.product_counters(product_name)
+        for value in np.argsort(gender_first_seen[code], kind='stable'):
+            if gender_counts[code, value]:
+                gender = gender_key(gender_labels[value])
+                gender_count[gender] = gender_count.get(gender, 0) + int(gender_counts[code, value])
+        for value in np.argsort(bucket_first_seen[code], kind='stable'):
+            if bucket_counts[code, value]:
+                age_ranges_count[AGE_RANGE_LABELS[value]] = int(bucket_counts[code, value])
+
+    return counters
+
+def product_predominant_profile_vectorized(
+        data: Union[Iterable[tuple], ProductProfileCounters],
+        chunk_size: int = CHUNK_SIZE
+        ) -> Dict[str, List[Dict[str, str]]]:
+    """
+    NumPy engine for `product_predominant_profile`.
+
+    Rows are converted to columns `chunk_size` at a time and the per-chunk
+    counters are merged, so streamed input keeps a bounded footprint.
+    """
+    _require_numpy()
+    if isinstance(data, ProductProfileCounters):
+        return product_predominant_profile(data)
+
+    counters = ProductProfileCounters()
+    for chunk in _chunks(data, chunk_size):
+        _, product_names, genders, ages = zip(*chunk)
+        counters.merge(profile_counters_from_columns(product_names, genders, ages))
+
+    return product_predominant_profile(counters)
+
+def transform_complete_orders_to_dw_format_vectorized(
+        orders: Iterable[OrderRecord],
+        chunk_size: int = CHUNK_SIZE
+        ) -> Dict[str, Any]:
+    """
+    NumPy engine for `transform_complete_orders_to_dw_format`: customer age
+    groups are bucketed for a whole chunk of orders at once.
+    """
+    _require_numpy()
+    labels = np.asarray(AGE_RANGE_LABELS, dtype=object)
+    result = []
+
+    for chunk in _chunks(orders, chunk_size):
+        age_groups = labels[age_range_codes([order.age for order in chunk])]
+        result.extend(dw_order_document(order, age_group) for order, age_group in zip(chunk, age_groups))
+
+    return orders_envelope(result)
@@ -0,0 +1,262 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rows whose size is measured to estimate the bytes of a whole stage
+BYTES_SAMPLE_SIZE = 100
+
+def _deep_sizeof(value: Any) -> int:
+    """Approximate in-memory size of a row: the container plus its elements, recursively."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(key) + _deep_sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_deep_sizeof(item) for item in value)
+    elif hasattr(value, '__slots__'):
+        size += sum(_deep_sizeof(getattr(value, slot)) for slot in value.__slots__)
+    return size
+
+def estimate_bytes(rows: List[Any]) -> int:
+    """Estimate the in-memory size of `rows` from a sample of them."""
+    if not rows:
+        return 0
+    sample = list(islice(rows, BYTES_SAMPLE_SIZE))
+    return int(sum(_deep_sizeof(row) for row in sample) / len(sample) * len(rows))
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or its peak where the current value is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class StageMetrics:
+    """Counters of one stage of a flow; a stage may be entered several times (e.g. once per batch)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_python_bytes = None
+        self.rss_bytes = None
+        self.rss_delta_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        rows = self.rows_out or self.rows_in
+        return {
+            "seconds": self.seconds,
+            "calls": self.calls,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "rows_per_sec": rows / self.seconds if self.seconds > 0 else None,
+            "peak_python_bytes": self.peak_python_bytes,
+            "rss_bytes": self.rss_bytes,
+            "rss_delta_bytes": self.rss_delta_bytes
+        }
+
+class FlowInstrumentation:
+    """
+    perf_counter based timing, row/byte counts and memory of the stages of
+    one flow.
+
+    Peak Python memory is only tracked when `trace_memory` is set, since
+    tracemalloc slows allocations down; it is process-wide, so flows running
+    at the same time share it. `profile` runs the whole flow under cProfile.
+    """
+
+    def __init__(self, flow_name: str, trace_memory: bool = False, profile: bool = False, profile_top: int = 20):
+        self.flow_name = flow_name
+        self.trace_memory = trace_memory
+        self.profile_top = profile_top
+        self.stages: Dict[str, StageMetrics] = {}
+        self._profiler = cProfile.Profile() if profile else None
+        self._started_tracing = False
+        # Stages being timed; nested when e.g. a transform pulls streamed batches
+        self._active: List[StageMetrics] = []
+
+    def stage_metrics(self, name: str) -> StageMetrics:
+        if name not in self.stages:
+            self.stages[name] = StageMetrics()
+        return self.stages[name]
+
+    @contextmanager
+    def flow(self):
+        """Wrap the whole flow: starts memory tracing and the profiler if enabled."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._profiler:
+            try:
+                self._profiler.enable()
+            except ValueError as e:
+                # Only one profiler can be active per process (e.g. two flows profiled concurrently)
+                logger.warning(f"Could not profile flow {self.flow_name}: {e}")
+                self._profiler = None
+        try:
+            yield self
+        finally:
+            if self._profiler:
+                self._profiler.disable()
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _flush_peak(self) -> None:
+        """Credit the traced peak since the last reset to every active stage, then reset it."""
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for metrics in self._active:
+            metrics.peak_python_bytes = max(metrics.peak_python_bytes or 0, peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Time a (possibly repeated) section of a stage and record its memory."""
+        metrics = self.stage_metrics(name)
+        self._flush_peak()
+        self._active.append(metrics)
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.seconds += time.perf_counter() - start
+            metrics.calls += 1
+            rss_after = current_rss_bytes()
+            metrics.rss_bytes = rss_after
+            metrics.rss_delta_bytes += rss_after - rss_before
+            self._flush_peak()
+            self._active.remove(metrics)
+
+    def timed_batches(self, name: str, batches: Iterable[list]) -> Iterator[list]:
+        """
+        Yield `batches`, timing only the wait for each one under stage `name`
+        and counting its rows and bytes as the stage's output.
+        """
+        batches = iter(batches)
+        while True:
+            with self.stage(name) as metrics:
+                batch = next(batches, None)
+                if batch is not None:
+                    metrics.rows_out += len(batch)
+                    metrics.bytes_out += estimate_bytes(batch)
+            if batch is None:
+                break
+            yield batch
+
+    def profile_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """The functions with the most cumulative time in the profiled flow."""
+        if not self._profiler:
+            return None
+        try:
+            stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        except TypeError:
+            # Nothing was recorded
+            return []
+        top = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in islice(
+                sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True), self.profile_top):
+            top.append({
+                "function": f"{filename}:{line}({function})",
+                "calls": calls,
+                "total_seconds": total,
+                "cumulative_seconds": cumulative
+            })
+        return top
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {"stages": {name: metrics.to_dict() for name, metrics in self.stages.items()}}
+        profile = self.profile_stats()
+        if profile is not None:
+            result["profile"] = profile
+        return result
+
+def _label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def to_openmetrics(result: Dict[str, Any], prefix: str = "etl") -> str:
+    """
+    Render the stage metrics of an `ETLPipeline.run()` result in the
+    OpenMetrics text format.
+    """
+    stage_fields = {
+        "seconds": ("stage_duration_seconds", "Time spent in the stage"),
+        "rows_in": ("stage_rows_in", "Rows received by the stage"),
+        "rows_out": ("stage_rows_out", "Rows produced by the stage"),
+        "bytes_in": ("stage_bytes_in", "Estimated in-memory bytes received by the stage"),
+        "bytes_out": ("stage_bytes_out", "Estimated in-memory bytes produced by the stage"),
+        "rows_per_sec": ("stage_rows_per_second", "Rows processed per second"),
+        "peak_python_bytes": ("stage_peak_python_bytes", "Peak traced Python memory during the stage"),
+        "rss_bytes": ("stage_rss_bytes", "Process resident set size after the stage"),
+        # Pipelined runs (see `stages.run_stages`)
+        "busy_seconds": ("stage_busy_seconds", "Time the stage spent working"),
+        "starved_seconds": ("stage_starved_seconds", "Time the stage waited for input from the upstream stage"),
+        "blocked_seconds": ("stage_blocked_seconds", "Time the stage waited for room in its output queue"),
+        "utilization": ("stage_utilization", "Fraction of the stage's wall time spent working"),
+    }
+    # Queues of a pipelined run, labelled with the stage that reads them
+    queue_fields = {
+        "capacity": ("stage_input_queue_capacity", "Capacity of the queue feeding the stage"),
+        "max_depth": ("stage_input_queue_max_depth", "Maximum depth of the queue feeding the stage"),
+        "avg_depth": ("stage_input_queue_avg_depth", "Average depth of the queue feeding the stage"),
+    }
+    samples = {field: [] for field in stage_fields}
+    queue_samples = {field: [] for field in queue_fields}
+    flow_success = []
+    for flow_name, flow_metrics in result.get("metrics", {}).items():
+        if not isinstance(flow_metrics, dict) or "success" not in flow_metrics:
+            continue
+        flow_success.append((flow_name, 1 if flow_metrics["success"] else 0))
+        for stage_name, stage in flow_metrics.get("stages", {}).items():
+            for field in stage_fields:
+                if stage.get(field) is not None:
+                    samples[field].append((flow_name, stage_name, stage[field]))
+        for queue_name, depths in flow_metrics.get("queues", {}).items():
+            # Named "<producer>-><consumer>" by `run_stages`
+            stage_name = queue_name.split("->")[-1]
+            for field in queue_fields:
+                if depths.get(field) is not None:
+                    queue_samples[field].append((flow_name, stage_name, depths[field]))
+
+    lines = []
+    for fields, field_samples in ((stage_fields, samples), (queue_fields, queue_samples)):
+        for field, (name, help_text) in fields.items():
+            if not field_samples[field]:
+                continue
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"# HELP {prefix}_{name} {help_text}.")
+            for flow_name, stage_name, value in field_samples[field]:
+                lines.append(
+                    f'{prefix}_{name}{{flow="{_label_value(flow_name)}",stage="{_label_value(stage_name)}"}} {value}'
+                )
+    if flow_success:
+        lines.append(f"# TYPE {prefix}_flow_success gauge")
+        lines.append(f"# HELP {prefix}_flow_success Whether the flow succeeded (1) or not (0).")
+        for flow_name, value in flow_success:
+            lines.append(f'{prefix}_flow_success{{flow="{_label_value(flow_name)}"}} {value}')
+    if result.get("total_duration_seconds") is not None:
+        lines.append(f"# TYPE {prefix}_pipeline_duration_seconds gauge")
+        lines.append(f"# HELP {prefix}_pipeline_duration_seconds Duration of the whole pipeline run.")
+        lines.append(f"{prefix}_pipeline_duration_seconds {result['total_duration_seconds']}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,88 @@
+"""
+Deterministic synthetic datasets shaped like the rows returned by the
+extractors in `app.service.extract`, so transforms and loaders can be
+benchmarked without a database.
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from app.service.extract import group_sales_lines_into_orders
+from app.service.records import OrderRecord
+from app.service.transform import age_range
+
+# Sales lines (one per sold item) of each benchmark scale
+SCALES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000
+}
+SEED = 42
+NUM_PRODUCTS = 60
+NUM_CATEGORIES = 15
+MAX_BASKET_SIZE = 8
+# Average items per sale of the uniform 1..MAX_BASKET_SIZE basket distribution
+AVG_BASKET_SIZE = (1 + MAX_BASKET_SIZE) / 2
+
+def sales_lines(num_lines: int, seed: int = SEED) -> List[tuple]:
+    """
+    Rows of `SALES_LINES_QUERY`: one per sold item, ordered by order id,
+    with about `num_lines` rows in total.
+    """
+    rng = random.Random(seed)
+    num_clients = max(1, int(num_lines / AVG_BASKET_SIZE / 10))
+    clients = [
+        (client_id, f"Client {client_id}", f"client{client_id}@example.com",
+         'M' if client_id % 2 else 'F', rng.randint(18, 80))
+        for client_id in range(1, num_clients + 1)
+    ]
+    products = [
+        (product_id, f"Product {product_id}", Decimal(rng.randint(1000, 200000)) / 100,
+         f"Category {product_id % NUM_CATEGORIES}")
+        for product_id in range(1, NUM_PRODUCTS + 1)
+    ]
+    start = date(2024, 1, 1)
+
+    rows = []
+    order_id = 0
+    while len(rows) < num_lines:
+        order_id += 1
+        client_id, nome, email, gender, age = rng.choice(clients)
+        data_venda = start + timedelta(days=rng.randrange(365))
+        itens = rng.sample(products, k=min(rng.randint(1, MAX_BASKET_SIZE), num_lines - len(rows)))
+        quantidades = [rng.randint(1, 3) for _ in itens]
+        valor_total = sum(preco * quantidade for (_, _, preco, _), quantidade in zip(itens, quantidades))
+        for (product_id, product_name, preco, categoria), quantidade in zip(itens, quantidades):
+            rows.append((
+                order_id, data_venda, valor_total, client_id, nome, email, gender, age,
+                product_id, product_name, quantidade, preco, categoria
+            ))
+    return rows
+
+def derived_datasets(lines: List[tuple]) -> Dict[str, list]:
+    """The input of every flow, derived from the same sales lines."""
+    pairs = Counter()
+    for order in orders(lines):
+        for first in order.itens:
+            for second in order.itens:
+                if first.id < second.id:
+                    pairs[(first.nome, second.nome)] += 1
+
+    profile_counts = Counter((row[8], row[9], row[6], age_range(row[7])) for row in lines)
+
+    return {
+        # (product_id, product_name, gender, age)
+        "transaction_products": [(row[8], row[9], row[6], row[7]) for row in lines],
+        # (product_id, product_name, gender, age range, count)
+        "product_profile_counts": [(*key, count) for key, count in profile_counts.items()],
+        # (order_id, product_id, product_name)
+        "order_baskets": [(row[0], row[8], row[9]) for row in lines],
+        # (produto1_nome, produto2_nome, frequencia)
+        "frequency_itemsets": [(first, second, count) for (first, second), count in pairs.most_common()],
+    }
+
+def orders(lines: List[tuple]) -> List[OrderRecord]:
+    """Rows of `extract_orders_with_customers_and_items`, built from the sales lines."""
+    return [order for batch in group_sales_lines_into_orders([lines]) for order in batch]
@@ -0,0 +1,66 @@
+import resource
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+def _percentile(ordered: List[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+def measure(
+        fn: Callable[..., Any],
+        rows: int,
+        setup: Optional[Callable[[], tuple]] = None,
+        repeat: int = 3,
+        trace_memory: bool = True,
+        check: Optional[Callable[[Any], bool]] = None
+        ) -> Dict[str, Any]:
+    """
+    Time `repeat` calls of `fn(*setup())` and report throughput, latency
+    percentiles and peak memory.
+
+    `setup` runs outside the timed section (e.g. to copy an input the
+    function mutates). Peak memory is measured on one extra call under
+    tracemalloc, so tracing does not slow down the timed calls. `check`
+    tells whether a call's return value means success (e.g. a loader's).
+    """
+    timings = []
+    success = True
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+        if check is not None:
+            success = success and bool(check(result))
+
+    peak = None
+    if trace_memory:
+        args = setup() if setup else ()
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    ordered = sorted(timings)
+    median = _percentile(ordered, 0.50)
+    return {
+        "success": success,
+        "rows": rows,
+        "runs": repeat,
+        "seconds": {
+            "min": ordered[0],
+            "mean": sum(ordered) / len(ordered),
+            "p50": median,
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": ordered[-1]
+        },
+        "rows_per_sec": rows / median if median > 0 else None,
+        "peak_memory_mb": peak / 1024 / 1024 if peak is not None else None
+    }
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,315 @@
+"""
+Stage-level benchmarks of the ETL.
+
+    python -m benchmarks.run --scale 10k --stages transform
+    python -m benchmarks.run --scale 1m --stages extract,load,pipeline --mongo memory --populate
+    python -m benchmarks.run --scale 1m --stages codec,records
+
+Transforms, BSON codecs and row record sizes run on in-memory synthetic
+data and need no database. Extractors
+and the full pipeline read the Postgres configured in .env (use an empty
+local database with --populate, which fills it with app/db/generate.py).
+Loaders and the pipeline write to the ETL-benchmark database, dropped once
+they are done, of a local MongoDB (MONGODB_URI) or, with --mongo memory, of
+an in-memory mongomock client.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+import bson
+
+from app.config import EXTRACT_CONFIG
+from app.db.mongo_connection import MongoDBConnection, get_mongo_connection
+from app.service import extract, load, transform
+from app.service.codec import bson_codec_options
+from app.service.records import ItemRecord, OrderRecord
+from app.service.itemsets import most_common_itemsets
+from app.service.pipeline import ETLPipeline
+from app.service.vectorized import (
+    np, product_predominant_profile_vectorized, transform_complete_orders_to_dw_format_vectorized
+)
+
+from .datasets import AVG_BASKET_SIZE, NUM_PRODUCTS, SCALES, SEED, derived_datasets, orders, sales_lines
+from .harness import max_rss_mb, measure
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("transform", "codec", "records", "load", "extract", "pipeline")
+BENCHMARK_DB = 'ETL-benchmark'
+PIPELINE_MODES = {
+    "default": {},
+    "streaming": {"streaming": True},
+    "bulk": {"streaming": True, "bulk_load": True},
+    "pipelined": {"pipelined": True, "bulk_load": True},
+    "shared_scan": {"shared_scan": True, "bulk_load": True}
+}
+
+def use_mongo_stand_in(kind: str) -> None:
+    """Point the MongoDB singleton at an in-memory client, or keep the local one from MONGODB_URI."""
+    if kind != "memory":
+        return
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock is required for --mongo memory (pip install mongomock)")
+    MongoDBConnection._client = mongomock.MongoClient()
+    MongoDBConnection._instance = object.__new__(MongoDBConnection)
+
+def populate_postgres(num_lines: int, seed: int) -> None:
+    """Fill the configured Postgres with about `num_lines` sales lines using the bulk generator."""
+    num_sales = max(1, int(num_lines / AVG_BASKET_SIZE))
+    db_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "db")
+    subprocess.run(
+        [sys.executable, "generate.py", "--sales", str(num_sales), "--clients", str(max(1, num_sales // 10)),
+         "--products", str(NUM_PRODUCTS), "--seed", str(seed)],
+        cwd=db_dir, check=True
+    )
+
+def bench_transforms(datasets, order_rows, repeat):
+    results = {}
+    benchmarks = {
+        "product_predominant_profile": (transform.product_predominant_profile, datasets["transaction_products"]),
+        "product_predominant_profile_from_counts": (
+            transform.product_predominant_profile_from_counts, datasets["product_profile_counts"]
+        ),
+        "most_common_products": (transform.most_common_products, datasets["frequency_itemsets"]),
+        "most_common_itemsets": (most_common_itemsets, datasets["order_baskets"]),
+        "transform_complete_orders_to_dw_format": (transform.transform_complete_orders_to_dw_format, order_rows),
+    }
+    if np is not None:
+        benchmarks["product_predominant_profile_vectorized"] = (
+            product_predominant_profile_vectorized, datasets["transaction_products"]
+        )
+        benchmarks["transform_complete_orders_to_dw_format_vectorized"] = (
+            transform_complete_orders_to_dw_format_vectorized, order_rows
+        )
+
+    for name, (fn, data) in benchmarks.items():
+        logger.info(f"Benchmarking transform {name}")
+        results[f"transform.{name}"] = measure(partial(fn, data), rows=len(data), repeat=repeat)
+    return results
+
+def json_round_trip(data):
+    """How Decimals were made BSON-encodable before the codec layer: a JSON round trip of the whole payload."""
+    return json.loads(json.dumps(data, default=lambda x: float(x) if isinstance(x, Decimal) else None))
+
+def bench_codecs(order_rows, repeat):
+    """BSON encoding of the orders envelope: JSON round trip first vs. the type registry codecs."""
+    results = {}
+    envelope = transform.transform_complete_orders_to_dw_format(order_rows)
+    rows = len(envelope["data"])
+    benchmarks = {
+        "json_round_trip": lambda: bson.encode(json_round_trip(envelope)),
+        "type_registry_float": partial(bson.encode, envelope, codec_options=bson_codec_options("float")),
+        "type_registry_decimal128": partial(bson.encode, envelope, codec_options=bson_codec_options("decimal128")),
+    }
+    for name, fn in benchmarks.items():
+        logger.info(f"Benchmarking BSON encoding with {name}")
+        results[f"codec.{name}"] = measure(fn, rows=rows, repeat=repeat)
+    return results
+
+def bench_records(order_rows):
+    """
+    Memory of the extracted orders (items included) per representation:
+    RealDictCursor-style dicts, plain tuples and the slots records. Field
+    values are shared, so only the per-row containers are counted.
+    """
+    items = sum(len(order.itens) for order in order_rows)
+    representations = {
+        "dict": lambda: [order.to_dict() for order in order_rows],
+        "tuple": lambda: [
+            (*order.to_tuple()[:-1], [item.to_tuple() for item in order.itens]) for order in order_rows
+        ],
+        "record": lambda: [
+            OrderRecord(*order.to_tuple()[:-1], [ItemRecord(*item.to_tuple()) for item in order.itens])
+            for order in order_rows
+        ],
+    }
+    results = {}
+    for name, build in representations.items():
+        logger.info(f"Measuring {name} rows")
+        tracemalloc.start()
+        rows = build()
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[f"records.{name}"] = {
+            "orders": len(rows),
+            "items": items,
+            "bytes": traced,
+            "bytes_per_order": traced / len(rows) if rows else None,
+            "bytes_per_row": traced / (len(rows) + items) if rows else None
+        }
+        del rows
+    return results
+
+def bench_loads(datasets, order_rows, repeat):
+    results = {}
+    client = get_mongo_connection()
+    transformed = {
+        "product_predominant_profile": transform.product_predominant_profile(datasets["transaction_products"]),
+        "most_common_products": transform.most_common_products(datasets["frequency_itemsets"]),
+        "complete_orders_to_dw": transform.transform_complete_orders_to_dw_format(order_rows),
+    }
+
+    for name, data in transformed.items():
+        collection_name = f"bench-{name}"
+        loaders = {
+            f"load_{name}": getattr(load, f"load_{name}"),
+            f"bulk_load_{name}": getattr(load, f"bulk_load_{name}"),
+        }
+        for loader_name, loader in loaders.items():
+            def setup(data=data, collection_name=collection_name):
+                client[BENCHMARK_DB].drop_collection(collection_name)
+                # insert_one adds an _id to the document it is given
+                return (dict(data),)
+
+            logger.info(f"Benchmarking loader {loader_name}")
+            results[f"load.{loader_name}"] = measure(
+                partial(loader, db_name=BENCHMARK_DB, collection_name=collection_name),
+                rows=len(data["data"]),
+                setup=setup,
+                repeat=repeat,
+                check=lambda result: result.get("success", False) if isinstance(result, dict) else result
+            )
+    client.drop_database(BENCHMARK_DB)
+    return results
+
+def bench_extracts(repeat, itersize):
+    results = {}
+    extractors = {
+        "fetch_transaction_products": extract.fetch_transaction_products,
+        "stream_transaction_products": partial(extract.stream_transaction_products, itersize=itersize),
+        "fetch_product_profile_counts": extract.fetch_product_profile_counts,
+        "get_frequency_itemsets": extract.get_frequency_itemsets,
+        "stream_order_baskets": partial(extract.stream_order_baskets, itersize=itersize),
+        "extract_orders_with_customers_and_items": extract.extract_orders_with_customers_and_items,
+        "stream_orders_with_customers_and_items": partial(
+            extract.stream_orders_with_customers_and_items, itersize=itersize
+        ),
+        "stream_sales_lines": partial(extract.stream_sales_lines, itersize=itersize),
+    }
+
+    for name, extractor in extractors.items():
+        if name.startswith("stream_"):
+            def run(extractor=extractor):
+                return sum(len(batch) for batch in extractor())
+        else:
+            def run(extractor=extractor):
+                return len(extractor())
+
+        logger.info(f"Benchmarking extractor {name}")
+        # The first call counts the rows and warms the database cache
+        rows = run()
+        results[f"extract.{name}"] = measure(run, rows=rows, repeat=repeat)
+    return results
+
+def bench_pipeline(modes, repeat):
+    results = {}
+    for mode in modes:
+        last_result = {}
+
+        def run(mode=mode):
+            # Loads, watermarks and checkpoints go to the benchmark database, never the warehouse
+            last_result.update(ETLPipeline(db_name=BENCHMARK_DB, **PIPELINE_MODES[mode]).run())
+            return last_result
+
+        logger.info(f"Benchmarking pipeline in {mode} mode")
+        run()
+        rows = sum(
+            metrics.get("records_extracted", 0)
+            for metrics in last_result.get("metrics", {}).values() if isinstance(metrics, dict)
+        )
+        results[f"pipeline.{mode}"] = measure(
+            run, rows=rows, repeat=repeat, trace_memory=False,
+            check=lambda result: result.get("status") == "success"
+        )
+    get_mongo_connection().drop_database(BENCHMARK_DB)
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stage-level ETL benchmarks")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="Sales lines of the synthetic dataset")
+    parser.add_argument("--stages", default="transform", help=f"Comma separated subset of {','.join(STAGES)}")
+    parser.add_argument("--pipeline-modes", default="default",
+                        help=f"Comma separated subset of {','.join(PIPELINE_MODES)}")
+    parser.add_argument("--mongo", choices=("memory", "local"), default="local")
+    parser.add_argument("--populate", action="store_true", help="Generate the dataset into Postgres first")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--itersize", type=int, default=EXTRACT_CONFIG['ITERSIZE'])
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", help="Result file (default: reports/benchmark_<scale>_<timestamp>.json)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {sorted(unknown)}")
+    num_lines = SCALES[args.scale]
+    started_at = datetime.now()
+
+    results = {}
+    if any(stage in stages for stage in ("transform", "codec", "records", "load")):
+        logger.info(f"Generating {num_lines} synthetic sales lines")
+        lines = sales_lines(num_lines, args.seed)
+        datasets = derived_datasets(lines)
+        order_rows = orders(lines)
+        if "transform" in stages:
+            results.update(bench_transforms(datasets, order_rows, args.repeat))
+        if "codec" in stages:
+            results.update(bench_codecs(order_rows, args.repeat))
+        if "records" in stages:
+            results.update(bench_records(order_rows))
+        if "load" in stages:
+            use_mongo_stand_in(args.mongo)
+            results.update(bench_loads(datasets, order_rows, args.repeat))
+        del lines, datasets, order_rows
+
+    if "extract" in stages or "pipeline" in stages:
+        if args.populate:
+            populate_postgres(num_lines, args.seed)
+        if "extract" in stages:
+            results.update(bench_extracts(args.repeat, args.itersize))
+        if "pipeline" in stages:
+            use_mongo_stand_in(args.mongo)
+            modes = [mode.strip() for mode in args.pipeline_modes.split(",") if mode.strip()]
+            results.update(bench_pipeline(modes, args.repeat))
+
+    report = {
+        "scale": args.scale,
+        "sales_lines": num_lines,
+        "seed": args.seed,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__ if np is not None else None,
+            "mongo": args.mongo
+        },
+        "max_rss_mb": max_rss_mb(),
+        "results": results
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs("reports", exist_ok=True)
+        output = f"reports/benchmark_{args.scale}_{started_at.strftime('%d%m%Y_%H%M')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark results written to {output}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
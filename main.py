@@ -1,8 +1,11 @@
+import argparse
 import logging
 import os
 import json
 from datetime import datetime
+from app.config import METRICS_CONFIG
 from app.service.pipeline import ETLPipeline
+from app.utils.metrics import to_openmetrics
 
 def setup_logging():
     log_dir = "logs"
@@ -20,13 +23,37 @@ def setup_logging():
         ]
     )
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue the previous unfinished run, skipping completed flows and loaded batches"
+    )
+    parser.add_argument(
+        "--refresh-cache", action="store_true",
+        help="Rerun every flow even if its sources did not change since its last load"
+    )
+    parser.add_argument(
+        "--from-staging", metavar="RUN_ID", default=None,
+        help="Load the flows fully transformed by a staged run from its files under STAGING_CONFIG['DIR']"
+    )
+    parser.add_argument(
+        "--async", dest="async_mode", action="store_true", default=None,
+        help="Run the flows on an event loop with asyncpg and AsyncMongoClient (see ASYNC_CONFIG)"
+    )
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     setup_logging()
     logger = logging.getLogger(__name__)
 
     logger.info("Starting ETL application")
 
-    pipeline = ETLPipeline()
+    pipeline = ETLPipeline(
+        resume=args.resume, refresh_cache=args.refresh_cache, from_staging=args.from_staging,
+        async_mode=args.async_mode
+    )
     result = pipeline.run()
 
     os.makedirs("reports", exist_ok=True)
@@ -35,6 +62,10 @@ if __name__ == "__main__":
     with open(f"reports/etl_result_{timestamp}.json", "w") as f:
         json.dump(result, f, indent=2)
 
+    if METRICS_CONFIG['OPENMETRICS']:
+        with open(f"reports/etl_metrics_{timestamp}.prom", "w") as f:
+            f.write(to_openmetrics(result))
+
     if result["status"] == "success":
         logger.info(f"ETL completed successfully in {result['total_duration_seconds']:.2f} seconds")
     elif result["status"] == "partial_success":
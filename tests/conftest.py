@@ -0,0 +1,27 @@
+import pytest
+
+from app.db.mongo_connection import MongoDBConnection
+from app.service import load
+
+def _without_sort(add):
+    """mongomock's bulk builders predate the `sort` argument newer pymongo passes to them."""
+    def add_without_sort(self, *args, sort=None, **kwargs):
+        assert sort is None
+        return add(self, *args, **kwargs)
+    return add_without_sort
+
+@pytest.fixture
+def client(monkeypatch):
+    """Point the MongoDB singleton at an in-memory client."""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(MongoDBConnection, "_client", client)
+    monkeypatch.setattr(MongoDBConnection, "_instance", object.__new__(MongoDBConnection))
+    # mongomock has no custom type registries; tests write no Decimal or date
+    monkeypatch.setattr(
+        load, "warehouse_collection", lambda client, db_name, collection_name: client[db_name][collection_name]
+    )
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ("add_update", "add_replace"):
+        monkeypatch.setattr(builder, name, _without_sort(getattr(builder, name)))
+    return client
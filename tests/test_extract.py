@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+from app.service import extract
+
+# Later orders have earlier dates, so id order and date order differ
+ORDERS = [
+    (order_id, date(2024, 3, 1) - timedelta(days=order_id), 10, 1, 'Maria', 'maria@example.com', 'F', 34)
+    for order_id in (3, 5, 8, 13, 21, 34, 55)
+]
+ITEMS = [(order_id, 1, 'Arroz', 1, 10, 'Mercearia') for order_id, *_ in ORDERS if order_id % 2]
+
+class FakeCursor:
+    """Answers the orders page and items queries from `ORDERS` and `ITEMS`."""
+
+    def __init__(self):
+        self.pages = []
+        self.rows = []
+
+    def execute(self, query, params):
+        if query == extract.ORDERS_PAGE_QUERY:
+            self.pages.append(params['last_id'])
+            self.rows = [
+                row for row in sorted(ORDERS)
+                if row[0] > params['last_id'] and (params['until_id'] is None or row[0] <= params['until_id'])
+            ][:params['limit']]
+        else:
+            assert query == extract.ORDER_ITEMS_QUERY
+            order_ids, = params
+            self.rows = [item for item in ITEMS if item[0] in order_ids]
+
+    def fetchall(self):
+        return self.rows
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cursor = FakeCursor()
+
+    @contextmanager
+    def postgres_cursor():
+        yield cursor
+
+    monkeypatch.setattr(extract, "postgres_cursor", postgres_cursor)
+    return cursor
+
+def test_orders_are_paged_by_id(cursor):
+    chunks = list(extract.stream_orders_with_customers_and_items(itersize=3, since_id=3, until_id=34))
+
+    assert [[order.id for order in chunk] for chunk in chunks] == [[5, 8, 13], [21, 34]]
+    # Each page starts after the last id of the previous one
+    assert cursor.pages == [3, 13, 34]
+    assert [len(order.itens) for chunk in chunks for order in chunk] == [1, 0, 1, 1, 0]
+
+def test_all_orders_come_in_id_order(cursor):
+    orders = extract.extract_orders_with_customers_and_items()
+    assert [order.id for order in orders] == sorted(order_id for order_id, *_ in ORDERS)
@@ -0,0 +1,79 @@
+import os
+import random
+
+import pytest
+
+from app.service import groupby
+from app.service.groupby import ExternalGroupBy
+from app.service.transform import external_profile_documents, product_predominant_profile
+
+# Far below the size of the test data, so it is spilled several times
+TINY_BUDGET_MB = 0.001
+
+@pytest.fixture(autouse=True)
+def frequent_size_checks(monkeypatch):
+    monkeypatch.setattr(groupby, "SIZE_CHECK_INTERVAL", 10)
+
+def random_pairs(seed, num_values=2000, num_keys=150):
+    rng = random.Random(seed)
+    keys = [f"key-{index}" for index in range(num_keys)] + list(range(num_keys))
+    return [(rng.choice(keys), rng.randint(0, 1000)) for _ in range(num_values)]
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("partitions", [1, 4])
+def test_spilled_groups_match_in_memory_group_by(tmp_path, seed, partitions):
+    pairs = random_pairs(seed)
+    expected = {}
+    for key, value in pairs:
+        expected.setdefault(key, []).append(value)
+
+    with ExternalGroupBy(memory_budget_mb=TINY_BUDGET_MB, partitions=partitions, directory=str(tmp_path)) as grouper:
+        for key, value in pairs:
+            grouper.add(key, value)
+        groups = list(grouper.groups())
+        assert grouper.spills > 1
+
+    assert len(groups) == len(expected)
+    assert {key: sorted(values) for key, values in groups} == {
+        key: sorted(values) for key, values in expected.items()
+    }
+    # Spill files are removed once read
+    assert os.listdir(tmp_path) == []
+
+def test_folded_states_are_merged_across_spills(tmp_path):
+    pairs = random_pairs(seed=5)
+    with ExternalGroupBy(
+            int, lambda total, value: total + value, lambda total, other: total + other,
+            memory_budget_mb=TINY_BUDGET_MB, partitions=3, directory=str(tmp_path)
+            ) as grouper:
+        for key, value in pairs:
+            grouper.add(key, value)
+        totals = dict(grouper.groups())
+        assert grouper.spills > 1
+
+    expected = {}
+    for key, value in pairs:
+        expected[key] = expected.get(key, 0) + value
+    assert totals == expected
+
+def test_without_budget_nothing_is_spilled(tmp_path):
+    with ExternalGroupBy(memory_budget_mb=None, directory=str(tmp_path)) as grouper:
+        for key, value in random_pairs(seed=1):
+            grouper.add(key, value)
+        list(grouper.groups())
+        assert grouper.spills == 0
+    assert os.listdir(tmp_path) == []
+
+def test_spilled_profile_matches_in_memory_profile(tmp_path, monkeypatch):
+    # Spills go to the relative SPILL_DIR
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(3)
+    rows = [
+        (product_id, f"Produto {product_id}", rng.choice("MF"), rng.randint(10, 80))
+        for product_id in (rng.randint(1, 300) for _ in range(3000))
+    ]
+    expected = product_predominant_profile(rows, memory_budget_mb=None)['data']
+    spilled = external_profile_documents(rows, TINY_BUDGET_MB)
+
+    key = lambda document: document['Product']
+    assert sorted(spilled, key=key) == sorted(expected, key=key)
@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from app.service.itemsets import frequent_itemsets, most_common_itemsets
+
+def brute_force_itemsets(baskets, min_count, max_size):
+    """Count every subset of every basket, up to `max_size` items."""
+    supports = Counter()
+    for basket in baskets:
+        items = sorted(set(basket))
+        for size in range(1, min(len(items), max_size) + 1):
+            supports.update(combinations(items, size))
+    return {itemset: count for itemset, count in supports.items() if count >= min_count}
+
+def random_baskets(seed, num_baskets=60, num_items=8, max_basket=5):
+    rng = random.Random(seed)
+    return [
+        rng.sample(range(1, num_items + 1), rng.randint(1, max_basket))
+        for _ in range(num_baskets)
+    ]
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("min_count,max_size", [(1, 5), (3, 3), (8, 2), (15, 4)])
+def test_fpgrowth_matches_brute_force(seed, min_count, max_size):
+    baskets = random_baskets(seed)
+    mined = frequent_itemsets(baskets, min_support=min_count, max_size=max_size)
+
+    # No itemset is reported twice
+    assert len(mined) == len({itemset for itemset, _ in mined})
+    assert dict(mined) == brute_force_itemsets(baskets, min_count, max_size)
+
+def test_fractional_support_is_relative_to_the_number_of_baskets():
+    baskets = random_baskets(seed=42, num_baskets=50)
+    assert dict(frequent_itemsets(baskets, min_support=0.1, max_size=3)) == brute_force_itemsets(baskets, 5, 3)
+
+def test_most_common_itemsets_layout():
+    rows = [
+        (1, 10, 'Arroz'), (1, 20, 'Feijao'), (1, 30, 'Oleo'),
+        (2, 10, 'Arroz'), (2, 20, 'Feijao'), (2, 30, 'Oleo'),
+        (3, 10, 'Arroz'), (3, 20, 'Feijao'),
+    ]
+    result = most_common_itemsets(rows, min_support=2, max_size=3)
+
+    # Most frequent first, then smaller itemsets first
+    assert result['data'] == [
+        {'Product_1': 'Arroz', 'Product_2': 'Feijao', 'Count': 3},
+        {'Product_1': 'Arroz', 'Product_2': 'Oleo', 'Count': 2},
+        {'Product_1': 'Feijao', 'Product_2': 'Oleo', 'Count': 2},
+        {'Product_1': 'Arroz', 'Product_2': 'Feijao', 'Product_3': 'Oleo', 'Count': 2},
+    ]
@@ -0,0 +1,128 @@
+from app.service.load import (
+    bulk_insert_documents, bulk_load_complete_orders_to_dw, bulk_load_most_common_products,
+    bulk_load_product_predominant_profile,
+    upsert_complete_orders_to_dw, upsert_most_common_products, upsert_product_predominant_profile
+)
+
+DB_NAME = 'ETL-test'
+
+def profile_delta(*entries):
+    return {
+        'processing_date': '01/02/2024',
+        'data': [
+            {
+                'Product': product, 'Predominant_Gender': 'M', 'Predominant_Age_Range': '25-34',
+                'Gender_Counts': gender_counts, 'Age_Range_Counts': age_range_counts
+            }
+            for product, gender_counts, age_range_counts in entries
+        ]
+    }
+
+def stored(client, collection_name, key):
+    return {
+        tuple(document[field] for field in key): {
+            field: value for field, value in document.items() if field not in ('_id', 'processing_date')
+        }
+        for document in client[DB_NAME][collection_name].find()
+    }
+
+def test_reapplied_profile_delta_is_a_no_op(client):
+    first = profile_delta(('Arroz', {'M': 2, 'F': 1}, {'25-34': 3}))
+    second = profile_delta(
+        ('Arroz', {'M': 0, 'F': 3}, {'65+': 3}),
+        ('Feijao', {'M': 1, 'F': 0}, {'18-24': 1})
+    )
+    upsert = lambda data, watermark: upsert_product_predominant_profile(data, watermark, db_name=DB_NAME)
+
+    assert upsert(first, 100)['success']
+    assert upsert(second, 200)['success']
+    after_second = stored(client, 'ETL-predominant_profile', ['Product'])
+    assert after_second[('Arroz',)]['Gender_Counts'] == {'M': 2, 'F': 4}
+    assert after_second[('Arroz',)]['Predominant_Gender'] == 'F'
+    assert after_second[('Arroz',)]['Last_Order_Id'] == 200
+
+    # A retried run re-applies the deltas it already loaded
+    for data, watermark in ((second, 200), (first, 100)):
+        result = upsert(data, watermark)
+        assert result['success']
+        assert result['documents_loaded'] == 0
+    assert stored(client, 'ETL-predominant_profile', ['Product']) == after_second
+
+def test_reapplied_pair_delta_is_a_no_op(client):
+    delta = {
+        'processing_date': '01/02/2024',
+        'data': [
+            {'Product_1': 'Arroz', 'Product_2': 'Feijao', 'Count': 4},
+            {'Product_1': 'Arroz', 'Product_2': 'Oleo', 'Count': 1},
+        ]
+    }
+    upsert = lambda watermark: upsert_most_common_products(delta, watermark, db_name=DB_NAME)
+
+    assert upsert(100)['success']
+    assert upsert(200)['success']
+    after_second = stored(client, 'ETL-most_common_products', ['Product_1', 'Product_2'])
+    assert after_second[('Arroz', 'Feijao')]['Count'] == 8
+
+    result = upsert(200)
+    assert result['success'] and result['documents_loaded'] == 0
+    assert stored(client, 'ETL-most_common_products', ['Product_1', 'Product_2']) == after_second
+
+def pairs(*counts):
+    return {
+        'processing_date': '01/02/2024',
+        'data': [
+            {'Product_1': 'Arroz', 'Product_2': f'Produto {n}', 'Count': count} for n, count in enumerate(counts)
+        ]
+    }
+
+def orders(*order_ids):
+    return {
+        'processing_date': '2024-02-01',
+        'data': [{'order_id': order_id, 'order_date': '2024-01-31', 'items': []} for order_id in order_ids]
+    }
+
+def test_orders_are_replaced_by_order_id(client):
+    loads = [
+        lambda data: bulk_load_complete_orders_to_dw(data, db_name=DB_NAME),
+        lambda data: upsert_complete_orders_to_dw(data, 100, db_name=DB_NAME),
+    ]
+    for load_fn in loads + loads:
+        result = load_fn(orders(1, 2, 3))
+        assert result['success'] and result['documents_loaded'] == 3
+    stored_orders = client[DB_NAME]['ETL-orders'].find({}, {'order_id': 1})
+    assert sorted((document['_id'], document['order_id']) for document in stored_orders) == [(1, 1), (2, 2), (3, 3)]
+
+def test_duplicate_inserts_fail(client):
+    result = bulk_insert_documents([{'_id': 1}, {'_id': 1}, {'_id': 2}], DB_NAME, 'ETL-orders')
+    assert not result['success']
+    assert (result['documents_loaded'], result['documents_skipped'], result['documents_failed']) == (2, 0, 1)
+
+def test_bulk_snapshots_after_guarded_upserts(client):
+    assert upsert_most_common_products(pairs(4, 5), 100, db_name=DB_NAME)['success']
+    assert upsert_complete_orders_to_dw(orders(1, 2), db_name=DB_NAME)['success']
+
+    # Upserted documents are keyed on `_id`, which inserted snapshots never collide on
+    for _ in range(2):
+        result = bulk_load_most_common_products(pairs(4, 5), db_name=DB_NAME)
+        assert result['success'] and result['documents_loaded'] == 2
+    assert client[DB_NAME]['ETL-most_common_products'].count_documents({}) == 6
+
+def test_guarded_upserts_after_bulk_snapshots(client):
+    for _ in range(2):
+        assert bulk_load_most_common_products(pairs(4, 5), db_name=DB_NAME)['success']
+        assert bulk_load_product_predominant_profile(
+            profile_delta(('Arroz', {'M': 5, 'F': 0}, {'65+': 5})), db_name=DB_NAME
+        )['success']
+
+    # Snapshots holding the same products are neither matched nor merged into
+    result = upsert_most_common_products(pairs(1, 2), 100, db_name=DB_NAME)
+    assert result['success'] and result['documents_loaded'] == 2
+    upserted = client[DB_NAME]['ETL-most_common_products'].find({'Last_Order_Id': 100}, {'_id': 0, 'Count': 1})
+    assert sorted(document['Count'] for document in upserted) == [1, 2]
+
+    assert upsert_product_predominant_profile(
+        profile_delta(('Arroz', {'M': 0, 'F': 2}, {'25-34': 2})), 100, db_name=DB_NAME
+    )['success']
+    profile = client[DB_NAME]['ETL-predominant_profile'].find_one({'Last_Order_Id': 100})
+    assert profile['Gender_Counts'] == {'M': 0, 'F': 2}
+    assert (profile['Predominant_Gender'], profile['Predominant_Age_Range']) == ('F', '25-34')
@@ -0,0 +1,401 @@
+import json
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from operator import itemgetter
+
+import pytest
+
+from app.service import load, pipeline
+from app.service.extract import MIN_PAIR_FREQUENCY, SALES_TABLES, SOURCE_TABLES
+from app.service.pipeline import ETLPipeline
+from app.service.records import ItemRecord, OrderRecord
+from app.service.transform import age_range
+
+DB_NAME = 'ETL-test'
+FLOWS = ('product_profile', 'common_products', 'orders')
+COLLECTIONS = ('ETL-predominant_profile', 'ETL-most_common_products', 'ETL-orders')
+# Processing metadata, which differs from one run or load mode to another
+METADATA = ('_id', 'processing_date', 'processing_timestamp', 'Last_Order_Id')
+
+PRODUCTS = [
+    (1, 'Arroz', 'Mercearia'), (2, 'Feijao', 'Mercearia'), (3, 'Oleo', None),
+    (4, 'Leite', 'Laticinios'), (5, 'Cafe', 'Mercearia'), (6, 'Pao', 'Padaria'),
+]
+CUSTOMERS = [
+    (1, 'Maria', 'maria@example.com', 'F', 34), (2, 'Joao', 'joao@example.com', 'M', 19),
+    (3, 'Ana', 'ana@example.com', 'F', 52), (4, 'Pedro', 'pedro@example.com', 'M', 71),
+    (5, 'Lucia', 'lucia@example.com', 'F', 27), (6, 'Alex', 'alex@example.com', None, 45),
+]
+
+def make_orders(first_id, num_orders, seed):
+    """One order a day from 2024-01-01 on, with up to 4 distinct products (or none)."""
+    rng = random.Random(seed)
+    orders = []
+    for order_id in range(first_id, first_id + num_orders):
+        items = [
+            ItemRecord(product_id, name, rng.randint(1, 3), rng.randint(1, 20), category)
+            for product_id, name, category in sorted(rng.sample(PRODUCTS, rng.randint(0, 4)))
+        ]
+        orders.append(OrderRecord(
+            order_id, date(2024, 1, 1) + timedelta(days=order_id),
+            sum(item.quantidade * item.preco_unitario for item in items), *rng.choice(CUSTOMERS), items
+        ))
+    return orders
+
+def batched(rows, size):
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+class FakeSales:
+    """
+    In-memory stand-in for the sales tables: extractors with the signatures
+    (and the row shapes) of those of `app.service.extract`.
+    """
+
+    def __init__(self, orders):
+        self.orders = orders
+        # Bumped by tests to mimic updates the row counts and ids do not show
+        self.modifications = Counter()
+
+    def select(self, since_id=0, until_id=None, partition=None):
+        return [
+            order for order in self.orders
+            if order.id > since_id and (until_id is None or order.id <= until_id)
+            and (partition is None or order.data_venda.strftime("p%Y%m") == partition)
+        ]
+
+    def fetch_transaction_products(self, since_id=0, until_id=None, partition=None):
+        return [
+            (item.id, item.nome, order.gender, order.age)
+            for order in self.select(since_id, until_id, partition) for item in order.itens
+        ]
+
+    def stream_transaction_products(self, itersize, since_id=0, until_id=None, partition=None):
+        return iter(batched(self.fetch_transaction_products(since_id, until_id, partition), itersize))
+
+    def fetch_product_profile_counts(self, since_id=0, until_id=None, partition=None):
+        counts = Counter(
+            (item.id, item.nome, order.gender, age_range(order.age))
+            for order in self.select(since_id, until_id, partition) for item in order.itens
+        )
+        return [(*key, count) for key, count in counts.items()]
+
+    def stream_product_profile_counts(self, itersize, since_id=0, until_id=None, partition=None):
+        return iter(batched(self.fetch_product_profile_counts(since_id, until_id, partition), itersize))
+
+    def get_frequency_itemsets(self, min_frequency=MIN_PAIR_FREQUENCY, since_id=0, until_id=None, partition=None):
+        pairs = Counter(
+            (first.nome, second.nome)
+            for order in self.select(since_id, until_id, partition)
+            for first in order.itens for second in order.itens if first.id < second.id
+        )
+        return [(first, second, count) for (first, second), count in pairs.most_common() if count > min_frequency]
+
+    def stream_frequency_itemsets(
+            self, itersize, min_frequency=MIN_PAIR_FREQUENCY, since_id=0, until_id=None, partition=None):
+        return iter(batched(self.get_frequency_itemsets(min_frequency, since_id, until_id, partition), itersize))
+
+    def fetch_order_baskets(self, since_id=0, until_id=None, partition=None):
+        return [
+            (order.id, item.id, item.nome)
+            for order in self.select(since_id, until_id, partition) for item in order.itens
+        ]
+
+    def stream_order_baskets(self, itersize, since_id=0, until_id=None, partition=None):
+        return iter(batched(self.fetch_order_baskets(since_id, until_id, partition), itersize))
+
+    def extract_orders_with_customers_and_items(self, since_id=0, until_id=None):
+        return self.select(since_id, until_id)
+
+    def stream_orders_with_customers_and_items(self, itersize, since_id=0, until_id=None, partition=None):
+        return iter(batched(self.select(since_id, until_id, partition), itersize))
+
+    def stream_sales_lines(self, itersize, since_id=0, until_id=None, ordered=True):
+        lines = [
+            (order.id, order.data_venda, order.valor_total, order.cliente_id, order.nome, order.email, order.gender,
+             order.age, *(item.to_tuple() if item else (None,) * 5))
+            for order in self.select(since_id, until_id) for item in order.itens or [None]
+        ]
+        if not ordered:
+            random.Random(0).shuffle(lines)
+        return iter(batched(lines, itersize))
+
+    def get_source_high_water_mark(self):
+        last = max(self.orders, key=lambda order: order.id)
+        return last.id, last.data_venda.isoformat()
+
+    def get_partition_ranges(self, partitions, since_id=0, until_id=None):
+        ids = [order.id for order in self.select(since_id, until_id)]
+        cuts = sorted({ids[len(ids) * n // partitions] for n in range(1, partitions)})
+        bounds = [since_id, *cuts, until_id if until_id is not None else ids[-1]]
+        return list(zip(bounds, bounds[1:]))
+
+    def get_source_fingerprint(self, tables=SOURCE_TABLES):
+        sales = {
+            'max_id': max(order.id for order in self.orders),
+            'modifications': len(self.orders) + sum(self.modifications.values())
+        }
+        # Customers, products and categories never change here
+        return {table: dict(sales) if table in SALES_TABLES else {'max_id': 1, 'modifications': 0} for table in tables}
+
+    def get_sales_partitions(self):
+        partitions = {}
+        for order in self.orders:
+            counters = partitions.setdefault(order.data_venda.strftime("p%Y%m"), Counter())
+            counters['vendas'] += 1
+            counters['itens_venda'] += len(order.itens)
+        for partition, count in self.modifications.items():
+            partitions[partition]['vendas'] += count
+        return {partition: dict(counters) for partition, counters in partitions.items()}
+
+class FakeAsyncResource:
+    """Stands in for the asyncpg pool and the AsyncMongoClient."""
+
+    async def close(self):
+        pass
+
+async def fake_async_resource(*args, **kwargs):
+    return FakeAsyncResource()
+
+def async_fetch(fetch):
+    async def fetch_async(pool, *args, **kwargs):
+        return fetch(*args, **kwargs)
+    return fetch_async
+
+def async_stream(stream):
+    async def stream_async(pool, *args, **kwargs):
+        for batch in stream(*args, **kwargs):
+            yield batch
+    return stream_async
+
+def async_load(load_fn):
+    """An async loader writing through the (mongomock backed) sync one."""
+    async def load_async(client, data, concurrency=None, **kwargs):
+        return load_fn(data, **kwargs)
+    return load_async
+
+ASYNC_EXTRACTORS = {
+    'fetch_transaction_products_async': async_fetch, 'stream_transaction_products_async': async_stream,
+    'fetch_product_profile_counts_async': async_fetch, 'stream_product_profile_counts_async': async_stream,
+    'get_frequency_itemsets_async': async_fetch, 'stream_frequency_itemsets_async': async_stream,
+    'fetch_order_baskets_async': async_fetch, 'stream_order_baskets_async': async_stream,
+    'extract_orders_with_customers_and_items_async': async_fetch,
+    'stream_orders_with_customers_and_items_async': async_stream,
+}
+ASYNC_LOADERS = {
+    f'{prefix}{name}_async': f'{prefix}{name}'
+    for prefix in ('load_', 'bulk_load_')
+    for name in ('product_predominant_profile', 'most_common_products', 'complete_orders_to_dw')
+}
+
+@pytest.fixture
+def sales(client, monkeypatch, tmp_path):
+    """Run the pipeline against `FakeSales` and the in-memory MongoDB, with its state files under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    sales = FakeSales(make_orders(1, 80, seed=6))
+    for name in (
+            'fetch_transaction_products', 'stream_transaction_products', 'fetch_product_profile_counts',
+            'stream_product_profile_counts', 'get_frequency_itemsets', 'stream_frequency_itemsets',
+            'fetch_order_baskets', 'stream_order_baskets', 'extract_orders_with_customers_and_items',
+            'stream_orders_with_customers_and_items', 'stream_sales_lines', 'get_source_high_water_mark',
+            'get_partition_ranges', 'get_source_fingerprint', 'get_sales_partitions'):
+        monkeypatch.setattr(pipeline, name, getattr(sales, name))
+    for name, wrap in ASYNC_EXTRACTORS.items():
+        monkeypatch.setattr(pipeline, name, wrap(getattr(sales, name[:-len('_async')])))
+    for name, sync_name in ASYNC_LOADERS.items():
+        monkeypatch.setattr(pipeline, name, async_load(getattr(load, sync_name)))
+    monkeypatch.setattr(pipeline, 'create_async_postgres_pool', fake_async_resource)
+    monkeypatch.setattr(pipeline, 'create_async_mongo_client', fake_async_resource)
+    # Threads see the fake extractors; spawned worker processes would not
+    monkeypatch.setattr(
+        pipeline, 'ProcessPoolExecutor', lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)
+    )
+    return sales
+
+def run(db_name=DB_NAME, **options):
+    result = ETLPipeline(db_name=db_name, **{'itersize': 7, 'load_batch_size': 5, **options}).run()
+    assert result['status'] == 'success', result.get('error_details') or result['metrics']
+    return result
+
+def canonical(entry):
+    entry = {key: value for key, value in entry.items() if key not in METADATA}
+    if 'categories' in entry:
+        # Built from a set, and the items of an order come in any order from an unordered scan
+        entry['categories'] = sorted(entry['categories'])
+        entry['items'] = sorted(entry['items'], key=itemgetter('product_id'))
+    return entry
+
+def loaded(client, db_name=DB_NAME, query=None):
+    """The entries loaded into each collection, whatever the load mode, in a comparable order."""
+    view = {}
+    for collection_name in COLLECTIONS:
+        entries = []
+        for document in client[db_name][collection_name].find(query or {}):
+            entries.extend(document['data'] if 'data' in document else [document])
+        entries = [canonical(entry) for entry in entries]
+        if collection_name == 'ETL-most_common_products':
+            # Incremental runs keep every pair; consumers apply the minimum frequency
+            entries = [entry for entry in entries if entry['Count'] > MIN_PAIR_FREQUENCY]
+        view[collection_name] = sorted(entries, key=lambda entry: json.dumps(entry, sort_keys=True))
+    return view
+
+def default_view(client, db_name='ETL-expected'):
+    """What a default run (one document per flow, everything in memory) loads."""
+    run(db_name=db_name)
+    view = loaded(client, db_name)
+    assert all(view.values())
+    # Ties would be broken by counting order, which the modes need not share
+    for entry in view['ETL-predominant_profile']:
+        for counts in (entry['Gender_Counts'], entry['Age_Range_Counts']):
+            counts = sorted(counts.values())
+            assert len(counts) == 1 or counts[-1] > counts[-2]
+    return view
+
+@pytest.fixture
+def expected(client, sales):
+    return default_view(client)
+
+@pytest.mark.parametrize("itersize", [1, 7, 1000])
+@pytest.mark.parametrize("mode", [{}, {"bulk_load": True}])
+def test_streaming_runs(client, expected, itersize, mode):
+    result = run(streaming=True, itersize=itersize, **mode)
+    assert result['metrics']['orders']['records_extracted'] == len(expected['ETL-orders'])
+    assert loaded(client) == expected
+
+@pytest.mark.parametrize("mode", [{}, {"streaming": True}, {"pipelined": True}, {"staging": True}])
+def test_bulk_reruns_replace_orders(client, expected, mode):
+    run(bulk_load=True, **mode)
+    assert loaded(client) == expected
+    run(bulk_load=True, **mode)
+    assert loaded(client)['ETL-orders'] == expected['ETL-orders']
+
+@pytest.mark.parametrize("mode", [{}, {"streaming": True}, {"pipelined": True}])
+def test_bulk_load_after_incremental_runs(client, sales, mode):
+    before = default_view(client, 'ETL-expected-before')
+    run(incremental=True, **mode)
+    assert loaded(client) == before
+
+    sales.orders.extend(make_orders(81, 20, seed=7))
+    run(bulk_load=True, **mode)
+    after = default_view(client, 'ETL-expected-after')
+    # Orders are shared; the upserted aggregates (with their watermark) are kept beside the bulk snapshots
+    assert loaded(client, query={'Last_Order_Id': {'$exists': True}}) == {**before, 'ETL-orders': []}
+    assert loaded(client, query={'Last_Order_Id': {'$exists': False}}) == after
+
+@pytest.mark.parametrize("mode", [{"streaming": True}, {"pipelined": True}])
+def test_resume_after_a_partially_loaded_batch(client, expected, monkeypatch, mode):
+    calls = []
+
+    def fail_second_batch(data, **kwargs):
+        calls.append(data)
+        if len(calls) == 2:
+            # Half the batch made it to the warehouse before the load failed
+            load.bulk_load_complete_orders_to_dw({**data, 'data': data['data'][:3]}, **kwargs)
+            return {'success': False, 'error': 'connection reset'}
+        return load.bulk_load_complete_orders_to_dw(data, **kwargs)
+
+    monkeypatch.setattr(pipeline, 'bulk_load_complete_orders_to_dw', fail_second_batch)
+    result = ETLPipeline(db_name=DB_NAME, itersize=7, load_batch_size=5, bulk_load=True, **mode).run()
+    assert result['status'] == 'partial_success'
+    assert result['metrics']['orders']['batches_loaded'] == 1
+
+    monkeypatch.setattr(pipeline, 'bulk_load_complete_orders_to_dw', load.bulk_load_complete_orders_to_dw)
+    result = run(bulk_load=True, resume=True, **mode)
+    assert result['metrics']['product_profile']['skipped']
+    assert result['metrics']['orders']['resumed_batches'] == 1
+    assert loaded(client)['ETL-orders'] == expected['ETL-orders']
+    stored_orders = client[DB_NAME]['ETL-orders'].count_documents({})
+    assert stored_orders == len(expected['ETL-orders'])
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("mode", [{}, {"bulk_load": True}])
+def test_shared_scan(client, expected, engine, mode):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    result = run(shared_scan=True, transform_engine=engine, **mode)
+    assert result['metrics']['product_profile']['transform_engine'] == engine
+    assert loaded(client) == expected
+
+@pytest.mark.parametrize("option", [
+    {"partitions": 2}, {"pipelined": True}, {"staging": True}, {"cache": True}, {"max_workers": 2},
+    {"profile_pushdown": True},
+])
+def test_shared_scan_rejects_options_it_would_ignore(option):
+    with pytest.raises(ValueError):
+        ETLPipeline(shared_scan=True, **option)
+
+def test_cached_runs_skip_unchanged_sources(client, sales, expected):
+    run(cache=True)
+    assert loaded(client) == expected
+
+    result = run(cache=True)
+    assert all(result['metrics'][name].get('cache') == 'unchanged' for name in FLOWS)
+
+    # An update keeps the max ids, only the modification counters show it
+    sales.orders[9].valor_total += 1
+    sales.modifications['p202401'] += 1
+    result = run(cache=True)
+    assert not any(result['metrics'][name].get('skipped') for name in FLOWS)
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("mode", [{}, {"streaming": True}, {"bulk_load": True}])
+def test_partitioned_runs(client, expected, engine, mode):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    result = run(partitions=3, transform_engine=engine, **mode)
+    assert result['metrics']['product_profile']['transform_engine'] == engine
+    assert len(result['metrics']['orders']['partitions']) == 3
+    assert loaded(client) == expected
+
+@pytest.mark.parametrize("mode", [{}, {"streaming": True}, {"bulk_load": True}, {"partitions": 3}])
+def test_profile_pushdown(client, expected, mode):
+    result = run(profile_pushdown=True, **mode)
+    assert result['metrics']['product_profile']['transform_engine'] == 'python'
+    assert loaded(client) == expected
+
+def test_incremental_profile_pushdown(client, sales):
+    run(incremental=True, profile_pushdown=True)
+    sales.orders.extend(make_orders(81, 20, seed=7))
+    run(incremental=True, profile_pushdown=True)
+    assert loaded(client) == default_view(client)
+
+@pytest.mark.parametrize("mode", [
+    {}, {"streaming": True, "bulk_load": True}, {"dependencies": {"orders": ["product_profile", "common_products"]}},
+])
+def test_concurrent_flows(client, expected, mode):
+    run(max_workers=3, **mode)
+    assert loaded(client) == expected
+
+@pytest.mark.parametrize("mode", [
+    {}, {"streaming": True}, {"bulk_load": True}, {"streaming": True, "bulk_load": True},
+    {"streaming": True, "transform_engine": "numpy"},
+])
+def test_async_runs(client, expected, mode):
+    if mode.get("transform_engine") == "numpy":
+        pytest.importorskip("numpy")
+    result = run(async_mode=True, **mode)
+    assert result['metrics']['orders']['async']
+    assert loaded(client) == expected
+
+@pytest.mark.parametrize("mode", [{}, {"bulk_load": True}, {"transform_engine": "numpy"}])
+def test_date_partitioned_runs(client, expected, mode):
+    if mode.get("transform_engine") == "numpy":
+        pytest.importorskip("numpy")
+    result = run(date_partitions=True, **mode)
+    assert result['metrics']['orders']['partitions_touched'] == ['p202401', 'p202402', 'p202403']
+    assert loaded(client) == expected
+
+def test_date_partitioned_runs_only_read_changed_partitions(client, sales):
+    run(date_partitions=True)
+    # Keep the aggregates of the next run only; orders are upserted
+    for collection_name in ('ETL-predominant_profile', 'ETL-most_common_products'):
+        client[DB_NAME][collection_name].delete_many({})
+
+    sales.orders.extend(make_orders(81, 20, seed=7))
+    sales.orders[4].valor_total += 1
+    sales.modifications['p202401'] += 1
+    result = run(date_partitions=True)
+    for name in FLOWS:
+        assert result['metrics'][name]['partitions_touched'] == ['p202401', 'p202403', 'p202404']
+    assert loaded(client) == default_view(client)
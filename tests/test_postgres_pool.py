@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from app.db.postgree_connection import PostgresConnectionPool
+
+class FakeConnection:
+    """The parts of a psycopg2 connection the pools use."""
+
+    def __init__(self, *args, **kwargs):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    def get_transaction_status(self):
+        return self.info.transaction_status
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(psycopg2, "connect", FakeConnection)
+    pool = PostgresConnectionPool(min_size=1, max_size=3, timeout=1)
+    yield pool
+    pool.closeall()
+
+def test_connections_closed_by_the_pool_are_forgotten(pool):
+    connections = [pool.getconn() for _ in range(3)]
+    for conn in connections:
+        pool.putconn(conn)
+
+    # Only `min_size` connections are kept idle, the others are closed
+    assert [conn.closed for conn in connections].count(0) == 1
+    assert list(pool._last_used) == [id(conn) for conn in connections if not conn.closed]
+
+def test_discarded_connections_are_forgotten(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.close()
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert id(conn) not in pool._last_used
+    assert pool.stats()['reconnects'] == 1
+    pool.putconn(replacement)
+    assert list(pool._last_used) == [id(replacement)]
@@ -0,0 +1,78 @@
+import itertools
+import threading
+
+import pytest
+
+from app.service.stages import run_stages
+
+# Seconds after which a run that did not return is taken for a deadlock
+DEADLOCK_TIMEOUT = 10
+
+def run_with_timeout(*args, **kwargs):
+    """Call `run_stages` in a thread; returns ('ok', result) or ('error', exception)."""
+    outcome = []
+
+    def target():
+        try:
+            outcome.append(("ok", run_stages(*args, **kwargs)))
+        except BaseException as e:
+            outcome.append(("error", e))
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(DEADLOCK_TIMEOUT)
+    assert not thread.is_alive(), "run_stages deadlocked"
+    return outcome[0]
+
+def test_stages_map_every_item():
+    status, (outputs, metrics) = run_with_timeout(
+        lambda: iter(range(20)),
+        [("double", lambda items: (item * 2 for item in items)), ("total", lambda items: [sum(items)])],
+        queue_size=2
+    )
+    assert status == "ok"
+    assert outputs == [380]
+    assert metrics["stages"]["double"]["items_in"] == 20
+    assert set(metrics["queues"]) == {"extract->double", "double->total"}
+
+@pytest.mark.parametrize("queue_size", [1, 4])
+def test_middle_stage_error_stops_the_other_stages(queue_size):
+    source_closed = threading.Event()
+    consumed = []
+
+    def source():
+        # Endless, so the source only stops if it is aborted
+        try:
+            for item in itertools.count():
+                yield item
+        finally:
+            source_closed.set()
+
+    def failing(items):
+        for item in items:
+            if item == 5:
+                raise ValueError("bad batch")
+            yield item
+
+    def sink(items):
+        for item in items:
+            consumed.append(item)
+            yield item
+
+    status, error = run_with_timeout(
+        source, [("transform", failing), ("load", sink)], queue_size=queue_size
+    )
+    assert status == "error"
+    assert isinstance(error, ValueError) and str(error) == "bad batch"
+    assert source_closed.is_set()
+    assert consumed == list(range(len(consumed))) and len(consumed) <= 5
+
+def test_last_stage_error_is_raised():
+    def failing(items):
+        for item in items:
+            raise RuntimeError(f"cannot load {item}")
+        yield
+
+    status, error = run_with_timeout(lambda: iter(range(100)), [("load", failing)], queue_size=1)
+    assert status == "error"
+    assert str(error) == "cannot load 0"
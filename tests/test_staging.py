@@ -0,0 +1,72 @@
+from datetime import date, datetime
+from decimal import Decimal
+from importlib.util import find_spec
+
+import pytest
+
+from app.service.cache import ResultCache
+from app.service.records import ItemRecord, OrderRecord
+from app.service.staging import StagingWriter, completed_stats, mark_complete, read_batches
+
+ORDER = OrderRecord(
+    17, date(2024, 2, 29), Decimal('123.45'), 3, 'Maria', 'maria@example.com', 'F', 34,
+    [
+        ItemRecord(1, 'Arroz', 2, Decimal('10.50'), 'Mercearia'),
+        ItemRecord(2, 'Feijao', 1, Decimal('0.01'), None),
+    ]
+)
+
+FORMATS = [
+    "ndjson",
+    pytest.param("msgpack", marks=pytest.mark.skipif(find_spec("msgpack") is None, reason="msgpack is not installed")),
+]
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_staged_batches_round_trip(tmp_path, fmt):
+    batches = [
+        [ORDER, ORDER],
+        [{'order_date': date(2024, 1, 31), 'processed_at': datetime(2024, 2, 1, 12, 30, 5, 123456),
+          'total': Decimal('-0.10'), 'items': [ItemRecord(3, 'Oleo', 4, Decimal('7.99'), 'Mercearia')]}],
+        [],
+    ]
+    writer = StagingWriter(str(tmp_path / "batches"), fmt, workers=2)
+    stats = writer.write_all(batches)
+
+    read = list(read_batches(str(tmp_path / "batches")))
+    assert read == batches
+    assert isinstance(read[0][0].valor_total, Decimal)
+    assert isinstance(read[0][0].itens[0], ItemRecord)
+    assert stats["rows"] == 3 and stats["files"] == 3
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_tuples_come_back_as_lists(tmp_path, fmt):
+    StagingWriter(str(tmp_path), fmt).write_all([[(1, 'Arroz', 'M', Decimal('30'))]])
+    assert list(read_batches(str(tmp_path))) == [[[1, 'Arroz', 'M', Decimal('30')]]]
+
+def test_completion_marker(tmp_path):
+    directory = str(tmp_path / "transform")
+    writer = StagingWriter(directory)
+    stats = writer.write_all([[ORDER]])
+    assert completed_stats(directory) is None
+
+    mark_complete(directory, stats)
+    assert completed_stats(directory) == stats
+    # The marker is not read back as a batch
+    assert list(read_batches(directory)) == [[ORDER]]
+    assert completed_stats(str(tmp_path / "missing")) is None
+
+def test_cached_output_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    output = {
+        'processing_date': '2024-02-29',
+        'data': [{'order_id': 17, 'order_date': date(2024, 2, 29), 'total': Decimal('123.45'), 'order': ORDER}]
+    }
+    cache.put('orders', 'key-1', output)
+
+    entry = cache.get('orders', 'key-1')
+    assert entry["output"] == output
+    assert entry["loaded"] is False
+    assert cache.get('orders', 'key-2') is None
+
+    cache.mark_loaded('orders', 'key-1')
+    assert cache.get('orders', 'key-1')["loaded"] is True
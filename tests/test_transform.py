@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from app.service.transform import ProductProfileCounters, product_predominant_profile
+
+def counters_of(rows):
+    return ProductProfileCounters().update(rows)
+
+def random_rows(rng, num_rows):
+    return [
+        (product_id, f"Produto {product_id}", rng.choice("MF"), rng.randint(10, 80))
+        for product_id in (rng.randint(1, 6) for _ in range(num_rows))
+    ]
+
+def sorted_counts(counters):
+    """Counters without their key order: merging may add keys in another order."""
+    return {
+        product_name: (dict(sorted(gender_count.items())), dict(sorted(age_ranges_count.items())))
+        for product_name, (gender_count, age_ranges_count) in counters.products.items()
+    }
+
+@pytest.mark.parametrize("seed", range(10))
+def test_merge_is_associative(seed):
+    rng = random.Random(seed)
+    a, b, c = (random_rows(rng, rng.randint(0, 40)) for _ in range(3))
+
+    left = counters_of(a).merge(counters_of(b)).merge(counters_of(c))
+    right = counters_of(a).merge(counters_of(b).merge(counters_of(c)))
+
+    assert sorted_counts(left) == sorted_counts(right)
+    assert sorted_counts(left) == sorted_counts(counters_of(a + b + c))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merged_batches_give_the_same_profile(seed):
+    rng = random.Random(seed)
+    rows = random_rows(rng, 200)
+    merged = ProductProfileCounters()
+    for start in range(0, len(rows), 30):
+        merged.merge(counters_of(rows[start:start + 30]))
+
+    expected = product_predominant_profile(rows, memory_budget_mb=None)['data']
+    assert product_predominant_profile(merged)['data'] == expected
+
+def test_merge_does_not_change_the_merged_instance():
+    first = counters_of([(1, 'Arroz', 'M', 30)])
+    second = counters_of([(1, 'Arroz', 'F', 30), (2, 'Feijao', 'F', 70)])
+    first.merge(second)
+
+    assert sorted_counts(second) == sorted_counts(counters_of([(1, 'Arroz', 'F', 30), (2, 'Feijao', 'F', 70)]))
+    assert sorted_counts(first)['Arroz'] == ({'F': 1, 'M': 1}, {'25-34': 2})
+
+@pytest.mark.parametrize("memory_budget_mb", [None, 1])
+def test_missing_genders_are_counted_as_unknown(memory_budget_mb):
+    rows = [(1, 'Arroz', None, 30), (1, 'Arroz', 'M', 30), (1, 'Arroz', None, 40)]
+    document, = product_predominant_profile(rows, memory_budget_mb=memory_budget_mb)['data']
+    assert document['Gender_Counts'] == {'M': 1, 'F': 0, 'Unknown': 2}
@@ -0,0 +1,87 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.service.partitioned import profile_counters_partial, vectorized_profile_counters_partial
+from app.service.records import ItemRecord, OrderRecord
+from app.service.transform import product_predominant_profile, transform_complete_orders_to_dw_format
+from app.service.vectorized import (
+    product_predominant_profile_vectorized, transform_complete_orders_to_dw_format_vectorized
+)
+
+# Around every age range bound
+AGES = [0, 17, 18, 24, 25, 34, 35, 44, 45, 54, 55, 64, 65, 90]
+# `clientes.gender` is nullable
+GENDERS = ['M', 'F', None]
+
+def ordered(value):
+    """Dicts as lists of items, so comparisons also check key order."""
+    if isinstance(value, dict):
+        return [(key, ordered(item)) for key, item in value.items()]
+    if isinstance(value, list):
+        return [ordered(item) for item in value]
+    return value
+
+def profile_rows(seed, num_rows=500):
+    rng = random.Random(seed)
+    return [
+        (product_id, f"Produto {product_id}", rng.choice(GENDERS), rng.choice(AGES))
+        for product_id in (rng.randint(1, 12) for _ in range(num_rows))
+    ]
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("chunk_size", [7, 100_000])
+def test_profile_matches_python_engine(seed, chunk_size):
+    rows = profile_rows(seed)
+    expected = product_predominant_profile(rows, memory_budget_mb=None)
+    result = product_predominant_profile_vectorized(rows, chunk_size=chunk_size)
+    assert ordered(result['data']) == ordered(expected['data'])
+
+def test_profile_partial_matches_python_engine():
+    rows = profile_rows(0)
+    batches = [rows[start:start + 64] for start in range(0, len(rows), 64)] + [[]]
+    expected = product_predominant_profile(profile_counters_partial(batches))
+    result = product_predominant_profile(vectorized_profile_counters_partial(batches))
+    assert ordered(result['data']) == ordered(expected['data'])
+
+def test_profile_ties_go_to_the_first_seen_age_range():
+    rows = [
+        (1, 'Arroz', 'F', 40), (1, 'Arroz', 'M', 20), (1, 'Arroz', 'M', 20), (1, 'Arroz', 'F', 40),
+        (2, 'Feijao', 'F', 70), (2, 'Feijao', 'M', 10),
+    ]
+    expected = product_predominant_profile(rows, memory_budget_mb=None)['data']
+    result = product_predominant_profile_vectorized(rows, chunk_size=3)['data']
+
+    assert ordered(result) == ordered(expected)
+    assert [(doc['Predominant_Gender'], doc['Predominant_Age_Range']) for doc in result] == [
+        ('M', '35-44'), ('M', '65+')
+    ]
+
+def test_missing_genders_are_counted_as_unknown():
+    rows = [(1, 'Arroz', None, 40), (1, 'Arroz', 'F', 40), (1, 'Arroz', None, 20)]
+    expected = product_predominant_profile(rows, memory_budget_mb=None)['data']
+    result = product_predominant_profile_vectorized(rows)['data']
+
+    assert ordered(result) == ordered(expected)
+    assert result[0]['Gender_Counts'] == {'M': 0, 'F': 1, 'Unknown': 2}
+
+def test_orders_match_python_engine():
+    rng = random.Random(7)
+    orders = [
+        OrderRecord(
+            order_id, date(2024, 1, 1 + order_id % 28), Decimal('10.00'), order_id % 5, f"Cliente {order_id}",
+            f"cliente{order_id}@example.com", rng.choice(GENDERS), rng.choice(AGES),
+            [
+                ItemRecord(product_id, f"Produto {product_id}", rng.randint(1, 3), Decimal('2.50'), 'Mercearia')
+                for product_id in rng.sample(range(1, 10), rng.randint(1, 4))
+            ]
+        )
+        for order_id in range(1, 60)
+    ]
+    expected = transform_complete_orders_to_dw_format(orders)['data']
+    result = transform_complete_orders_to_dw_format_vectorized(orders, chunk_size=16)['data']
+    assert ordered(result) == ordered(expected)